@@ -0,0 +1,54 @@
+"""Compare per item body formatting with and without compiling templates once.
+
+Run it from the repository root with `python -m benchmarks.formatter`."""
+import time
+from argparse import ArgumentParser
+
+from edgar.formatter import BlockTemplate
+
+
+OPTIONS = {
+    "Hostname": "10.10.{item.rack}.{item.node}",
+    "User": "edgar",
+    "Port": 2222,
+    "ForwardAgent": False,
+    "IdentityFile": "~/.ssh/id_ed25519",
+    "ServerAliveInterval": 120,
+    "ViaProxy": "gw{item.rack}",
+}
+
+
+def format_uncompiled(items):
+    # Options and replacement fields are parsed again for each item
+    for item in items:
+        BlockTemplate(OPTIONS).format(item)
+
+
+def format_template(items):
+    template = BlockTemplate(OPTIONS)
+    for item in items:
+        template.format(item)
+
+
+def run_benchmark():
+    parser = ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--items", type=int, default=100000)
+    args = parser.parse_args()
+
+    items = [{"rack": number // 40, "node": number % 40, "name": "n"}
+             for number in range(args.items)]
+    results = {}
+    for name, function in [("uncompiled", format_uncompiled),
+                           ("BlockTemplate", format_template)]:
+        start = time.perf_counter()
+        function(items)
+        results[name] = (time.perf_counter() - start) / args.items
+        print("{:<17} {:8.3f} µs/item".format(name, results[name] * 1e6))
+    print("Speedup: {:.1f}x".format(
+        results["uncompiled"] / results["BlockTemplate"]
+    ))
+    return 0
+
+
+if __name__ == "__main__":
+    exit(run_benchmark())
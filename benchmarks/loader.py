@@ -0,0 +1,48 @@
+"""Compare the libyaml and pure Python loaders on a synthetic source.
+
+Run it from the repository root with `python -m benchmarks.loader`."""
+import time
+import yaml
+from argparse import ArgumentParser
+
+from benchmarks.synthetic import generate_config
+from edgar.loader import load_yaml
+
+
+def measure(source, loader, runs):
+    best = None
+    document = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        document = load_yaml(source, loader)
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best, document
+
+
+def run_benchmark():
+    parser = ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--hosts", type=int, default=2000)
+    parser.add_argument("--items", type=int, default=10)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    source = generate_config(args.hosts, args.items)
+    print("Source size: {:.2f} MB".format(len(source) / 1024 / 1024))
+    loaders = [("SafeLoader", yaml.SafeLoader)]
+    if yaml.__with_libyaml__:
+        loaders.append(("CSafeLoader", yaml.CSafeLoader))
+    results = {}
+    for name, loader in loaders:
+        elapsed, results[name] = measure(source, loader, args.runs)
+        print("{:<12} {:8.3f} s".format(name, elapsed))
+    documents = list(results.values())
+    if any(document != documents[0] for document in documents):
+        print("Loaders disagree on the loaded document!")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    exit(run_benchmark())
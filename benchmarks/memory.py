@@ -0,0 +1,61 @@
+"""Measure the peak memory used to compile a synthetic fleet.
+
+Run it from the repository root with `python -m benchmarks.memory`.  Use a
+fresh process for each measurement, as the peak RSS never decreases.
+
+The peak RSS includes the YAML loading, which dominates it: PyYAML builds
+the node graph of the whole document before constructing it.  With
+`--trace`, the memory held by the compiled config alone is measured too,
+at the cost of a slower compilation."""
+import os
+import time
+import resource
+import tempfile
+import tracemalloc
+from argparse import ArgumentParser
+
+from benchmarks.synthetic import generate_config
+from edgar.edgar import Edgar
+
+
+def peak_rss():
+    # ru_maxrss is given in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_benchmark():
+    parser = ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--hosts", type=int, default=100000)
+    parser.add_argument("--items", type=int, default=17)
+    parser.add_argument("--trace", action="store_true")
+    args = parser.parse_args()
+
+    # Each synthetic team holds a loop over items, 2 dict items and a db
+    teams = max(1, args.hosts // (args.items + 3))
+    with tempfile.TemporaryDirectory() as tmpdir:
+        source = os.path.join(tmpdir, "edgar.yml")
+        with open(source, "w") as f:
+            f.write(generate_config(teams, args.items))
+        before = peak_rss()
+        start = time.perf_counter()
+        e = Edgar(source, os.path.join(tmpdir, "config"))
+        e.write()
+        elapsed = time.perf_counter() - start
+        print("Hosts: {}".format(len(e.config)))
+        print("Time: {:.2f} s".format(elapsed))
+        print("Peak RSS: {:.1f} MB (before compiling: {:.1f} MB)".format(
+            peak_rss(), before
+        ))
+        if args.trace:
+            e._config = None
+            tracemalloc.start()
+            e.config
+            print("Compiled config: {:.1f} MB".format(
+                tracemalloc.get_traced_memory()[0] / 1024 / 1024
+            ))
+            tracemalloc.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    exit(run_benchmark())
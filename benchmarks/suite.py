@@ -0,0 +1,206 @@
+"""Measure how edgar scales on synthetic fleets of various shapes.
+
+Run it from the repository root with `python -m benchmarks.suite`.  Each
+scenario times the YAML loading, the blocks expansion, the stringify step
+and the write step separately, keeping the best of a few runs, and
+records the peak memory.  Each scenario runs in a process of its own,
+so that its peak memory does not include the one of previous scenarios.
+Results can be saved as JSON and compared with the ones of another
+release."""
+import os
+import sys
+import json
+import time
+import platform
+import resource
+import tempfile
+import datetime
+import tracemalloc
+import multiprocessing
+from argparse import ArgumentParser
+from concurrent.futures import ProcessPoolExecutor
+
+import edgar
+from benchmarks.synthetic import generate_fleet
+from edgar.edgar import Edgar
+
+
+SCENARIOS = {
+    "flat": {"hosts": 20000, "depth": 1, "items": 50},
+    "deep": {"hosts": 20000, "depth": 4, "items": 20},
+    "large-loops": {"hosts": 50000, "depth": 1, "items": 5000},
+    "dict-items": {"hosts": 20000, "depth": 2, "items": 50,
+                   "dict_ratio": 1},
+    "proxies": {"hosts": 20000, "depth": 2, "items": 50,
+                "proxy_ratio": 1},
+    "huge": {"hosts": 100000, "depth": 3, "items": 100},
+}
+
+PHASES = ["load", "parse", "stringify", "write"]
+
+
+def peak_rss():
+    # VmHWM is the peak of the current process image, while ru_maxrss
+    # also covers the parent one it was forked from.  Both are given in
+    # kilobytes on Linux.
+    try:
+        with open("/proc/self/status", "r") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_phases(source, tmpdir, trace=False):
+    timings = {}
+    peaks = {}
+    output = os.path.join(tmpdir, "config")
+    e = Edgar(source, output)
+
+    def phase(name, function):
+        if trace:
+            tracemalloc.start()
+        start = time.perf_counter()
+        result = function()
+        timings[name] = time.perf_counter() - start
+        if trace:
+            peaks[name] = tracemalloc.get_traced_memory()[1] / 1024 / 1024
+            tracemalloc.stop()
+        return result
+
+    conf = phase("load", e.load)
+    e._config = {}
+    phase("parse", lambda: e.compile(conf, e._config))
+    del conf
+    phase("stringify", e.stringify)
+    phase("write", lambda: e.write(force=True))
+    return e, timings, peaks
+
+
+def run_scenario(params, runs=3, trace=False):
+    """Measure a scenario in a new process."""
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+        return executor.submit(measure_scenario, params, runs, trace).result()
+
+
+def measure_scenario(params, runs=3, trace=False):
+    with tempfile.TemporaryDirectory() as tmpdir:
+        source = os.path.join(tmpdir, "edgar.yml")
+        with open(source, "w") as f:
+            f.write(generate_fleet(**params))
+        timings = {}
+        for _ in range(runs):
+            e, run_timings, _ = run_phases(source, tmpdir)
+            for phase, elapsed in run_timings.items():
+                timings[phase] = min(elapsed, timings.get(phase, elapsed))
+        result = {
+            "params": params,
+            "source_bytes": os.path.getsize(source),
+            "blocks": len(e.config),
+            "output_bytes": os.path.getsize(e.output),
+            "phases": timings,
+            "peak_rss_mb": peak_rss(),
+        }
+        if trace:
+            _, _, result["phases_peak_mb"] = run_phases(
+                source, tmpdir, trace=True
+            )
+    return result
+
+
+def print_result(name, result):
+    phases = "  ".join(
+        "{} {:7.3f}s".format(phase, result["phases"][phase])
+        for phase in PHASES
+    )
+    print("{:<12} {:>7} blocks  {}  peak {:.0f} MB".format(
+        name, result["blocks"], phases, result["peak_rss_mb"]
+    ))
+
+
+def compare(results, baseline, tolerance):
+    regressions = []
+    for name, result in results["scenarios"].items():
+        previous = baseline.get("scenarios", {}).get(name)
+        if previous is None or previous["params"] != result["params"]:
+            continue
+        for phase in PHASES:
+            before = previous["phases"].get(phase)
+            after = result["phases"][phase]
+            if not before:
+                continue
+            ratio = after / before
+            flag = ""
+            if ratio > 1 + tolerance:
+                flag = "  REGRESSION"
+                regressions.append((name, phase))
+            print("{:<12} {:<9} {:7.3f}s -> {:7.3f}s  x{:.2f}{}".format(
+                name, phase, before, after, ratio, flag
+            ))
+    return regressions
+
+
+def run_benchmark():
+    parser = ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-s", "--scenario", action="append",
+                        choices=sorted(SCENARIOS),
+                        help="Scenario to run, may be repeated "
+                        "(default: all but huge).")
+    parser.add_argument("--hosts", type=int,
+                        help="Run a custom scenario with this many hosts.")
+    parser.add_argument("--depth", type=int, default=2)
+    parser.add_argument("--items", type=int, default=50)
+    parser.add_argument("--dict-ratio", type=float, default=0.2)
+    parser.add_argument("--proxy-ratio", type=float, default=0.5)
+    parser.add_argument("--runs", type=int, default=3,
+                        help="Keep the best time of this many runs "
+                        "(default: 3).")
+    parser.add_argument("--trace", action="store_true",
+                        help="Also measure the peak memory of each phase "
+                        "with tracemalloc, in a second run.")
+    parser.add_argument("-o", "--output",
+                        help="Save results in this JSON file.")
+    parser.add_argument("--compare",
+                        help="Compare results with this JSON file.")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="Slowdown ratio above which a phase is "
+                        "reported as a regression (default: 0.2).")
+    args = parser.parse_args()
+
+    if args.hosts is not None:
+        scenarios = {"custom": {
+            "hosts": args.hosts, "depth": args.depth, "items": args.items,
+            "dict_ratio": args.dict_ratio, "proxy_ratio": args.proxy_ratio
+        }}
+    else:
+        names = args.scenario or [n for n in SCENARIOS if n != "huge"]
+        scenarios = {name: SCENARIOS[name] for name in names}
+
+    results = {
+        "edgar_version": edgar.__version__,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "date": datetime.datetime.utcnow().isoformat(),
+        "scenarios": {}
+    }
+    for name, params in scenarios.items():
+        result = run_scenario(params, max(1, args.runs), args.trace)
+        results["scenarios"][name] = result
+        print_result(name, result)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.compare:
+        with open(args.compare, "r") as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.tolerance):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(run_benchmark())
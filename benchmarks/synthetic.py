@@ -0,0 +1,113 @@
+import math
+import random
+
+
+def generate_config(hosts=1000, items=10):
+    """Return a synthetic edgar YAML source.
+
+The resulting document holds `hosts` top-level blocks.  Each of them
+hides a group of sub-blocks: one expanded over a `range` of `items`
+elements, one expanded over a list of dict items and a plain one."""
+    lines = [
+        "---",
+        "Compression: yes",
+        "ServerAliveInterval: 120",
+        "blocks:"
+    ]
+    for number in range(hosts):
+        network = f"10.{number // 256 % 256}.{number % 256}"
+        lines += [
+            f"  - Host: team{number}-",
+            f"    User: user{number}",
+            "    hide: yes",
+            "    blocks:",
+            "      - Host: node{item}",
+            f"        Hostname: {network}.{{item}}",
+            f"        ViaProxy: gw{number % 7}",
+            f"        with_items: range({items})",
+            "      - Host: \"{item.name}\"",
+            f"        Hostname: \"{network}.{{item.id}}\"",
+            "        ForwardAgent: no",
+            "        with_items:",
+            "          - id: 250",
+            "            name: web",
+            "          - id: 251",
+            "            name: cache",
+            "      - Host: db",
+            f"        Hostname: db{number}.example.com",
+            "        Port: 2222",
+            f"        IdentityFile: \"~/.ssh/id_{number}\"",
+        ]
+    return "\n".join(lines) + "\n"
+
+
+def generate_fleet(hosts=10000, depth=2, items=50, dict_ratio=0.2,
+                   proxy_ratio=0.5, seed=42):
+    """Return a synthetic edgar YAML source describing a fleet.
+
+The fleet holds about `hosts` expanded hosts.  They are produced by
+leaf blocks looping over `items` items, nested in `depth` levels of
+hidden group blocks.  A `dict_ratio` part of the leaves loops over a
+list of dict items instead of a `range`, and a `proxy_ratio` part of them
+goes through a `ViaProxy` gateway.  The same arguments always give the
+same source."""
+    rng = random.Random(seed)
+    leaves = max(1, math.ceil(hosts / items))
+    depth = max(1, depth)
+    fanout = max(1, math.ceil(leaves ** (1 / depth)))
+    lines = [
+        "---",
+        "Compression: yes",
+        "ServerAliveInterval: 120",
+        "ServerAliveCountMax: 2",
+        "blocks:"
+    ]
+    counter = {"leaves": 0}
+
+    def leaf(indent, number):
+        pad = " " * indent
+        out = []
+        if rng.random() < dict_ratio:
+            out += [
+                f"{pad}- Host: \"{{item.name}}\"",
+                f"{pad}  Hostname: \"10.{number % 256}.{{item.id}}\"",
+                f"{pad}  with_items:",
+            ]
+            for index in range(items):
+                out += [
+                    f"{pad}    - id: \"{index // 256}.{index % 256}\"",
+                    f"{pad}      name: h{number}-{index}",
+                ]
+        else:
+            out += [
+                f"{pad}- Host: h{number}-{{item}}",
+                f"{pad}  Hostname: \"10.{number % 256}.0.{{item}}\"",
+                f"{pad}  with_items: range({items})",
+            ]
+        if rng.random() < proxy_ratio:
+            out.append(f"{pad}  ViaProxy: gw{number % 16}")
+        return out
+
+    def group(indent, level):
+        out = []
+        for index in range(fanout):
+            if counter["leaves"] >= leaves:
+                break
+            pad = " " * indent
+            if level == depth:
+                out += leaf(indent, counter["leaves"])
+                counter["leaves"] += 1
+                continue
+            out += [
+                f"{pad}- Host: g{level}x{index}",
+                f"{pad}  User: user{rng.randrange(100)}",
+                f"{pad}  Port: {rng.choice([22, 2222])}",
+                f"{pad}  hide: yes",
+                f"{pad}  prefix: no",
+                f"{pad}  blocks:",
+            ]
+            out += group(indent + 4, level + 1)
+        return out
+
+    lines += group(2, 1)
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,121 @@
+import os
+import glob
+import shlex
+
+from .errors import EdgarManifestError, EdgarNoConfigFileFoundError
+
+
+def output_path(template, source):
+    """Return the output file of a source matched by a manifest glob.
+
+`{dir}` is the folder of the source, `{parent}` the name of this folder
+and `{stem}` the source file name without its extension."""
+    source = source.rstrip(os.sep)
+    directory = os.path.dirname(source)
+    try:
+        return template.format(
+            dir=directory or ".",
+            parent=os.path.basename(directory),
+            stem=os.path.splitext(os.path.basename(source))[0],
+        )
+    except (KeyError, IndexError, ValueError) as error:
+        raise EdgarManifestError(f"{template}: invalid placeholder {error}")
+
+
+def read_manifest(stream, base_dir=None, name="manifest"):
+    """Return the (source, output) pairs of a batch manifest.
+
+Each line holds a source and an output file, separated by spaces and
+quoted as in a shell.  Sources may be globs, whose output is then built
+with `output_path`.  Relative paths are relative to `base_dir`.  Blank
+lines and lines starting with `#` are skipped."""
+    base_dir = base_dir and os.path.abspath(base_dir) or ""
+    targets = []
+    outputs = {}
+    for number, line in enumerate(stream, 1):
+        where = f"{name}:{number}"
+        try:
+            fields = shlex.split(line, comments=True)
+        except ValueError as error:
+            raise EdgarManifestError(f"{where}: {error}")
+        if not fields:
+            continue
+        if len(fields) != 2:
+            raise EdgarManifestError(
+                f"{where}: expected a source and an output file"
+            )
+        source, output = (os.path.expanduser(field) for field in fields)
+        source = os.path.join(base_dir, source)
+        if glob.has_magic(source):
+            sources = sorted(glob.glob(source, recursive=True))
+            if not sources:
+                raise EdgarManifestError(f"{where}: {source} matches nothing")
+            pairs = [(match, output_path(output, match)) for match in sources]
+        else:
+            pairs = [(source, output)]
+        for source, output in pairs:
+            output = os.path.join(base_dir, output)
+            if output in outputs:
+                raise EdgarManifestError(
+                    f"{where}: {output} is already written from "
+                    f"{outputs[output]}"
+                )
+            outputs[output] = source
+            targets.append((source, output))
+    return targets
+
+
+def warm_up():
+    """Import compilation modules once per worker process."""
+    from .loader import default_loader
+    from . import edgar  # noqa: F401
+    default_loader()
+
+
+def build_target(target, options):
+    """Compile a (source, output) pair, never raising.
+
+Return a dict describing the result, whose `error` is None on success."""
+    from .diagnostics import Diagnostics
+    from .edgar import Edgar
+
+    source, output = target
+    result = {"source": source, "output": output, "written": False,
+              "error": None, "diagnostics": []}
+    diagnostics = Diagnostics()
+    try:
+        if not os.path.exists(source):
+            # Edgar would fall back to the default source files
+            raise EdgarNoConfigFileFoundError(f"{source} does not exist")
+        e = Edgar(source, output, options.get("cache_dir"), 1, None,
+                  diagnostics, options.get("strict", False), None,
+                  options.get("minimize", False),
+                  options.get("prune", False))
+        result["written"] = e.write(force=options.get("force", False))
+    except Exception as error:
+        result["error"] = f"{type(error).__name__}: {error}"
+    result["diagnostics"] = diagnostics.as_list()
+    return result
+
+
+def build_targets(targets, jobs=1, **options):
+    """Compile each (source, output) pair, yielding their results in order.
+
+With `jobs` greater than 1, targets are spread over a single pool of
+worker processes, which import YAML and the compiler only once.  A
+failing target is reported in its result and does not stop the others.
+`options` are given to each Edgar instance: `cache_dir`, `strict`,
+`minimize`, `prune` and `force`."""
+    targets = list(targets)
+    if jobs <= 1 or len(targets) <= 1:
+        for target in targets:
+            yield build_target(target, options)
+        return
+    from functools import partial
+    from concurrent.futures import ProcessPoolExecutor
+
+    chunksize = max(1, len(targets) // (jobs * 4))
+    with ProcessPoolExecutor(max_workers=jobs,
+                             initializer=warm_up) as executor:
+        yield from executor.map(partial(build_target, options=options),
+                                targets, chunksize=chunksize)
@@ -1,4 +1,4 @@
-from .formatter import format_with_item, format_body_line
+from .formatter import Template, BlockTemplate
 
 
 class Block(object):
@@ -7,11 +7,23 @@ class Block(object):
 OpenSSH client config are organized as a long listing of options
 separated into "blocks".  By block we are referring to group of options
 related to a specific `Match` or `Host` option.
+
+A block is built once for all the items of its `with_items` loop.  Its
+header and body are compiled the first time they are needed and then
+formatted for each of them.
     """
+    __slots__ = (
+        "name", "label", "internals", "config", "name_template",
+        "body_template"
+    )
+
     def __init__(self, block):
         self.name = None
+        self.label = None
         self.internals = {}
         self.config = block
+        self.name_template = None
+        self.body_template = None
 
         self.clean_config()
         self.extract_name_and_type()
@@ -37,31 +49,32 @@ related to a specific `Match` or `Host` option.
         if self.name is None:
             self.name = "*"
             self.internals["type"] = "Host"
+            self.label = "Host *"
             return
+        self.label = "{} {}".format(self.internals["type"], self.name)
         prefix = self.get("prefix_value") or ""
         self.name = prefix + self.name
 
     def get(self, key, default=None):
         return self.internals.get(key, default)
 
-    def header(self):
+    def header(self, item=None):
+        if self.name_template is None:
+            self.name_template = Template(self.name)
         return "{} {}".format(
             self.internals["type"],
-            format_with_item(self.name, self.get("item"))
+            self.name_template.format(item)
         )
 
-    def body(self):
-        body = set()
-        for option, value in self.config.items():
-            line = format_body_line(option, value, self.get("item"))
-            if line is not None:
-                body.add(line)
-        return body
+    def body(self, item=None):
+        if self.body_template is None:
+            self.body_template = BlockTemplate(self.config)
+        return self.body_template.format(item)
 
     def children_config(self):
         if self.name == "*":
             return {}
-        new_config = self.config
+        new_config = self.config.copy()
         if self.internals.get("prefix", True):
             new_config["prefix_value"] = self.name
         return new_config
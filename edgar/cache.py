@@ -0,0 +1,185 @@
+import os
+import marshal
+import hashlib
+
+from . import __version__
+from .files import atomic_open
+from .formatter import VALID_SSH_OPTIONS
+
+
+CACHE_FORMAT = 5
+TREE_FORMAT = 1
+
+
+def default_cache_dir():
+    cache_home = os.environ.get("XDG_CACHE_HOME") or "~/.cache"
+    return os.path.join(os.path.expanduser(cache_home), "edgar")
+
+
+def cache_signature():
+    options = sorted(VALID_SSH_OPTIONS.items())
+    return "{}:{}:{}".format(
+        CACHE_FORMAT, __version__,
+        hashlib.sha256(repr(options).encode("utf-8")).hexdigest()
+    )
+
+
+class BlockCache(object):
+    """A persistent cache of compiled top-level subtrees.
+
+Each entry maps the hash of a subtree source, including the config it
+inherits from its parent and the hash of the inventory files it reads,
+to the list of (header, body) pairs it compiles to and to its diagnostic
+records.  Entries which are not used during a compilation are dropped
+when the cache is saved."""
+    def __init__(self, cache_dir, config_file):
+        name = hashlib.sha256(config_file.encode("utf-8")).hexdigest()
+        self.path = os.path.join(cache_dir, f"blocks-{name[:16]}.marshal")
+        self.entries = {}
+        self.used = {}
+        self.hits = 0
+        self.misses = 0
+
+    def load(self):
+        self.entries = {}
+        try:
+            with open(self.path, "rb") as f:
+                signature, entries = marshal.load(f)
+        except (OSError, EOFError, ValueError, TypeError):
+            return
+        if signature == cache_signature() and isinstance(entries, dict):
+            self.entries = entries
+
+    def save(self):
+        data = marshal.dumps((cache_signature(), self.used))
+        try:
+            with atomic_open(self.path, "wb") as f:
+                f.write(data)
+        except OSError:
+            # A cache which cannot be written is not an error.
+            pass
+
+    def key(self, hosts, config, dependencies=()):
+        source = repr((hosts, config, dependencies)).encode("utf-8")
+        return hashlib.sha256(source).hexdigest()
+
+    def get(self, key):
+        blocks = self.entries.get(key)
+        if blocks is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.used[key] = blocks
+        return blocks
+
+    def set(self, key, blocks):
+        self.used[key] = blocks
+
+
+class MemoryBlockCache(BlockCache):
+    """A block cache only kept in memory, for long running processes.
+
+Entries used during a compilation are available to the next one."""
+    def __init__(self):
+        self.path = None
+        self.entries = {}
+        self.used = {}
+        self.hits = 0
+        self.misses = 0
+
+    def load(self):
+        if self.used:
+            self.entries = self.used
+        self.used = {}
+        self.hits = 0
+        self.misses = 0
+
+    def save(self):
+        pass
+
+
+class TreeCache(object):
+    """A persistent cache of loaded YAML documents.
+
+Each source file is mapped to its size, modification time, content hash
+and loaded document.  A document is only used when all of them match
+the file being compiled.  Documents which marshal cannot serialize,
+like those holding timestamps, are not cached."""
+    def __init__(self, cache_dir, config_file):
+        name = hashlib.sha256(config_file.encode("utf-8")).hexdigest()
+        self.path = os.path.join(cache_dir, f"trees-{name[:16]}.marshal")
+        self.signature = f"{TREE_FORMAT}:{__version__}"
+        self.entries = {}
+        self.used = {}
+        self.changed = False
+
+    def load(self):
+        self.entries = {}
+        self.used = {}
+        self.changed = False
+        try:
+            with open(self.path, "rb") as f:
+                signature, entries = marshal.load(f)
+        except (OSError, EOFError, ValueError, TypeError):
+            return
+        if signature == self.signature and isinstance(entries, dict):
+            self.entries = entries
+
+    def save(self):
+        if not self.changed and self.used.keys() == self.entries.keys():
+            return
+        try:
+            data = marshal.dumps((self.signature, self.used))
+            with atomic_open(self.path, "wb") as f:
+                f.write(data)
+        except (OSError, ValueError):
+            pass
+
+    def key(self, path, data):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return (stat.st_size, stat.st_mtime_ns,
+                hashlib.sha256(data).hexdigest())
+
+    def get(self, path, data, default=None):
+        entry = self.entries.get(path)
+        if entry is None or entry[0] != self.key(path, data):
+            return default
+        self.used[path] = entry
+        return entry[1]
+
+    def set(self, path, data, document):
+        key = self.key(path, data)
+        if key is None:
+            return
+        try:
+            marshal.dumps(document)
+        except ValueError:
+            return
+        self.used[path] = (key, document)
+        self.changed = True
+
+
+class MemoryTreeCache(TreeCache):
+    """A tree cache only kept in memory, keyed on content only."""
+    def __init__(self):
+        self.path = None
+        self.entries = {}
+        self.used = {}
+        self.changed = False
+
+    def load(self):
+        if self.used:
+            self.entries = self.used
+        self.used = {}
+
+    def save(self):
+        pass
+
+    def key(self, path, data):
+        return hashlib.sha256(data).hexdigest()
+
+    def set(self, path, data, document):
+        self.used[path] = (self.key(path, data), document)
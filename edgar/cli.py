@@ -1,35 +1,418 @@
+import os
+import sys
 import edgar
-from .edgar import Edgar
 from argparse import ArgumentParser
 
 
 def run_edgar():
     parser = ArgumentParser(description=edgar.__description__)
     parser.add_argument("-c", "--config", default="~/.config/edgar.yml",
-                        help="Specifies a configuration file to use "
+                        help="Specifies a configuration file, or a folder "
+                        "of *.yml fragments, to use "
                         "(default: ~/.config/edgar.yml).")
     parser.add_argument("-o", "--output", default="~/.ssh/config",
                         help="Specifies the SSH config file name to use "
                         "(default: ~/.ssh/config). "
                         "Use - to print on terminal.")
+    parser.add_argument("-f", "--force", action="store_true",
+                        help="Always write the SSH config file, even when "
+                        "its source did not change since the last run.")
+    parser.add_argument("--shards", metavar="DIR",
+                        help="Write blocks of each top-level subtree in "
+                        "their own file in DIR, included from the SSH "
+                        "config file. Only changed files are written.")
+    parser.add_argument("--minimize", action="store_true",
+                        help="Merge hosts with identical options and write "
+                        "options shared by consecutive hosts only once, "
+                        "without changing the options of any host.")
+    parser.add_argument("--prune", action="store_true",
+                        help="Remove the lines OpenSSH never uses, because "
+                        "an earlier block already sets their option for "
+                        "the same hosts. Use the shadowed command to list "
+                        "them.")
+    parser.add_argument("--cache-dir",
+                        help="Specifies where to keep already loaded "
+                        "sources and compiled blocks "
+                        "(default: ~/.cache/edgar).")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Parse the source and compile every block, "
+                        "without using nor updating the cache.")
+    parser.add_argument("-j", "--jobs", type=int, default=1,
+                        help="Compile top-level blocks with as many "
+                        "processes in parallel (default: 1).")
+    parser.add_argument("--diagnostics", default="text",
+                        choices=["text", "json"],
+                        help="Format of the deprecated options report "
+                        "printed on the standard error output "
+                        "(default: text).")
+    parser.add_argument("--strict", action="store_true",
+                        help="Fail without writing anything if any "
+                        "deprecated option is used.")
+    parser.add_argument("--stats", nargs="?", const="text",
+                        choices=["text", "json"], metavar="FORMAT",
+                        help="Report compilation phases timing and counts "
+                        "on the standard error output, as text or json. "
+                        "The format must be given as --stats=FORMAT "
+                        "(default: text).")
+    parser.add_argument("--profile", metavar="PATH",
+                        help="Profile %(prog)s with cProfile and dump its "
+                        "results in PATH.")
+    parser.add_argument("--debounce", type=float, default=0.2,
+                        help="With watch, seconds to wait for a burst of "
+                        "changes to end before compiling (default: 0.2).")
+    parser.add_argument("--poll", action="store_true",
+                        help="With watch, poll source files for changes "
+                        "instead of using inotify.")
+    parser.add_argument("--manifest", metavar="PATH",
+                        help="With batch, file listing a source and an "
+                        "output file per line, sources being possibly "
+                        "globs (default: read from the standard input).")
+    parser.add_argument("--host-keys", metavar="PATH",
+                        help="With known-hosts, known_hosts file listing "
+                        "the keys of the hosts with plain names, such as "
+                        "written by ssh-keyscan.")
+    parser.add_argument("--known-hosts", metavar="PATH",
+                        default="~/.ssh/edgar_known_hosts",
+                        help="With known-hosts, hashed known_hosts file to "
+                        "write (default: ~/.ssh/edgar_known_hosts).")
+    parser.add_argument("--sample", type=int, metavar="N",
+                        help="With verify, only check N host names picked "
+                        "at random.")
+    parser.add_argument("--json", action="store_true",
+                        help="With resolve, shadowed, batch, verify or "
+                        "diff, print results as JSON.")
+    parser.add_argument("--check", action="store_true",
+                        help="With diff, exit with status 1 if the output "
+                        "file differs from the compiled config.")
     parser.add_argument("-v", "--version", action="store_true",
                         help="Display %(prog)s version information and exit.")
     parser.add_argument("command", nargs="?", default="store",
-                        choices=["store", "show"],
-                        help="What to do. (default writes ~/.ssh/config file)")
-    args = parser.parse_args()
+                        choices=["store", "show", "watch", "resolve",
+                                 "shadowed", "batch", "known-hosts",
+                                 "verify", "diff"],
+                        help="What to do. (default writes ~/.ssh/config "
+                        "file, watch writes it again each time its source "
+                        "changes, resolve prints the options applying to "
+                        "the given host names, shadowed lists the lines "
+                        "--prune would remove, batch writes every output "
+                        "file of a manifest, known-hosts writes a hashed "
+                        "known_hosts file for the compiled hosts, verify "
+                        "compares the options of the compiled hosts with "
+                        "the ones given by ssh -G, diff lists the blocks "
+                        "the output file would change)")
+    parser.add_argument("hostnames", nargs="*",
+                        help="With resolve, host names to look up. They are "
+                        "read from the standard input if none is given. "
+                        "With verify, host names to check instead of all "
+                        "the compiled ones.")
+    args = parser.parse_args(stats_arguments(sys.argv[1:]))
+    if args.hostnames and args.command not in ("resolve", "verify"):
+        parser.error("host names are only expected by resolve and verify")
+    if args.manifest and args.command != "batch":
+        parser.error("--manifest is only expected by batch")
+    if args.command == "known-hosts" and not args.host_keys:
+        parser.error("known-hosts expects --host-keys")
+    if args.check and args.command != "diff":
+        parser.error("--check is only expected by diff")
+    if args.command == "diff" and args.output == "-":
+        parser.error("diff expects an output file")
 
     if args.version:
         print("{} - v{}".format(edgar.__description__, edgar.__version__))
         return 0
 
-    e = Edgar(args.config, args.output)
-    if args.command == "show":
-        print(e)
+    if args.profile is None:
+        return run_command(args)
+    import cProfile
+    profiler = cProfile.Profile()
+    try:
+        return profiler.runcall(run_command, args)
+    finally:
+        profiler.dump_stats(args.profile)
+
+
+def stats_arguments(argv):
+    """Give its default format to a bare --stats, so that the word after
+it is never taken for its format, such as the command in `--stats show`."""
+    arguments = []
+    for index, argument in enumerate(argv):
+        if argument == "--":
+            return arguments + argv[index:]
+        arguments.append("--stats=text" if argument == "--stats"
+                         else argument)
+    return arguments
+
+
+def run_command(args):
+    # Compilation modules are only imported once arguments are parsed, to
+    # keep --version, --help and shell completion fast.
+    from .cache import default_cache_dir
+    from .diagnostics import Diagnostics
+    from .edgar import Edgar
+    from .errors import EdgarStrictModeError
+    from .stats import Stats
+
+    if args.command == "watch":
+        return run_watch(args)
+    if args.command == "batch":
+        return run_batch(args)
+    stats = None
+    if args.stats:
+        stats = Stats()
+    diagnostics = Diagnostics()
+    cache_dir = None
+    if not args.no_cache:
+        cache_dir = args.cache_dir or default_cache_dir()
+    e = Edgar(args.config, args.output, cache_dir, max(1, args.jobs), stats,
+              diagnostics, args.strict, args.shards, args.minimize,
+              args.prune)
+    status = 0
+    try:
+        if args.command == "show":
+            print(e)
+        elif args.command == "resolve":
+            resolve(e, args.hostnames or read_hostnames(sys.stdin),
+                    args.json)
+        elif args.command == "shadowed":
+            shadowed(e, args.json)
+        elif args.command == "verify":
+            status = verify(e, args.hostnames, args.sample,
+                            max(1, args.jobs), args.json)
+        elif args.command == "diff":
+            status = diff(e, args.json, args.check)
+        elif args.command == "known-hosts":
+            _, missing = e.write_known_hosts(args.host_keys,
+                                             args.known_hosts, args.force)
+            if missing:
+                print("{} host{} without any key in {}".format(
+                    len(missing), len(missing) > 1 and "s" or "",
+                    args.host_keys
+                ), file=sys.stderr)
+        else:
+            e.write(force=args.force)
+    except EdgarStrictModeError as error:
+        diagnostics.emit(args.diagnostics)
+        if args.diagnostics == "text":
+            print(error, file=sys.stderr)
+        return 1
+    diagnostics.emit(args.diagnostics)
+    if stats is not None and args.stats == "json":
+        print(stats.to_json(), file=sys.stderr)
+    elif stats is not None:
+        print(stats.to_text(), file=sys.stderr)
+    return status
+
+
+def read_hostnames(stream):
+    for line in stream:
+        line = line.strip()
+        if line:
+            yield line
+
+
+def resolve(e, hostnames, as_json=False):
+    resolver = e.resolver()
+    results = resolver.resolve_many(hostnames)
+    if as_json:
+        import json
+        print(json.dumps(dict(results), indent=2))
+        return
+    for index, (hostname, options) in enumerate(results):
+        if index > 0:
+            print()
+        print(hostname)
+        for option, value in options.items():
+            values = value if isinstance(value, list) else [value]
+            for value in values:
+                print(f"  {option} {value}")
+
+
+def shadowed(e, as_json=False):
+    lines = e.shadowed()
+    if as_json:
+        import json
+        print(json.dumps([
+            {"block": header, "option": option, "value": value,
+             "shadowed_by": origin}
+            for header, option, value, origin in lines
+        ], indent=2))
+        return
+    previous = None
+    for header, option, value, origin in lines:
+        if header != previous:
+            if previous is not None:
+                print()
+            print(header)
+            previous = header
+        print(f"  {option} {value} (set by {origin})")
+
+
+def verify(e, hostnames, sample=None, jobs=1, as_json=False):
+    """Check compiled hosts with ssh -G, returning 1 if any fails.
+
+The output file is checked if it is up to date, and a temporary file
+holding the compiled blocks otherwise."""
+    import tempfile
+    from .resolver import literal_names
+    from .verify import Verifier
+
+    blocks = list(e.blocks())
+    if not hostnames:
+        hostnames = list(literal_names(blocks))
+        if sample is not None and sample < len(hostnames):
+            import random
+            indexes = sorted(random.sample(range(len(hostnames)), sample))
+            hostnames = [hostnames[index] for index in indexes]
+    config_file = e.output
+    temporary = None
+    if e.output == "-" or not e.is_up_to_date():
+        temporary = tempfile.NamedTemporaryFile(
+            "w", prefix="edgar-", suffix=".conf", delete=False
+        )
+        with temporary:
+            temporary.write(e.stringify() + "\n")
+        config_file = temporary.name
+    try:
+        verifier = Verifier(blocks, config_file, jobs)
+    except FileNotFoundError as error:
+        print(error, file=sys.stderr)
+        return 1
+    counts = {"verified": 0, "mismatching": 0, "failed": 0}
+    failures = []
+    try:
+        for hostname, mismatches, error in verifier.verify(hostnames):
+            counts["verified"] += 1
+            if error is not None:
+                counts["failed"] += 1
+            elif mismatches:
+                counts["mismatching"] += 1
+            else:
+                continue
+            failures.append({"host": hostname, "error": error,
+                             "mismatches": [
+                                 {"option": option, "intended": intended,
+                                  "actual": actual}
+                                 for option, intended, actual in mismatches
+                             ]})
+            if as_json:
+                continue
+            if error is not None:
+                print(f"{hostname}: {error}")
+                continue
+            print(hostname)
+            for option, intended, actual in mismatches:
+                print(f"  {option}: intended {intended}, got {actual}")
+    finally:
+        if temporary is not None:
+            os.unlink(temporary.name)
+    if as_json:
+        import json
+        print(json.dumps(failures, indent=2))
+    print("{} hosts verified, {} mismatching, {} failed".format(
+        *counts.values()
+    ), file=sys.stderr)
+    return (counts["mismatching"] or counts["failed"]) and 1 or 0
+
+
+def diff(e, as_json=False, check=False):
+    """Print how writing the output file would change its blocks.
+
+With check, return 1 if it would change anything."""
+    result = e.diff()
+    if as_json:
+        import json
+        print(json.dumps({
+            "added": result.added,
+            "removed": result.removed,
+            "moved": result.moved,
+            "changed": [
+                {"block": header, "options": [
+                    {"option": option, "old": old, "new": new}
+                    for option, old, new in changes
+                ]}
+                for header, changes in result.changed
+            ],
+        }, indent=2))
     else:
-        e.write()
-    return 0
+        for header in result.removed:
+            print(f"- {header}")
+        for header in result.added:
+            print(f"+ {header}")
+        for header in result.moved:
+            print(f"> {header}")
+        for header, changes in result.changed:
+            print(f"~ {header}")
+            for option, old, new in changes:
+                print("    {}: {} -> {}".format(
+                    option, ", ".join(old) or "(unset)",
+                    ", ".join(new) or "(unset)"
+                ))
+    print("{} added, {} removed, {} changed, {} moved".format(
+        len(result.added), len(result.removed), len(result.changed),
+        len(result.moved)
+    ), file=sys.stderr)
+    return (check and result) and 1 or 0
+
+
+def run_batch(args):
+    from .batch import build_targets, read_manifest
+    from .cache import default_cache_dir
+    from .errors import EdgarManifestError
+
+    try:
+        if args.manifest in (None, "-"):
+            targets = read_manifest(sys.stdin, name="<stdin>")
+        else:
+            with open(args.manifest, "r") as f:
+                targets = read_manifest(f, os.path.dirname(args.manifest),
+                                        args.manifest)
+    except (OSError, EdgarManifestError) as error:
+        print(error, file=sys.stderr)
+        return 1
+    cache_dir = None
+    if not args.no_cache:
+        cache_dir = args.cache_dir or default_cache_dir()
+    results = build_targets(targets, max(1, args.jobs), cache_dir=cache_dir,
+                            strict=args.strict, minimize=args.minimize,
+                            prune=args.prune, force=args.force)
+    counts = {"written": 0, "up to date": 0, "failed": 0}
+    if args.json:
+        import json
+        results = list(results)
+        print(json.dumps(results, indent=2))
+    for result in results:
+        if result["error"] is not None:
+            counts["failed"] += 1
+        elif result["written"]:
+            counts["written"] += 1
+        else:
+            counts["up to date"] += 1
+        if args.json:
+            continue
+        for record in result["diagnostics"]:
+            print("{}: {} (in {}, {} time{})".format(
+                result["source"], record["message"], record["path"],
+                record["count"], record["count"] > 1 and "s" or ""
+            ), file=sys.stderr)
+        if result["error"] is not None:
+            print("{}: {}".format(result["source"], result["error"]),
+                  file=sys.stderr)
+    print(", ".join(f"{count} {state}" for state, count in counts.items()),
+          file=sys.stderr)
+    return counts["failed"] and 1 or 0
+
+
+def run_watch(args):
+    from .edgar import Edgar
+    from .watch import watch
+
+    def factory(diagnostics):
+        return Edgar(args.config, args.output, None, max(1, args.jobs),
+                     None, diagnostics, args.strict, args.shards,
+                     args.minimize, args.prune)
+
+    return watch(factory, args.debounce, args.poll)
 
 
 if __name__ == "__main__":
-    run_edgar()
+    sys.exit(run_edgar())
@@ -0,0 +1,61 @@
+import sys
+import json
+
+from .formatter import deprecation_message
+
+
+class Diagnostics(object):
+    """Warnings collected while compiling a source file.
+
+Each deprecated option is recorded once per block writing it, along
+with the path of this block in the source tree and the number of
+generated host blocks it affects, including the ones of sub-blocks
+inheriting it.  They are then all reported at once."""
+    def __init__(self):
+        self.records = {}
+
+    def __len__(self):
+        return len(self.records)
+
+    def clear(self):
+        self.records = {}
+
+    def deprecated(self, option, path, count=1):
+        key = (option, path)
+        self.records[key] = self.records.get(key, 0) + count
+
+    def merge(self, records, prefix=()):
+        for (option, path), count in records.items():
+            self.deprecated(option, prefix + path, count)
+
+    def as_list(self):
+        return [{"option": option,
+                 "message": deprecation_message(option),
+                 "path": " > ".join(path),
+                 "count": count}
+                for (option, path), count in self.records.items()]
+
+    def to_json(self):
+        return json.dumps(self.as_list(), indent=2)
+
+    def to_text(self):
+        paths = {}
+        for (option, path), count in self.records.items():
+            paths.setdefault(option, []).append((path, count))
+        lines = []
+        for option, occurrences in paths.items():
+            lines.append(deprecation_message(option))
+            for path, count in occurrences:
+                lines.append("  in {} ({} time{})".format(
+                    " > ".join(path), count, count > 1 and "s" or ""
+                ))
+        return "\n".join(lines)
+
+    def emit(self, output_format="text", stream=None):
+        if len(self) == 0:
+            return
+        if output_format == "json":
+            report = self.to_json()
+        else:
+            report = self.to_text()
+        print(report, file=stream or sys.stderr)
@@ -0,0 +1,174 @@
+import os
+import glob
+import shlex
+import hashlib
+from bisect import bisect_left
+
+
+# Headers starting a new block in an OpenSSH config file
+BLOCK_KEYWORDS = {"host", "match"}
+
+# Nesting limit of `Include` lines, as the one of OpenSSH
+MAX_INCLUDE_DEPTH = 16
+
+
+def include_paths(value):
+    """Return the files an `Include` line reads, in the order it does."""
+    paths = []
+    for pattern in shlex.split(value):
+        pattern = os.path.expanduser(pattern)
+        if not os.path.isabs(pattern):
+            pattern = os.path.join(os.path.expanduser("~/.ssh"), pattern)
+        paths.extend(sorted(glob.glob(pattern)))
+    return paths
+
+
+def read_blocks(path, depth=0):
+    """Yield the (header, lines) pair of each block of an OpenSSH config
+file, its lines being `Option value` strings.
+
+Comments and blank lines are skipped.  `Include` lines found before the
+first block, such as the ones of shards, are followed.  A missing file
+has no block."""
+    header = None
+    lines = []
+    try:
+        f = open(path, "r")
+    except FileNotFoundError:
+        return
+    with f:
+        for line in f:
+            words = line.split(None, 1)
+            if not words or words[0].startswith("#"):
+                continue
+            option = words[0]
+            value = words[1].strip() if len(words) > 1 else ""
+            if option.lower() in BLOCK_KEYWORDS:
+                if header is not None:
+                    yield header, lines
+                header = f"{option} {value}"
+                lines = []
+            elif header is not None:
+                lines.append(f"{option} {value}")
+            elif option.lower() == "include" and depth < MAX_INCLUDE_DEPTH:
+                for include in include_paths(value):
+                    yield from read_blocks(include, depth + 1)
+    if header is not None:
+        yield header, lines
+
+
+def block_digest(header, lines):
+    """Return a digest of a block, whatever the order of its lines."""
+    return hashlib.sha256(
+        "\n".join([header] + sorted(lines)).encode("utf-8")
+    ).digest()
+
+
+def compiled_lines(body):
+    """Return the lines of a compiled body, as `format_block` writes them."""
+    return [f"{option} {value}" for option, value in set(body)]
+
+
+def option_changes(old, new):
+    """Return (option, old values, new values) for each option whose
+values differ between two lists of `Option value` lines."""
+    changes = {}
+    for lines, side in ((old, 0), (new, 1)):
+        for line in lines:
+            option, _, value = line.partition(" ")
+            change = changes.setdefault(option.lower(), [option, [], []])
+            if side == 1:
+                change[0] = option
+            change[side + 1].append(value)
+    return [
+        (option, sorted(old_values), sorted(new_values))
+        for option, old_values, new_values in changes.values()
+        if sorted(old_values) != sorted(new_values)
+    ]
+
+
+def out_of_order(positions):
+    """Return the indexes of the positions outside of a longest increasing
+subsequence of them: the fewest items to move for the others to be in
+order."""
+    tails = []
+    tail_positions = []
+    previous = [None] * len(positions)
+    for index, position in enumerate(positions):
+        length = bisect_left(tail_positions, position)
+        if length > 0:
+            previous[index] = tails[length - 1]
+        if length == len(tails):
+            tails.append(index)
+            tail_positions.append(position)
+        else:
+            tails[length] = index
+            tail_positions[length] = position
+    kept = set()
+    index = tails[-1] if tails else None
+    while index is not None:
+        kept.add(index)
+        index = previous[index]
+    return [index for index in range(len(positions)) if index not in kept]
+
+
+class ConfigDiff(object):
+    """Compare compiled blocks with the ones of a written config file.
+
+Each block of the file is reduced to a digest of its lines, in a dict
+keyed by its header, which the digest of the compiled block with the
+same header is looked up in: blocks are thus compared in linear time,
+without keeping the file in memory.  Only the blocks whose digests
+differ are read again from the file, to list their option changes.
+
+Blocks are told apart by their header: a block whose host names change,
+as `minimize` may do, is reported as removed and added.  As OpenSSH
+keeps the first value it obtains for an option, the order of blocks
+matters too: the fewest blocks to move for the others to keep their
+written order are reported as moved."""
+    def __init__(self, blocks, path):
+        self.blocks = list(blocks)
+        self.path = path
+        self.added = []
+        self.removed = []
+        self.changed = []
+        self.moved = []
+
+    def compare(self):
+        """Fill `added`, `removed` and `moved` with headers, and `changed`
+with (header, option changes) pairs, in the order of the compiled
+blocks."""
+        written = {}
+        for header, lines in read_blocks(self.path):
+            if header not in written:
+                written[header] = (len(written),
+                                   block_digest(header, lines))
+        compiled = set()
+        changed = {}
+        kept = []
+        for header, body in self.blocks:
+            lines = compiled_lines(body)
+            compiled.add(header)
+            if header not in written:
+                self.added.append(header)
+                continue
+            position, digest = written[header]
+            kept.append((header, position))
+            if digest != block_digest(header, lines):
+                changed[header] = lines
+        self.moved = [kept[index][0] for index in
+                      out_of_order([position for _, position in kept])]
+        self.removed = [header for header in written
+                        if header not in compiled]
+        pending = dict(changed)
+        if pending:
+            for header, lines in read_blocks(self.path):
+                if header in pending:
+                    changed[header] = option_changes(lines,
+                                                     pending.pop(header))
+        self.changed = list(changed.items())
+        return self
+
+    def __bool__(self):
+        return bool(self.added or self.removed or self.changed or
+                    self.moved)
@@ -1,10 +1,107 @@
 import os
-import yaml
+import re
+import hashlib
 import datetime
+from itertools import islice
+from collections import deque
+from contextlib import nullcontext
 
+from . import __version__
 from .block import Block
-from .errors import EdgarNoConfigFileFoundError
-from .formatter import format_block
+from .cache import BlockCache, TreeCache
+from .diagnostics import Diagnostics
+from .differ import ConfigDiff
+from .errors import (EdgarInvalidFragmentError, EdgarNoConfigFileFoundError,
+                     EdgarStrictModeError)
+from .expressions import block_items, has_loop
+from .files import atomic_open, quote_path
+from .formatter import VALID_SSH_OPTIONS, format_block
+from .inventory import file_digest, find_inventories
+from .known_hosts import KnownHosts
+from .loader import load_yaml
+from .minimizer import Minimizer
+from .pruner import Pruner
+from .resolver import Resolver
+from .stats import Stats
+
+
+def read_header_values(path, field):
+    """Return the values of a field of a generated file header comment."""
+    values = []
+    try:
+        f = open(path, "r")
+    except FileNotFoundError:
+        return values
+    prefix = f"# {field}: "
+    with f:
+        for line in f:
+            if not line.startswith("#"):
+                break
+            if line.startswith(prefix):
+                values.append(line[len(prefix):].strip())
+    return values
+
+
+def read_header_field(path, field):
+    """Return the value of a field of a generated file header comment."""
+    values = read_header_values(path, field)
+    return values[0] if values else None
+
+
+def shard_name(label):
+    """Return a file name for the shard of a top-level block."""
+    name = re.sub(r"[^a-z0-9._-]+", "-", label.lower()).strip("-.")
+    return name[:64] or "block"
+
+
+def config_blocks(config):
+    """Yield the (header, body) pairs of a compiled config in the order
+they are written, `Host *` defaults last."""
+    defaults = None
+    for header, body in config.items():
+        if header == "Host *":
+            defaults = body
+            continue
+        yield header, body
+    if defaults is not None:
+        yield "Host *", defaults
+
+
+def unit_weight(unit):
+    """Return the number of items a unit loops over, 1 if not a list."""
+    hosts = unit[0]
+    if isinstance(hosts, list):
+        hosts = hosts[0]
+    if isinstance(hosts, dict) and isinstance(hosts.get("with_items"),
+                                              list):
+        return max(1, len(hosts["with_items"]))
+    return 1
+
+
+def compile_unit(unit, stats=False, base_dir=None):
+    """Compile a unit, as returned by `Edgar.units`, in a worker process.
+
+Return the compiled unit and, if asked, the worker statistics."""
+    worker = Edgar.__new__(Edgar)
+    worker.stats = stats and Stats() or None
+    worker.diagnostics = None
+    worker.base_dir = base_dir
+    hosts, config, _ = unit
+    compiled = worker.compile_unit(hosts, config)
+    return compiled, stats and worker.stats.counters or None
+
+
+def compile_batch(units, stats=False, base_dir=None):
+    """Compile a batch of units in a worker process, in order."""
+    return [compile_unit(unit, stats, base_dir) for unit in units]
+
+
+SHARD_HEADER = """# Generated by Edgar from {source}
+#
+# Be aware that any manual change to it may be overwritten.
+# Content hash: {digest}
+
+"""
 
 
 class Edgar(object):
@@ -13,61 +110,632 @@ class Edgar(object):
 Edgar compiles its source file into a valid OpenSSH client config file
 and optionally write the results in `~/.ssh/config`.
 
-Edgar expects its source file to be either in `~/.config/edgar.yml` or
-in `~/.edgarrc`.  This source file must be a valid YAML document.  A
-specific source file can be given with the `config_file` argument.
+Edgar expects its source file to be either in `~/.config/edgar.yml`, in
+`~/.edgarrc` or in `~/.config/edgar.d`.  This source file must be a
+valid YAML document.  A specific source file can be given with the
+`config_file` argument.
+
+The source can also be a folder of `*.yml` fragments, which are loaded
+in file name order and compiled as if they were the items of a single
+list: the items of a list fragment are appended to it, a dict fragment
+is appended as one item.  With `jobs` greater than 1, fragments are
+parsed in parallel.
 
 You can specifies the OpenSSH client config file name to use with
 `output_file` argument.  It defaults to `~/.ssh/config`.  If the value
-`-` is given, the result will be printed on the standard output."""
-    def __init__(self, config_file=None, output_file=None):
+`-` is given, the result will be printed on the standard output.
+
+The source file is only parsed when its compiled result is first needed.
+Each written file records a fingerprint of its inputs in its header, so
+that writing it again is skipped when none of them changed.
+
+If a `cache_dir` is given, the loaded document of each source file and
+the compiled result of each top-level subtree are kept there.  Only the
+files and the subtrees which changed since the last compilation are
+processed again.
+
+When `jobs` is greater than 1, top-level subtrees, and loops over more
+than `chunk_size` items, are compiled in parallel by as many processes.
+Their results are merged in their original order.
+
+Compilation statistics are collected into `stats`, if given.
+
+Deprecated options are collected into `diagnostics`.  If none is given,
+they are reported on the standard error output once the compilation is
+done.  In `strict` mode, any of them makes the compilation fail.  Their
+number is recorded in the header of the output file, so that it fails
+too when the output file is up to date.
+
+If a `shard_dir` is given, the blocks of each top-level subtree are
+written to their own file in this folder, and the output file only holds
+`Include` lines for them followed by the `Host *` defaults.  Shards
+whose content did not change are not written again.
+
+With `prune`, the lines OpenSSH never uses, because an earlier block
+already sets their option for the same hosts, are removed.  Blocks left
+empty are dropped.
+
+With `minimize`, hosts with identical bodies are merged into a single
+block, and options shared by consecutive hosts are written only once,
+as long as OpenSSH still gives each host the same options."""
+    chunk_size = 5000
+    batch_size = 16
+
+    def __init__(self, config_file=None, output_file=None, cache_dir=None,
+                 jobs=1, stats=None, diagnostics=None, strict=False,
+                 shard_dir=None, minimize=False, prune=False):
+        self.stats = stats
+        self.minimize = minimize
+        self.prune = prune
+        self.strict = strict
+        self.report_diagnostics = diagnostics is None
+        self.diagnostics = diagnostics
+        if diagnostics is None:
+            self.diagnostics = Diagnostics()
         self.config_file = self.prepare_config_file(config_file)
+        self.base_dir = self.config_file
+        if not os.path.isdir(self.config_file):
+            self.base_dir = os.path.dirname(self.config_file)
+        self.inventories = None
+        self.inventory_digests = {}
         self.output = self.prepare_output(output_file)
+        self.jobs = jobs
+        self.shard_dir = None
+        self.shards = None
+        if shard_dir is not None:
+            self.shard_dir = os.path.abspath(os.path.expanduser(shard_dir))
+            self.shards = {}
+        self.cache = None
+        self.tree_cache = None
+        if cache_dir is not None:
+            self.cache = BlockCache(cache_dir, self.config_file)
+            self.tree_cache = TreeCache(cache_dir, self.config_file)
 
-        with open(self.config_file, "r") as f:
-            conf = yaml.safe_load(f) or {}
-        self.config = {}
-        self.parse(conf)
+        with self.phase("read"):
+            self.sources = []
+            for path in self.fragments():
+                with open(path, "rb") as f:
+                    self.sources.append((path, f.read()))
+        self._config = None
 
     def __str__(self):
         return self.stringify()
 
+    @property
+    def config(self):
+        if self._config is None:
+            # The result is only kept once every step succeeded, and the
+            # strict mode check too, so that a failed compilation is never
+            # written afterwards.
+            config = {}
+            self.diagnostics.clear()
+            if self.shards is not None:
+                self.shards = {}
+            with self.phase("load"):
+                conf = self.load()
+            with self.phase("compile"):
+                self.compile(conf, config)
+            if self.prune:
+                with self.phase("prune"):
+                    config = self.prune_config(config)
+            if self.minimize:
+                with self.phase("minimize"):
+                    config = self.minimize_config(config)
+            if self.report_diagnostics:
+                self.diagnostics.emit()
+            self.check_strict(len(self.diagnostics))
+            self._config = config
+        return self._config
+
+    def fragments(self):
+        """Return the source files, in the order they are compiled."""
+        if not os.path.isdir(self.config_file):
+            return [self.config_file]
+        return sorted(
+            entry.path for entry in os.scandir(self.config_file)
+            if entry.name.endswith(".yml") and entry.is_file()
+        )
+
+    def load(self):
+        """Return the loaded source document.
+
+Fragments of a source folder are merged into a list."""
+        documents = self.load_fragments(self.sources)
+        if not os.path.isdir(self.config_file):
+            conf = documents[0] or {}
+        else:
+            conf = []
+            for (path, _), document in zip(self.sources, documents):
+                if isinstance(document, list):
+                    conf.extend(document)
+                elif isinstance(document, dict):
+                    conf.append(document)
+                elif document is not None:
+                    raise EdgarInvalidFragmentError(
+                        f"{path} must hold a list or a mapping of blocks"
+                    )
+        self.inventories = sorted(set(find_inventories(conf, self.base_dir)))
+        return conf
+
+    def load_fragments(self, sources):
+        """Load the YAML documents of (path, data) pairs.
+
+Documents are taken from the tree cache when possible.  Others are
+parsed, in parallel if `jobs` is greater than 1."""
+        missing = object()
+        documents = [missing] * len(sources)
+        if self.tree_cache is not None:
+            self.tree_cache.load()
+            documents = [self.tree_cache.get(path, data, missing)
+                         for path, data in sources]
+        todo = [index for index, document in enumerate(documents)
+                if document is missing]
+        if self.jobs > 1 and len(todo) > 1:
+            from concurrent.futures import ProcessPoolExecutor
+            with ProcessPoolExecutor(max_workers=self.jobs) as executor:
+                loaded = executor.map(
+                    load_yaml, [sources[index][1] for index in todo]
+                )
+                loaded = list(loaded)
+        else:
+            loaded = [load_yaml(sources[index][1]) for index in todo]
+        for index, document in zip(todo, loaded):
+            documents[index] = document
+            if self.tree_cache is not None:
+                self.tree_cache.set(*sources[index], document)
+        if self.tree_cache is not None:
+            self.tree_cache.save()
+        return documents
+
+    def phase(self, name):
+        if self.stats is None:
+            return nullcontext()
+        return self.stats.phase(name)
+
+    def compile(self, conf, result):
+        """Compile a loaded source tree into the `result` dict.
+
+Units are compiled, or taken from the cache, while they are produced,
+and stored in their original order.  With `jobs` greater than 1, they
+are sent to the worker processes in batches of `batch_size` units or
+`chunk_size` items at most, and no more than twice as many batches as
+jobs are in flight, so that a large `with_items_from` inventory is
+never fully in memory."""
+        if self.cache is None and self.jobs == 1 and self.shards is None:
+            self.parse(result, conf)
+            return
+        if self.cache is not None:
+            self.cache.load()
+        # Units waiting to be stored, as [unit, shard, key, entry, batch,
+        # index in batch] lists, and batches, as [units, results] lists.
+        pending = deque()
+        in_flight = deque()
+        batch = [[], None]
+        weight = 0
+        executor = None
+
+        def submit(batch, last=False):
+            nonlocal executor
+            # A pool is not worth starting for a single unit to compile
+            if last and executor is None and len(batch[0]) == 1:
+                hosts, config, _ = batch[0][0]
+                batch[1] = [(self.compile_unit(hosts, config), None)]
+                return
+            if executor is None:
+                from concurrent.futures import ProcessPoolExecutor
+                executor = ProcessPoolExecutor(max_workers=self.jobs)
+            batch[1] = executor.submit(compile_batch, batch[0],
+                                       self.stats is not None, self.base_dir)
+            in_flight.append(batch)
+
+        def store_next():
+            unit, shard, key, entry, batch, index = pending.popleft()
+            if entry is None:
+                if batch[1] is None:
+                    submit(batch, last=True)
+                if not isinstance(batch[1], list):
+                    # Batches are stored in the order they were submitted
+                    in_flight.popleft()
+                    batch[1] = batch[1].result()
+                entry, counters = batch[1][index]
+                if counters is not None:
+                    self.stats.merge(counters)
+                if self.cache is not None:
+                    self.cache.set(key, entry)
+            blocks, records = entry
+            self.diagnostics.merge(records, unit[2])
+            for header, body in blocks:
+                self.store(result, header, body)
+                if self.shards is not None:
+                    self.shards.setdefault(header, shard)
+
+        try:
+            for unit, shard in self.unit_parts(conf):
+                hosts, config, _ = unit
+                key = entry = None
+                if self.cache is not None:
+                    key = self.unit_key(hosts, config)
+                    entry = self.cache.get(key)
+                if entry is None and self.jobs == 1:
+                    entry = self.compile_unit(hosts, config)
+                    if self.cache is not None:
+                        self.cache.set(key, entry)
+                pending.append([unit, shard, key, entry, batch,
+                                len(batch[0])])
+                if entry is None:
+                    batch[0].append(unit)
+                    weight += unit_weight(unit)
+                    if len(batch[0]) >= self.batch_size or \
+                            weight >= self.chunk_size:
+                        submit(batch)
+                        batch, weight = [[], None], 0
+                while pending and (pending[0][3] is not None or
+                                   len(in_flight) > self.jobs * 2):
+                    store_next()
+            while pending:
+                store_next()
+        finally:
+            if executor is not None:
+                executor.shutdown(cancel_futures=True)
+        if self.cache is not None:
+            self.cache.save()
+
+    def unit_parts(self, conf):
+        """Yield the (unit, shard) pair of each unit to compile, loops
+over a lot of items being split with `jobs` greater than 1."""
+        names = set()
+        for unit in self.units(conf):
+            shard = None
+            if self.shards is not None:
+                shard = self.unit_shard(unit, names)
+            parts = [unit]
+            if self.jobs > 1:
+                parts = self.split_unit(*unit)
+            for part in parts:
+                yield part, shard
+
+    def unit_key(self, hosts, config):
+        """Return the block cache key of a unit, covering its inventories."""
+        digests = [self.inventory_digest(path)
+                   for path in find_inventories(hosts, self.base_dir)]
+        return self.cache.key(hosts, config, digests)
+
+    def compile_unit(self, hosts, config):
+        """Compile a unit on its own.
+
+Return its blocks, as a list of (header, body) pairs, and its diagnostic
+records, with block paths relative to the unit."""
+        diagnostics = self.diagnostics
+        self.diagnostics = Diagnostics()
+        try:
+            blocks = {}
+            for header, body in self.expand(hosts, config):
+                if header not in blocks:
+                    blocks[header] = set()
+                elif self.stats is not None:
+                    self.stats.count("duplicates")
+                blocks[header].update(body)
+            blocks = [(header, tuple(sorted(body)))
+                      for header, body in blocks.items()]
+            return blocks, self.diagnostics.records
+        finally:
+            self.diagnostics = diagnostics
+
+    def prune_config(self, config):
+        pruned = dict(Pruner(config_blocks(config)).prune())
+        if self.stats is not None:
+            self.stats.count("pruned", sum(
+                len(body) for body in config.values()
+            ) - sum(len(body) for body in pruned.values()))
+        return pruned
+
+    def shadowed(self):
+        """Return the lines OpenSSH never uses, as found by `Pruner`.
+
+Each one is given as a (header, option, value, shadowing header) tuple."""
+        blocks = list(self.blocks())
+        with self.phase("index"):
+            return [(blocks[index][0], option, value, origin)
+                    for index, option, value, origin
+                    in Pruner(blocks).shadowed()]
+
+    def minimize_config(self, config):
+        segment = None
+        if self.shards is not None:
+            segment = self.shards.get
+        minimizer = Minimizer(config_blocks(config), segment)
+        minimized = dict(minimizer.minimize())
+        if self.shards is not None:
+            for header, origin in minimizer.origins.items():
+                self.shards[header] = self.shards[origin]
+        return minimized
+
+    def units(self, hosts):
+        """Split a source tree into independent top-level subtrees.
+
+Each unit is a (hosts, config, path) tuple.  The two first are to give
+to `parse`, and path is the one of the unit parent block.  Parsing all
+of them in order gives the same result than parsing the whole tree."""
+        if isinstance(hosts, list):
+            for h in hosts:
+                yield [h], {}, ()
+            return
+        if has_loop(hosts):
+            yield hosts, {}, ()
+            return
+        root = hosts.copy()
+        subblocks = root.pop("blocks", None)
+        subblocks = root.pop("hosts", subblocks)
+        yield root, {}, ()
+        if not subblocks:
+            return
+        block = Block(root.copy())
+        config = block.children_config()
+        path = (block.label,)
+        if not isinstance(subblocks, list):
+            yield subblocks, config, path
+            return
+        for h in subblocks:
+            yield [h], config, path
+
+    def split_unit(self, hosts, config, path):
+        """Split a unit looping over a lot of items into smaller ones.
+
+Each part loops over `chunk_size` items at most.  As sub-blocks do not
+depend on items, they are only kept in the first part."""
+        options = hosts[0] if isinstance(hosts, list) else hosts
+        if not isinstance(options, dict) or not has_loop(options):
+            yield hosts, config, path
+            return
+        options = options.copy()
+        items = iter(block_items(options, self.base_dir))
+        first = True
+        while True:
+            chunk = list(islice(items, self.chunk_size))
+            if len(chunk) == 0:
+                return
+            part = options.copy()
+            part["with_items"] = chunk
+            if not first:
+                part.pop("blocks", None)
+                part.pop("hosts", None)
+            first = False
+            if isinstance(hosts, list):
+                yield [part], config, path
+            else:
+                yield part, config, path
+
+    def unit_shard(self, unit, names):
+        """Return the name of the shard holding the blocks of a unit.
+
+Names are built from the unit block label, so that they do not change
+when other top-level blocks are added or removed.  A suffix is added to
+names already in `names`."""
+        hosts, _, _ = unit
+        if isinstance(hosts, list):
+            hosts = hosts[0]
+        if isinstance(hosts, str):
+            label = "Host " + hosts
+        else:
+            label = Block(hosts.copy()).label
+        name = shard_name(label)
+        if name in names:
+            index = 2
+            while f"{name}-{index}" in names:
+                index += 1
+            name = f"{name}-{index}"
+        names.add(name)
+        return name
+
+    def source_files(self):
+        """Return the list of files the compiled config depends on.
+
+A source folder is listed too, since fragments may be added to it."""
+        paths = [path for path, _ in self.sources]
+        if os.path.isdir(self.config_file):
+            paths.insert(0, self.config_file)
+        return paths + self.inventory_files()
+
+    def inventory_files(self):
+        """Return the inventory files read by `with_items_from` loops.
+
+Until the source is loaded, they are the ones listed in the output file
+header by the previous compilation, as they only change with it."""
+        if self.inventories is not None:
+            return self.inventories
+        if self.output == "-":
+            return []
+        return read_header_values(self.output, "Inventory")
+
+    def inventory_digest(self, path):
+        if path not in self.inventory_digests:
+            self.inventory_digests[path] = file_digest(path) or "missing"
+        return self.inventory_digests[path]
+
     def compile_time(self):
         return datetime.datetime.utcnow().isoformat()
 
-    def write(self):
+    def fingerprint(self):
+        digest = hashlib.sha256()
+        options = sorted(VALID_SSH_OPTIONS.items())
+        parts = [self.config_file, __version__, repr(options)]
+        if self.shard_dir is not None:
+            parts.append(self.shard_dir)
+        if self.minimize:
+            parts.append("minimize")
+        if self.prune:
+            parts.append("prune")
+        for part in parts:
+            digest.update(part.encode("utf-8") + b"\0")
+        for path, data in self.sources:
+            digest.update(path.encode("utf-8") + b"\0")
+            digest.update(data)
+        for path in self.inventory_files():
+            digest.update(path.encode("utf-8") + b"\0")
+            digest.update(self.inventory_digest(path).encode("utf-8"))
+        return digest.hexdigest()
+
+    def check_strict(self, deprecated):
+        if self.strict and deprecated > 0:
+            raise EdgarStrictModeError(
+                "{} uses deprecated options".format(self.config_file)
+            )
+
+    def stored_fingerprint(self):
+        if self.output == "-":
+            return None
+        return read_header_field(self.output, "Fingerprint")
+
+    def is_up_to_date(self):
+        with self.phase("check"):
+            return self.stored_fingerprint() == self.fingerprint()
+
+    def write(self, force=False):
         if self.output == "-":
             print(self.stringify())
-            return
-        header = """# Generated by Edgar on {date}
+            return True
+        if not force and self.is_up_to_date():
+            # Deprecated options are only known from the written header
+            self.check_strict(int(read_header_field(
+                self.output, "Deprecated options"
+            ) or 0))
+            return False
+        # Make sure the compilation is not accounted as writing time
+        self.config
+        if self.stats is None:
+            self.write_output()
+            return True
+        format_time = self.stats.phases.get("format", 0)
+        with self.stats.phase("write"):
+            self.write_output()
+        # Blocks formatting is accounted on its own
+        self.stats.phases["write"] -= (
+            self.stats.phases.get("format", 0) - format_time
+        )
+        self.stats.count("bytes", os.path.getsize(self.output))
+        return True
+
+    def output_header(self):
+        inventories = "".join(f"# Inventory: {path}\n"
+                              for path in self.inventory_files())
+        if len(self.diagnostics) > 0:
+            inventories += "# Deprecated options: {}\n".format(
+                len(self.diagnostics)
+            )
+        return """# Generated by Edgar on {date}
 #
 # Be aware that any manual change to it may be overwritten.
 # Source: {source}
+{inventories}# Fingerprint: {fingerprint}
 
 """.format(date=self.compile_time(),
-           source=self.config_file)
-        outputdir = os.path.dirname(self.output)
-        if outputdir != "" and not os.path.exists(outputdir):
-            os.mkdir(outputdir)
-        with open(self.output, "w") as f:
-            f.write(header)
-            f.write(self.stringify() + "\n")
-
-    def parse(self, hosts, config={}):
-        if isinstance(hosts, list):
-            for h in hosts:
-                c = config.copy()
-                if isinstance(h, str):
-                    # We are only dealing with a list of hostname
-                    c.update({"Host": h})
-                else:
-                    c.update(h)
-                self.parse_block(c)
+           source=self.config_file,
+           inventories=inventories,
+           fingerprint=self.fingerprint())
+
+    def write_output(self):
+        if self.shard_dir is not None:
+            self.write_shards()
+            return
+        with atomic_open(self.output) as f:
+            f.write(self.output_header())
+            previous = None
+            for block in self.iter_blocks():
+                if previous is not None:
+                    f.write(previous + "\n\n")
+                previous = block
+            if previous is not None:
+                f.write(previous.rstrip())
+            f.write("\n")
+
+    def write_shards(self):
+        """Write each shard which changed, then the output file including
+them.
+
+Shards are included in the order of their first block, and `Host *`
+defaults come after all of them, so OpenSSH reads blocks in the same
+order than from a single file.  Shards left by a previous run are
+removed once the output file is written, so that it never includes a
+missing shard."""
+        shards = {}
+        defaults = None
+        headers = [header for header in self.config if header != "Host *"]
+        blocks = self.iter_blocks()
+        for header, block in zip(headers, blocks):
+            shards.setdefault(self.shards[header], []).append(block)
+        defaults = next(blocks, None)
+
+        paths = []
+        for name, shard_blocks in shards.items():
+            path = os.path.join(self.shard_dir, name + ".conf")
+            paths.append(path)
+            content = "\n\n".join(shard_blocks).rstrip() + "\n"
+            digest = hashlib.sha256(content.encode("utf-8")).hexdigest()
+            if read_header_field(path, "Content hash") == digest:
+                continue
+            with atomic_open(path) as f:
+                f.write(SHARD_HEADER.format(source=self.config_file,
+                                            digest=digest))
+                f.write(content)
+            if self.stats is not None:
+                self.stats.count("bytes", os.path.getsize(path))
+
+        with atomic_open(self.output) as f:
+            f.write(self.output_header())
+            for path in paths:
+                f.write(f"Include {quote_path(path)}\n")
+            if defaults is not None:
+                f.write("\n" + defaults.rstrip() + "\n")
+        # Only once the output file no longer includes them
+        self.remove_stale_shards(paths)
+
+    def remove_stale_shards(self, paths):
+        if not os.path.isdir(self.shard_dir):
             return
-        self.parse_block(hosts)
+        paths = set(paths)
+        for entry in os.scandir(self.shard_dir):
+            if (not entry.name.endswith(".conf") or not entry.is_file()
+                    or entry.path in paths):
+                continue
+            with open(entry.path, "r") as f:
+                generated = f.readline().startswith("# Generated by Edgar")
+            if generated:
+                os.unlink(entry.path)
+
+    def parse(self, result, hosts, config={}):
+        for header, body in self.expand(hosts, config):
+            self.store(result, header, body)
+
+    def expand(self, hosts, config={}, path=(), origins=None):
+        """Lazily yield the (header, body) pair of each visible block.
+
+Nothing is materialized while walking the tree, thus memory usage only
+depends on its depth, not on the number of generated blocks.  The path
+is the list of labels of the parent blocks, used for diagnostics.
+`origins` maps each inherited option of `config` to the path of the
+block writing it, which defaults to the one of the parent block."""
+        if origins is None:
+            origins = dict.fromkeys(config, path)
+        if not isinstance(hosts, list):
+            yield from self.expand_block(hosts.copy(), path)
+            return
+        for h in hosts:
+            c = config.copy()
+            inherited = origins
+            if isinstance(h, str):
+                # We are only dealing with a list of hostname
+                c["Host"] = h
+            else:
+                c.update(h)
+                inherited = {option: origin
+                             for option, origin in origins.items()
+                             if option not in h}
+            yield from self.expand_block(c, path, inherited)
 
     def prepare_config_file(self, config_file):
-        candidates = ["~/.config/edgar.yml", "~/.edgarrc"]
+        candidates = [
+            "~/.config/edgar.yml", "~/.edgarrc", "~/.config/edgar.d"
+        ]
         if config_file is not None:
             candidates.insert(0, config_file)
 
@@ -89,37 +757,79 @@ You can specifies the OpenSSH client config file name to use with
             return "-"
         return os.path.expanduser(output)
 
+    def iter_blocks(self):
+        if self.stats is None:
+            return self.format_blocks()
+        return self.stats.formatted(self.format_blocks())
+
+    def blocks(self):
+        """Yield (header, body) pairs in the order they are written."""
+        return config_blocks(self.config)
+
+    def format_blocks(self):
+        for header, body in self.blocks():
+            yield format_block(header, body)
+
+    def resolver(self):
+        """Return a Resolver of the compiled blocks."""
+        with self.phase("index"):
+            return Resolver(self.blocks())
+
+    def write_known_hosts(self, host_keys, path, force=False):
+        """Write a hashed known_hosts file for the compiled hosts, with
+their keys listed in the `host_keys` file.
+
+Return whether it was written, and the list of hosts without any key."""
+        known_hosts = KnownHosts(self.blocks(), host_keys, self.jobs)
+        with self.phase("known_hosts"):
+            written = known_hosts.write(os.path.expanduser(path),
+                                        self.config_file, force)
+        return written, known_hosts.missing
+
+    def diff(self):
+        """Compare the compiled blocks with the ones of the output file.
+
+Return a `ConfigDiff` listing the added, removed and changed blocks."""
+        blocks = list(self.blocks())
+        with self.phase("diff"):
+            return ConfigDiff(blocks, self.output).compare()
+
     def stringify(self):
-        content = []
-        defaults = self.config.pop("Host *", None)
-        for header, body in self.config.items():
-            content.append(format_block(header, body))
-        if defaults is not None:
-            content.append(format_block("Host *", defaults))
-        return "\n\n".join(content).strip()
-
-    def store_block(self, block):
-        if block.get("hide"):
+        return "\n\n".join(self.iter_blocks()).strip()
+
+    def store(self, result, header, body):
+        current = result.get(header)
+        if current is None:
+            result[header] = body
             return
-        name = block.header()
-        if name not in self.config:
-            self.config[name] = set()
-        self.config[name] |= block.body()
+        if self.stats is not None:
+            self.stats.count("duplicates")
+        if current is not body:
+            result[header] = tuple(set(current).union(body))
 
-    def process_block(self, block_options):
+    def expand_block(self, block_options, path=(), origins={}):
+        items = block_items(block_options, self.base_dir)
         block = Block(block_options)
-        self.store_block(block)
+        path = path + (block.label,)
         subblocks = block.get("blocks", []) or []
-        if len(subblocks) == 0:
-            return
-        self.parse(subblocks, block.children_config())
-
-    def parse_block(self, block_options):
-        with_items = block_options.pop("with_items", [None])
-        if isinstance(with_items, str):
-            loopiterator = eval(with_items)
-        else:
-            loopiterator = with_items
-        for item in loopiterator:
-            block_options["item"] = item
-            self.process_block(block_options.copy())
+        if self.stats is not None:
+            self.stats.count("blocks")
+            if block.get("hide"):
+                self.stats.count("hidden")
+            items = self.stats.counted(items, "items")
+        for item in items:
+            if not block.get("hide"):
+                yield block.header(item), block.body(item)
+                # Inherited options are reported where they are written
+                for option in block.body_template.deprecated:
+                    self.diagnostics.deprecated(
+                        option, origins.get(option, path)
+                    )
+            if subblocks:
+                # Sub-blocks do not depend on the current item, thus
+                # they are the same for each one of them.
+                config = block.children_config()
+                yield from self.expand(subblocks, config, path, {
+                    option: origins.get(option, path) for option in config
+                })
+                subblocks = None
@@ -4,3 +4,23 @@ class EdgarNotValidSSHKeywordError(KeyError):
 
 class EdgarNoConfigFileFoundError(FileNotFoundError):
     pass
+
+
+class EdgarStrictModeError(ValueError):
+    pass
+
+
+class EdgarInvalidFragmentError(ValueError):
+    pass
+
+
+class EdgarExpressionError(ValueError):
+    pass
+
+
+class EdgarInventoryError(ValueError):
+    pass
+
+
+class EdgarManifestError(ValueError):
+    pass
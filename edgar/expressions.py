@@ -0,0 +1,223 @@
+import ast
+import operator
+from collections.abc import Iterator
+from functools import lru_cache
+from itertools import chain, product
+
+from .errors import EdgarExpressionError
+
+
+def lazy_product(*iterables, **named):
+    """Yield the cartesian product of iterables, one item at a time.
+
+With keyword arguments, items are dicts mapping each name to its value,
+to be used as `{name}` in templates.  Only the iterables are kept in
+memory, never the product itself."""
+    if iterables and named:
+        raise EdgarExpressionError(
+            "product expects either positional or keyword arguments"
+        )
+    if not named:
+        return product(*iterables)
+    names = list(named)
+    return (dict(zip(names, values)) for values in product(*named.values()))
+
+
+def fmt(template, iterable):
+    """Format each item of iterable with template, as in `"{:02d}"`."""
+    return (template.format(item) for item in iterable)
+
+
+def zfill(iterable, width):
+    """Zero-pad each item of iterable to width digits."""
+    return (str(item).zfill(width) for item in iterable)
+
+
+def checked_items(items, text):
+    """Yield the items of a lazy function result, turning the errors its
+arguments give while they are produced into expression errors."""
+    try:
+        yield from items
+    except (TypeError, ValueError, KeyError, IndexError) as error:
+        raise EdgarExpressionError(f"{text}: {error}")
+
+
+LOOP_OPTIONS = ("with_items", "with_nested", "with_items_from")
+
+FUNCTIONS = {
+    "chain": chain,
+    "fmt": fmt,
+    "product": lazy_product,
+    "range": range,
+    "zfill": zfill,
+}
+
+OPERATORS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.FloorDiv: operator.floordiv,
+    ast.Mod: operator.mod,
+}
+
+
+def number(value, text):
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise EdgarExpressionError(
+            f"{text}: arithmetic is only allowed on numbers"
+        )
+    return value
+
+
+class ExpressionCompiler(object):
+    """Compile a `with_items` expression into a function.
+
+Expressions are a small subset of Python: numbers and strings, lists
+and tuples, arithmetic on numbers and calls to the functions listed in
+`FUNCTIONS`.  Names, attributes, subscripts and any other construct are
+refused, thus an expression can not reach anything else."""
+    def __init__(self, text):
+        self.text = text
+
+    def error(self, node):
+        return EdgarExpressionError(
+            "{}: {} is not allowed in with_items expressions".format(
+                self.text, type(node).__name__
+            )
+        )
+
+    def compile(self):
+        try:
+            tree = ast.parse(self.text.strip(), mode="eval")
+        except SyntaxError as error:
+            raise EdgarExpressionError(f"{self.text}: {error.msg}")
+        return self.visit(tree.body)
+
+    def visit(self, node):
+        method = getattr(self, "visit_" + type(node).__name__, None)
+        if method is None:
+            raise self.error(node)
+        return method(node)
+
+    def visit_Constant(self, node):
+        if not isinstance(node.value, (int, float, str)):
+            raise self.error(node)
+        value = node.value
+        return lambda: value
+
+    def visit_List(self, node):
+        elements = [self.visit(element) for element in node.elts]
+        return lambda: [element() for element in elements]
+
+    visit_Tuple = visit_List
+
+    def visit_UnaryOp(self, node):
+        if not isinstance(node.op, (ast.USub, ast.UAdd)):
+            raise self.error(node.op)
+        operand = self.visit(node.operand)
+        sign = isinstance(node.op, ast.USub) and -1 or 1
+        text = self.text
+        return lambda: sign * number(operand(), text)
+
+    def visit_BinOp(self, node):
+        function = OPERATORS.get(type(node.op))
+        if function is None:
+            raise self.error(node.op)
+        left = self.visit(node.left)
+        right = self.visit(node.right)
+        text = self.text
+        return lambda: function(number(left(), text), number(right(), text))
+
+    def visit_Call(self, node):
+        if not isinstance(node.func, ast.Name):
+            raise self.error(node.func)
+        function = FUNCTIONS.get(node.func.id)
+        if function is None:
+            raise EdgarExpressionError(
+                f"{self.text}: unknown function {node.func.id}"
+            )
+        if any(isinstance(arg, ast.Starred) for arg in node.args) or \
+                any(keyword.arg is None for keyword in node.keywords):
+            raise EdgarExpressionError(
+                f"{self.text}: argument unpacking is not allowed"
+            )
+        args = [self.visit(arg) for arg in node.args]
+        keywords = [(keyword.arg, self.visit(keyword.value))
+                    for keyword in node.keywords]
+        text = self.text
+
+        def call():
+            try:
+                result = function(
+                    *[arg() for arg in args],
+                    **{name: value() for name, value in keywords}
+                )
+            except TypeError as error:
+                raise EdgarExpressionError(f"{text}: {error}")
+            if isinstance(result, Iterator):
+                # Lazy results only fail once their items are produced
+                return checked_items(result, text)
+            return result
+        return call
+
+
+@lru_cache(maxsize=None)
+def compile_expression(text):
+    """Return a function evaluating a `with_items` expression.
+
+Expressions are compiled only once, however many blocks use them."""
+    return ExpressionCompiler(text).compile()
+
+
+def loop_items(with_items):
+    """Return the items of a `with_items` value.
+
+Strings are evaluated as expressions, other values are used as is."""
+    if isinstance(with_items, str):
+        items = compile_expression(with_items)()
+        if isinstance(items, (int, float)):
+            raise EdgarExpressionError(
+                f"{with_items}: with_items must give a list of items"
+            )
+        return items
+    return with_items
+
+
+def nested_items(with_nested):
+    """Return the items of a `with_nested` value.
+
+A list of lists or expressions gives tuples of their items, and a
+mapping of names to lists or expressions gives dicts, as `product`
+does."""
+    if isinstance(with_nested, dict):
+        return lazy_product(**{
+            name: loop_items(items) for name, items in with_nested.items()
+        })
+    if not isinstance(with_nested, list):
+        raise EdgarExpressionError(
+            "with_nested must be a list or a mapping of item lists"
+        )
+    return lazy_product(*[loop_items(items) for items in with_nested])
+
+
+def has_loop(options):
+    return any(option in options for option in LOOP_OPTIONS)
+
+
+def block_items(options, base_dir=None):
+    """Pop the loop of block options and return its items.
+
+`with_items_from` paths are relative to `base_dir`.  A block without any
+loop has a single None item."""
+    loops = [option for option in LOOP_OPTIONS if option in options]
+    if len(loops) > 1:
+        raise EdgarExpressionError(
+            "{} can not be used together".format(" and ".join(loops))
+        )
+    if "with_nested" in options:
+        return nested_items(options.pop("with_nested"))
+    if "with_items_from" in options:
+        from .inventory import inventory_path, read_inventory
+        path = options.pop("with_items_from")
+        return read_inventory(inventory_path(path, base_dir))
+    return loop_items(options.pop("with_items", [None]))
@@ -0,0 +1,47 @@
+import os
+from contextlib import contextmanager
+
+
+def default_mode(path):
+    try:
+        return os.stat(path).st_mode & 0o7777
+    except FileNotFoundError:
+        umask = os.umask(0)
+        os.umask(umask)
+        return 0o666 & ~umask
+
+
+@contextmanager
+def atomic_open(path, mode="w"):
+    """Open a temporary file which replaces `path` once closed.
+
+The temporary file is created in the same folder than `path`, is synced
+to disk and then renamed over `path`, thus readers of `path` always see
+either its previous or its new complete content.  If an error happens,
+`path` is left untouched.  Permissions of `path` are kept.  If `path`
+is a symbolic link, the file it points to is replaced instead."""
+    import tempfile
+
+    path = os.path.realpath(path)
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmppath = tempfile.mkstemp(
+        dir=directory, prefix=f".{os.path.basename(path)}."
+    )
+    try:
+        with os.fdopen(fd, mode) as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmppath, default_mode(path))
+        os.replace(tmppath, path)
+    except BaseException:
+        os.unlink(tmppath)
+        raise
+
+
+def quote_path(path):
+    """Quote a path for an OpenSSH config file, if needed."""
+    if any(c.isspace() for c in path):
+        return f'"{path}"'
+    return path
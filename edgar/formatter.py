@@ -1,4 +1,5 @@
 import sys
+from string import Formatter
 from collections import namedtuple
 
 from .errors import EdgarNotValidSSHKeywordError
@@ -125,6 +126,16 @@ VALID_SSH_OPTIONS = {
 }
 
 
+ITEM_TYPES = {}
+
+
+def item_type(keys):
+    keys = tuple(keys)
+    if keys not in ITEM_TYPES:
+        ITEM_TYPES[keys] = namedtuple("Item", keys)
+    return ITEM_TYPES[keys]
+
+
 def format_with_item(text, item):
     if item is None:
         return text
@@ -132,8 +143,7 @@ def format_with_item(text, item):
         try:
             return text.format(**item)
         except KeyError:
-            item_type = namedtuple("Item", item.keys())
-            item = item_type(**item)
+            item = item_type(item.keys())(**item)
     return text.format(item=item)
 
 
@@ -145,7 +155,16 @@ def format_value(value, item):
     return format_with_item(value, item)
 
 
-def format_body_line(option, value, item):
+def deprecation_message(option):
+    return (
+        f"{option} is deprecated and will be ignored by OpenSSH, "
+        "you should remove it now from your configuration as it "
+        "may break in a future version."
+    )
+
+
+def clean_option_name(option):
+    """Return the OpenSSH name of option, or None if it is deprecated."""
     lower_opt = option.lower()
     if lower_opt not in VALID_SSH_OPTIONS:
         raise EdgarNotValidSSHKeywordError(
@@ -153,21 +172,117 @@ def format_body_line(option, value, item):
         )
     clean_option = VALID_SSH_OPTIONS[lower_opt]
     if clean_option in ["Deprecated", "Ignore"]:
-        print(
-            f"{option} is deprecated and will be ignored by OpenSSH, "
-            "you should remove it now from your configuration as it "
-            "may break in a future version.",
-            file=sys.stderr
-        )
         return None
-    value = format_value(value, item)
-    if clean_option == "ViaProxy":
-        clean_option = "ProxyCommand"
-        value = "ssh -W %h:%p " + value
-    return f"{clean_option} {value}"
+    return clean_option
+
+
+class Template(object):
+    """A text to format with loop items, parsed once for all.
+
+Formatting a template gives the same result than `format_with_item`,
+but texts without any replacement field are not formatted again for
+each item, and dict items missing some fields go straight to their
+namedtuple fallback."""
+    __slots__ = ("text", "fields", "constant")
+
+    def __init__(self, text):
+        self.text = text
+        self.fields = None
+        self.constant = None
+        try:
+            self.fields = {
+                field.split(".", 1)[0].split("[", 1)[0]
+                for _, field, _, _ in Formatter().parse(text)
+                if field is not None
+            }
+        except ValueError:
+            # Malformed text, let str.format raise the right error.
+            return
+        if not self.fields:
+            # Only escaped braces remain to be processed.
+            self.constant = text.format()
+
+    def format(self, item):
+        if item is None:
+            return self.text
+        if self.constant is not None:
+            return self.constant
+        if self.fields is None:
+            return format_with_item(self.text, item)
+        if isinstance(item, dict):
+            if self.fields.issubset(item.keys()):
+                return format_with_item(self.text, item)
+            item = item_type(item.keys())(**item)
+        return self.text.format(item=item)
+
+
+class BlockTemplate(object):
+    """The compiled body of a block.
+
+Option names are checked, normalized and interned, and deprecated
+options are listed in `deprecated`, only once when the template is
+built.  Formatting
+the body for a given item then only consists in replacing fields in
+option values.
+
+A body is a tuple of (option, value) pairs.  Pairs whose value does not
+depend on the item are shared by all the formatted bodies."""
+    __slots__ = ("default", "constants", "lines", "deprecated")
+
+    def __init__(self, options):
+        default = []
+        constants = []
+        self.lines = []
+        self.deprecated = []
+        for option, value in options.items():
+            clean_option = clean_option_name(option)
+            if clean_option is None:
+                self.deprecated.append(option)
+                continue
+            prefix = ""
+            if clean_option == "ViaProxy":
+                clean_option = "ProxyCommand"
+                prefix = "ssh -W %h:%p "
+            clean_option = sys.intern(clean_option)
+            if isinstance(value, bool):
+                prefix += value and "yes" or "no"
+                value = ""
+            elif not isinstance(value, str):
+                value = str(value)
+            template = Template(value)
+            default.append((clean_option, prefix + value))
+            if template.constant is not None:
+                constants.append((clean_option, prefix + template.constant))
+            else:
+                self.lines.append((clean_option, prefix, template))
+        self.default = tuple(default)
+        self.constants = tuple(constants)
+
+    def format(self, item):
+        if item is None:
+            return self.default
+        if not isinstance(item, dict):
+            # A tuple built from a generator is allocated larger, then
+            # resized: freed, it goes to the free list of another size,
+            # which then grows with each item.  A list gives its size.
+            return self.constants + tuple([
+                (option, prefix + value.format(item))
+                for option, prefix, value in self.lines
+            ])
+        body = list(self.constants)
+        record = None
+        for option, prefix, value in self.lines:
+            if value.fields and not value.fields.issubset(item.keys()):
+                # Build the namedtuple fallback only once for all lines
+                if record is None:
+                    record = item_type(item.keys())(**item)
+                body.append((option, prefix + value.format(record)))
+            else:
+                body.append((option, prefix + value.format(item)))
+        return tuple(body)
 
 
 def format_block(header, body):
-    lines = [f"  {line}" for line in sorted(body)]
+    lines = [f"  {option} {value}" for option, value in sorted(set(body))]
     lines.insert(0, header)
     return "\n".join(lines)
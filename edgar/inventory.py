@@ -0,0 +1,87 @@
+import os
+import csv
+import json
+import mmap
+import hashlib
+
+from .errors import EdgarInventoryError
+
+
+def mapped_lines(path):
+    """Yield the lines of a file, read through a memory map.
+
+Only the current line is copied in memory, whatever the file size."""
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            for line in iter(mapped.readline, b""):
+                yield line.decode("utf-8")
+
+
+def csv_records(path):
+    """Yield the rows of a CSV file as dicts, keyed by its header row."""
+    return csv.DictReader(mapped_lines(path))
+
+
+def jsonl_records(path):
+    """Yield the records of a JSON lines file, skipping blank lines."""
+    for number, line in enumerate(mapped_lines(path), 1):
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError as error:
+            raise EdgarInventoryError(f"{path}:{number}: {error}")
+
+
+READERS = {
+    ".csv": csv_records,
+    ".jsonl": jsonl_records,
+    ".ndjson": jsonl_records,
+}
+
+
+def inventory_path(path, base_dir):
+    return os.path.join(base_dir or ".", os.path.expanduser(path))
+
+
+def read_inventory(path):
+    """Return an iterator over the records of an inventory file.
+
+Records are read one at a time, thus memory usage does not depend on
+the inventory size."""
+    reader = READERS.get(os.path.splitext(path)[1].lower())
+    if reader is None:
+        raise EdgarInventoryError(
+            "{}: with_items_from only reads {} files".format(
+                path, ", ".join(sorted(READERS))
+            )
+        )
+    return reader(path)
+
+
+def find_inventories(tree, base_dir):
+    """Yield the path of every inventory file a source tree refers to."""
+    if isinstance(tree, list):
+        for element in tree:
+            yield from find_inventories(element, base_dir)
+    elif isinstance(tree, dict):
+        path = tree.get("with_items_from")
+        if isinstance(path, str):
+            yield inventory_path(path, base_dir)
+        for value in tree.values():
+            if isinstance(value, (list, dict)):
+                yield from find_inventories(value, base_dir)
+
+
+def file_digest(path):
+    """Return the hash of a file content, or None if it can't be read."""
+    digest = hashlib.sha256()
+    try:
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+    except OSError:
+        return None
+    return digest.hexdigest()
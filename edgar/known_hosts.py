@@ -0,0 +1,187 @@
+import os
+import hmac
+import hashlib
+import binascii
+
+from .files import atomic_open
+from .resolver import Resolver, is_literal, literal_names
+
+
+HASH_MAGIC = "|1|"
+SALT_SIZE = hashlib.sha1().digest_size
+SECRET_SIZE = 32
+
+KNOWN_HOSTS_HEADER = """# Generated by Edgar from {source}
+#
+# Be aware that any manual change to it may be overwritten.
+# Host keys: {host_keys}
+
+"""
+
+
+def format_hashed(salt, digest):
+    return "{}{}|{}".format(
+        HASH_MAGIC,
+        binascii.b2a_base64(salt, newline=False).decode("ascii"),
+        binascii.b2a_base64(digest, newline=False).decode("ascii")
+    )
+
+
+def hash_name(name, salt=None):
+    """Hash a host name as `ssh-keygen -H` does."""
+    if salt is None:
+        salt = os.urandom(SALT_SIZE)
+    encoded = name.encode("utf-8")
+    return format_hashed(salt, hmac.digest(salt, encoded, "sha1"))
+
+
+def name_salt(secret, name):
+    """Return the salt of a host name, derived from it with a secret."""
+    return hmac.digest(secret, name.encode("utf-8"), "sha256")[:SALT_SIZE]
+
+
+def hash_names(part):
+    """Hash the names of a (secret, names) part with their own salts."""
+    secret, names = part
+    return [hash_name(name, name_salt(secret, name)) for name in names]
+
+
+def read_secret(path):
+    """Return the secret salts are derived with, creating it if needed.
+
+It is only readable by its owner."""
+    try:
+        with open(path, "rb") as f:
+            secret = f.read()
+        if len(secret) == SECRET_SIZE:
+            return secret
+    except FileNotFoundError:
+        pass
+    secret = os.urandom(SECRET_SIZE)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "wb") as f:
+        f.write(secret)
+    return secret
+
+
+def read_host_keys(path):
+    """Read a known_hosts file with plain host names.
+
+Return a dict mapping each lowercased name to its keys, as `type base64`
+strings, and the list of marker lines, such as `@cert-authority` ones,
+which are kept verbatim."""
+    keys = {}
+    markers = []
+    with open(path, "r") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            if line.startswith("@"):
+                markers.append(line)
+                continue
+            fields = line.split()
+            if len(fields) < 3:
+                continue
+            key = " ".join(fields[1:3])
+            for name in fields[0].lower().split(","):
+                if is_literal(name) and not name.startswith(("!", "|")):
+                    keys.setdefault(name, []).append(key)
+    return keys, markers
+
+
+def known_host_names(options, alias):
+    """Return the names OpenSSH may look a host up with, best first.
+
+The first one is the name it checks the known_hosts files for: its
+`HostKeyAlias`, or else its `Hostname`, with its `Port` if not 22."""
+    options = {option.lower(): value for option, value in options.items()}
+    hostname = str(options.get("hostname", alias))
+    hostname = hostname.replace("%h", alias).replace("%%", "%").lower()
+    if "hostkeyalias" in options:
+        return [str(options["hostkeyalias"]).lower(), hostname, alias]
+    port = str(options.get("port", "22"))
+    names = [hostname, alias]
+    if port != "22":
+        names.insert(0, f"[{hostname}]:{port}")
+    return names
+
+
+class KnownHosts(object):
+    """Build a hashed known_hosts file for the hosts of compiled blocks.
+
+Each literal name of a `Host` block is resolved with a `Resolver` to
+the name OpenSSH checks its host key with, whose keys are then looked
+up in a `host_keys` file listing them with plain host names, such as
+one written by `ssh-keyscan`.
+
+Names are hashed with HMAC-SHA1, in the `|1|salt|hash` format of
+`HashKnownHosts`, `chunk_size` names at a time in parallel if `jobs` is
+greater than 1.  The salt of each name is derived from it with a secret
+kept next to the file, in `path.secret`: hashing a name again gives the
+same line, so the file only changes for new or changed hosts, without
+trying its existing lines, while names cannot be guessed from their
+salts without the secret."""
+    chunk_size = 2000
+
+    def __init__(self, blocks, host_keys, jobs=1):
+        self.blocks = list(blocks)
+        self.host_keys = host_keys
+        self.jobs = jobs
+        self.missing = []
+
+    def entries(self, keys):
+        """Yield a (name, key) pair for each key of each host.
+
+Hosts without any key are listed in `missing`."""
+        resolver = Resolver(self.blocks)
+        seen = set()
+        self.missing = []
+        for alias in literal_names(self.blocks):
+            names = known_host_names(resolver.resolve(alias), alias)
+            if names[0] in seen:
+                continue
+            seen.add(names[0])
+            for name in names:
+                if name in keys:
+                    for key in keys[name]:
+                        yield names[0], key
+                    break
+            else:
+                self.missing.append(alias)
+
+    def lines(self, secret):
+        keys, markers = read_host_keys(self.host_keys)
+        entries = list(self.entries(keys))
+        names = [name for name, _ in entries]
+        parts = [(secret, names[start:start + self.chunk_size])
+                 for start in range(0, len(names), self.chunk_size)]
+        if self.jobs > 1 and len(parts) > 1:
+            from concurrent.futures import ProcessPoolExecutor
+            with ProcessPoolExecutor(max_workers=self.jobs) as executor:
+                results = list(executor.map(hash_names, parts))
+        else:
+            results = [hash_names(part) for part in parts]
+        hashed = [field for result in results for field in result]
+        return [f"{field} {key}" for field, (_, key)
+                in zip(hashed, entries)] + markers
+
+    def write(self, path, source, force=False):
+        """Write the known_hosts file, unless its content did not change.
+
+Return whether it was written."""
+        content = KNOWN_HOSTS_HEADER.format(
+            source=source, host_keys=self.host_keys
+        ) + "".join(line + "\n" for line in
+                    self.lines(read_secret(path + ".secret")))
+        if not force:
+            try:
+                with open(path, "r") as f:
+                    if f.read() == content:
+                        return False
+            except FileNotFoundError:
+                pass
+        with atomic_open(path) as f:
+            f.write(content)
+        return True
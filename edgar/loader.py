@@ -0,0 +1,19 @@
+def default_loader():
+    """Return the fastest available safe YAML loader.
+
+The C based libyaml loader is used when PyYAML has been built with it.
+Otherwise, the pure Python implementation is used.  Both produce the
+same documents."""
+    import yaml
+    return getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+
+def load_yaml(stream, loader=None):
+    """Load a YAML document with the given loader, or the default one.
+
+PyYAML is only imported when a document is actually loaded, as sources
+found in the tree cache do not need it."""
+    import yaml
+    if loader is None:
+        loader = default_loader()
+    return yaml.load(stream, Loader=loader)
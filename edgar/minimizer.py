@@ -0,0 +1,196 @@
+from .resolver import ORDERED_DIRECTIVES, Resolver, is_literal
+
+
+def host_names(header):
+    return header.split()[1:]
+
+
+def line_size(pairs):
+    return sum(len(option) + len(value) + 4 for option, value in pairs)
+
+
+class Minimizer(object):
+    """Rewrite compiled blocks into fewer bytes for the same result.
+
+Two passes are made over the (header, body) pairs of a config:
+
+- blocks with identical bodies are merged into one `Host a b c` block,
+  at the place of the first of them;
+- options shared by a run of consecutive blocks are removed from them
+  and written once, in a `Host a b c` block following the run.  This
+  pass is repeated up to `hoist_passes` times.
+
+Only `Host` blocks made of literal names are rewritten, and never across
+a `Match` block, a block with `Include` lines, nor across `segments`: as
+what an included file sets is unknown, such blocks are left in place.  Thus, the host names of the
+rewritten blocks are the only ones whose options may change.  Each pass
+resolves them with a `Resolver` of the original blocks and of the
+rewritten ones, and rewrites failing to give the same options for all
+of their names are reverted.
+
+`segment` is an optional function giving the segment of a header, such
+as the shard it is written to.  `origins` maps each new header to the
+header of the first block it replaces."""
+    max_names = 256
+    hoist_passes = 3
+
+    def __init__(self, blocks, segment=None):
+        self.blocks = list(blocks)
+        self.segment = segment
+        self.origins = {}
+        self.expected = Resolver(self.blocks)
+
+    def eligible(self, header):
+        names = host_names(header)
+        return (header.startswith("Host ") and header != "Host *"
+                and all(is_literal(name) and not name.startswith("!")
+                        for name in names))
+
+    def segments(self, blocks):
+        """Return the segment of each block, -1 for ineligible blocks."""
+        number = 0
+        previous = None
+        segments = []
+        for header, body in blocks:
+            ordered = any(option in ORDERED_DIRECTIVES for option, _ in body)
+            if ordered or not self.eligible(header):
+                segments.append(-1)
+                if ordered or not header.startswith("Host "):
+                    number += 1
+                continue
+            key = self.segment and self.segment(header)
+            if key != previous:
+                number += 1
+                previous = key
+            segments.append(number)
+        return segments
+
+    def minimize(self):
+        blocks = self.verified(self.merge, self.blocks)
+        # Options shared by shorter runs are hoisted by later passes
+        for _ in range(self.hoist_passes):
+            hoisted = self.verified(self.hoist, blocks)
+            if hoisted == blocks:
+                break
+            blocks = hoisted
+        return blocks
+
+    def verified(self, rewrite, blocks):
+        """Apply a rewrite pass, reverting its failing changes.
+
+The pass returns the rewritten blocks and a list of (names, change) for
+each change it made.  Changes whose names do not resolve as before are
+disabled until the pass gives the same results."""
+        disabled = set()
+        while True:
+            result, changes = rewrite(blocks, disabled)
+            if not changes:
+                return result
+            resolver = Resolver(result)
+            failed = {
+                change for names, change in changes
+                if any(resolver.resolve(name) != self.expected.resolve(name)
+                       for name in names)
+            }
+            if not failed:
+                return result
+            disabled |= failed
+
+    def merge(self, blocks, disabled):
+        """Merge blocks with identical bodies."""
+        segments = self.segments(blocks)
+        groups = {}
+        for index, (header, body) in enumerate(blocks):
+            if segments[index] < 0:
+                continue
+            key = (segments[index], frozenset(body))
+            if key not in disabled:
+                groups.setdefault(key, []).append(index)
+        groups = {key: members for key, members in groups.items()
+                  if len(members) > 1}
+        leaders = {}
+        merged = set()
+        for key, members in groups.items():
+            for start in range(0, len(members), self.max_names):
+                part = members[start:start + self.max_names]
+                leaders[part[0]] = (key, part)
+                merged.update(part[1:])
+
+        result = []
+        changes = []
+        headers = {header for header, _ in blocks}
+        for index, (header, body) in enumerate(blocks):
+            if index in merged:
+                continue
+            if index in leaders:
+                key, part = leaders[index]
+                names = [name for member in part
+                         for name in host_names(blocks[member][0])]
+                new_header = "Host " + " ".join(names)
+                if new_header not in headers:
+                    headers.add(new_header)
+                    self.origins[new_header] = self.origins.get(header,
+                                                                header)
+                    result.append((new_header, body))
+                    changes.append((names, key))
+                    continue
+                result.extend(blocks[member] for member in part)
+                continue
+            result.append((header, body))
+        return result, changes
+
+    def runs(self, blocks, segments):
+        """Yield (start, end, shared pairs) runs of blocks worth hoisting."""
+        index = 0
+        while index < len(blocks):
+            if segments[index] < 0:
+                index += 1
+                continue
+            shared = set(blocks[index][1])
+            names = len(blocks[index][0])
+            best = (0, index, shared)
+            end = index + 1
+            while (end < len(blocks) and segments[end] == segments[index]
+                   and end - index < self.max_names):
+                shared = shared & set(blocks[end][1])
+                if not shared:
+                    break
+                names += len(blocks[end][0]) - 4
+                size = line_size(shared)
+                gain = (end - index + 1) * size - (names + 2 + size)
+                if gain > best[0]:
+                    best = (gain, end, shared)
+                end += 1
+            if best[0] > 0:
+                yield index, best[1], best[2]
+                index = best[1] + 1
+            else:
+                index += 1
+
+    def hoist(self, blocks, disabled):
+        """Write options shared by consecutive blocks only once."""
+        segments = self.segments(blocks)
+        headers = {header for header, _ in blocks}
+        result = []
+        changes = []
+        position = 0
+        for start, end, shared in self.runs(blocks, segments):
+            run = blocks[start:end + 1]
+            names = [name for header, _ in run for name in host_names(header)]
+            new_header = "Host " + " ".join(names)
+            key = (start, new_header)
+            result.extend(blocks[position:start])
+            position = end + 1
+            if key in disabled or new_header in headers:
+                result.extend(run)
+                continue
+            for header, body in run:
+                body = tuple(pair for pair in body if pair not in shared)
+                if body:
+                    result.append((header, body))
+            headers.add(new_header)
+            self.origins[new_header] = self.origins.get(run[0][0], run[0][0])
+            result.append((new_header, tuple(sorted(shared))))
+            changes.append((names, key))
+        result.extend(blocks[position:])
+        return result, changes
@@ -0,0 +1,148 @@
+import re
+from bisect import bisect_left
+
+from .resolver import (MULTIPLE_OPTIONS, ORDERED_DIRECTIVES, Resolver,
+                       is_literal, literal_tail, pattern_regex)
+
+
+def option_key(option, value):
+    """Return what a line sets, as far as the lines after it are concerned,
+or None for directives, which never shadow nor are shadowed."""
+    if option in ORDERED_DIRECTIVES:
+        return None
+    if option in MULTIPLE_OPTIONS:
+        return (option.lower(), value)
+    return option.lower()
+
+
+def literal_head(pattern):
+    """Return the part of a pattern before its first wildcard."""
+    return re.split(r"[*?]", pattern, maxsplit=1)[0]
+
+
+class WildcardIndex(object):
+    """Find the wildcard patterns including every name of another one.
+
+Only `*`, `prefix*` and `*suffix` patterns are indexed, by their literal
+part: they include a pattern whose literal head starts with their
+prefix, or whose literal tail ends with their suffix.  Other patterns
+only include themselves."""
+    def __init__(self):
+        self.exact = {}
+        self.prefixes = {}
+        self.suffixes = {}
+
+    def add(self, pattern, value):
+        self.exact.setdefault(pattern, []).append(value)
+        if pattern.startswith("*") and is_literal(pattern[1:]):
+            self.suffixes.setdefault(pattern[1:], []).append(value)
+        elif pattern.endswith("*") and is_literal(pattern[:-1]):
+            self.prefixes.setdefault(pattern[:-1], []).append(value)
+
+    def including(self, pattern):
+        values = list(self.exact.get(pattern, ()))
+        head = literal_head(pattern)
+        for length in range(len(head) + 1):
+            values.extend(self.prefixes.get(head[:length], ()))
+        tail = literal_tail(pattern)
+        for length in range(len(tail) + 1):
+            values.extend(self.suffixes.get(tail[len(tail) - length:], ()))
+        return values
+
+
+class Pruner(object):
+    """Find the lines of compiled blocks OpenSSH never uses.
+
+OpenSSH keeps the first value it obtains for an option, thus a line is
+shadowed when, for every host name its block applies to, an earlier
+block applying to this name already sets the same option.  The values of
+options listed in `MULTIPLE_OPTIONS` are accumulated instead, so only
+repeated values are shadowed.  `Include` lines and other
+`ORDERED_DIRECTIVES` are never shadowed.
+
+Blocks are never compared pairwise: the literal names of a block are
+looked up in a `Resolver` of all of them, and its wildcard patterns are
+only considered covered by earlier `*`, `prefix*` and `*suffix` patterns
+including them.  The analysis is conservative: some shadowed lines may
+be missed, but removing the reported ones never changes the options of
+any host.  `Match` blocks are neither pruned nor taken into account."""
+    def __init__(self, blocks):
+        self.blocks = list(blocks)
+
+    def shadowed(self):
+        """Yield (index, option, value, header) for each shadowed line.
+
+`index` is the one of the block holding the line, and `header` the one
+of the first block setting its option for the same hosts."""
+        hosts = [(index, header) for index, (header, _) in
+                 enumerate(self.blocks)
+                 if header.partition(" ")[0].lower() == "host"]
+        resolver = Resolver(self.blocks)
+        keys = [[option_key(*pair) for pair in body]
+                for body in resolver.bodies]
+        matches = {}
+        wildcards = WildcardIndex()
+        for number, (index, header) in enumerate(hosts):
+            # Patterns are case sensitive, as for OpenSSH
+            patterns = header.split()[1:]
+            negated = [re.compile(pattern_regex(pattern[1:]), re.S)
+                       for pattern in patterns if pattern.startswith("!")]
+            positive = [pattern for pattern in patterns
+                        if not pattern.startswith("!")]
+            covered = None
+            for pattern in positive:
+                if not is_literal(pattern):
+                    earlier = sorted(wildcards.including(pattern))
+                elif any(regex.fullmatch(pattern) for regex in negated):
+                    # The block does not apply to this name
+                    continue
+                else:
+                    if pattern not in matches:
+                        matches[pattern] = resolver.matching_blocks(pattern)
+                    blocks = matches[pattern]
+                    earlier = blocks[:bisect_left(blocks, number)]
+                covered = self.intersect(
+                    covered, self.provided(earlier, keys, hosts)
+                )
+            if covered:
+                for option, value in self.blocks[index][1]:
+                    origin = covered.get(option_key(option, value))
+                    if origin is not None:
+                        yield index, option, value, origin
+            if not negated:
+                for pattern in positive:
+                    if not is_literal(pattern):
+                        wildcards.add(pattern, number)
+
+    def provided(self, numbers, keys, hosts):
+        """Map what blocks set to the header of the first one setting it."""
+        provided = {}
+        for number in numbers:
+            header = hosts[number][1]
+            for key in keys[number]:
+                if key is not None:
+                    provided.setdefault(key, header)
+        return provided
+
+    def intersect(self, covered, provided):
+        if covered is None:
+            return provided
+        return {key: header for key, header in covered.items()
+                if key in provided}
+
+    def prune(self):
+        """Return the blocks without their shadowed lines.
+
+Blocks left without any line are dropped."""
+        shadowed = {}
+        for index, option, value, _ in self.shadowed():
+            shadowed.setdefault(index, set()).add((option, value))
+        blocks = []
+        for index, (header, body) in enumerate(self.blocks):
+            if index in shadowed:
+                body = tuple(pair for pair in body
+                             if pair not in shadowed[index])
+                if not body:
+                    continue
+            blocks.append((header, body))
+        return blocks
@@ -0,0 +1,174 @@
+import re
+
+
+# Options which may be given several times, each value being added to the
+# previous ones instead of being ignored.
+MULTIPLE_OPTIONS = {
+    "CertificateFile", "DynamicForward", "IdentityFile", "LocalForward",
+    "RemoteForward", "SendEnv", "SetEnv"
+}
+
+# Directives read where they are written instead of options: each of them
+# applies, in order, and they neither shadow nor are shadowed by others.
+ORDERED_DIRECTIVES = {"Include"}
+
+
+def is_literal(pattern):
+    return "*" not in pattern and "?" not in pattern
+
+
+def literal_tail(pattern):
+    """Return the part of a pattern after its last wildcard."""
+    return pattern[max(pattern.rfind("*"), pattern.rfind("?")) + 1:]
+
+
+def pattern_regex(pattern):
+    """Translate an OpenSSH host pattern into a regular expression."""
+    return "".join(
+        ".*" if char == "*" else "." if char == "?" else re.escape(char)
+        for char in pattern
+    )
+
+
+def literal_names(blocks):
+    """Yield the literal host names of `Host` blocks, as written, once."""
+    seen = set()
+    for header, _ in blocks:
+        kind, _, patterns = header.partition(" ")
+        if kind.lower() != "host":
+            continue
+        for name in patterns.split():
+            if is_literal(name) and not name.startswith("!") \
+                    and name not in seen:
+                seen.add(name)
+                yield name
+
+
+class PatternIndex(object):
+    """Match host names against a lot of OpenSSH host patterns.
+
+Literal patterns are looked up in a dict.  Wildcard patterns are grouped
+by their literal tail, such as `.example.com` for `*.example.com`, so
+that only the groups whose tail ends the name are tried.  Each group is
+compiled, `chunk_size` patterns at a time, into a regular expression
+made of one optional lookahead per pattern: its capture groups tell
+which patterns matched, while a plain alternation of the same patterns
+quickly skips the chunks where none of them does.  Groups are only
+compiled once a name ends with their tail."""
+    chunk_size = 500
+
+    def __init__(self):
+        self.literals = {}
+        self.wildcards = {}
+        self.buckets = {}
+        self.tail_lengths = []
+
+    def add(self, pattern, value):
+        if is_literal(pattern):
+            self.literals.setdefault(pattern, []).append(value)
+        else:
+            tail = literal_tail(pattern)
+            self.wildcards.setdefault(tail, []).append((pattern, value))
+
+    def compile(self):
+        self.buckets = {}
+        self.tail_lengths = sorted({len(tail) for tail in self.wildcards})
+
+    def compile_chunks(self, patterns):
+        chunks = []
+        for start in range(0, len(patterns), self.chunk_size):
+            chunk = patterns[start:start + self.chunk_size]
+            regexes = [pattern_regex(pattern) for pattern, _ in chunk]
+            prefilter = re.compile(
+                "(?:{})\\Z".format("|".join(regexes)), re.S
+            )
+            matcher = re.compile("".join(
+                f"(?:(?={regex}\\Z)())?" for regex in regexes
+            ), re.S)
+            values = [value for _, value in chunk]
+            chunks.append((prefilter, matcher, values))
+        return chunks
+
+    def match(self, name):
+        """Return the values of all the patterns matching name."""
+        matches = list(self.literals.get(name, ()))
+        for length in self.tail_lengths:
+            if length > len(name):
+                break
+            tail = name[len(name) - length:]
+            chunks = self.buckets.get(tail)
+            if chunks is None:
+                if tail not in self.wildcards:
+                    continue
+                chunks = self.buckets[tail] = self.compile_chunks(
+                    self.wildcards[tail]
+                )
+            for prefilter, matcher, values in chunks:
+                if prefilter.match(name) is None:
+                    continue
+                groups = matcher.match(name).groups()
+                matches.extend(values[index]
+                               for index, group in enumerate(groups)
+                               if group is not None)
+        return matches
+
+
+class Resolver(object):
+    """Find the options OpenSSH applies to host names.
+
+Blocks are (header, body) pairs, in the order of the config file.  As
+OpenSSH does, the first value obtained for an option is kept, except for
+options listed in `MULTIPLE_OPTIONS` whose values are accumulated, and
+for `ORDERED_DIRECTIVES` which are all kept, in the order they are
+written.  A `Host` block applies when one of its patterns matches the
+host name and none of its negated patterns does.  As in OpenSSH,
+patterns are case sensitive.  `Match` blocks depend on the connection
+itself and are ignored."""
+    def __init__(self, blocks):
+        self.bodies = []
+        self.index = PatternIndex()
+        for header, body in blocks:
+            kind, _, patterns = header.partition(" ")
+            if kind.lower() != "host":
+                continue
+            number = len(self.bodies)
+            # Values of the same option keep the order they are written in
+            self.bodies.append(sorted(dict.fromkeys(body),
+                                      key=lambda pair: pair[0]))
+            for pattern in patterns.split():
+                negated = pattern.startswith("!")
+                self.index.add(pattern.lstrip("!"), (number, negated))
+        self.index.compile()
+
+    def matching_blocks(self, hostname):
+        """Return the numbers of the blocks applying to hostname, in order."""
+        matched = set()
+        excluded = set()
+        for number, negated in self.index.match(hostname):
+            if negated:
+                excluded.add(number)
+            else:
+                matched.add(number)
+        return sorted(matched - excluded)
+
+    def resolve(self, hostname):
+        """Return the options applying to hostname.
+
+Options given several times, and directives, are mapped to the list of
+their values."""
+        options = {}
+        for number in self.matching_blocks(hostname):
+            for option, value in self.bodies[number]:
+                if option in ORDERED_DIRECTIVES:
+                    options.setdefault(option, []).append(value)
+                elif option in MULTIPLE_OPTIONS:
+                    values = options.setdefault(option, [])
+                    if value not in values:
+                        values.append(value)
+                elif option not in options:
+                    options[option] = value
+        return options
+
+    def resolve_many(self, hostnames):
+        for hostname in hostnames:
+            yield hostname, self.resolve(hostname)
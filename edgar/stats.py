@@ -0,0 +1,83 @@
+import json
+import time
+from contextlib import contextmanager
+
+
+COUNTERS = {
+    "blocks": "blocks visited",
+    "items": "items expanded",
+    "hidden": "hidden blocks",
+    "duplicates": "duplicate headers merged",
+    "pruned": "shadowed lines pruned",
+    "lines": "lines emitted",
+    "bytes": "bytes written",
+}
+
+
+class Stats(object):
+    """Compilation statistics.
+
+Edgar only collects them when it is given a Stats instance.  Otherwise,
+none of the counting or timing code is ever run."""
+    def __init__(self):
+        self.phases = {}
+        self.counters = dict.fromkeys(COUNTERS, 0)
+
+    def count(self, counter, value=1):
+        self.counters[counter] += value
+
+    def merge(self, counters):
+        for counter, value in counters.items():
+            self.counters[counter] += value
+
+    def add_time(self, phase, elapsed):
+        self.phases[phase] = self.phases.get(phase, 0) + elapsed
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - start)
+
+    def counted(self, items, counter):
+        for item in items:
+            self.counters[counter] += 1
+            yield item
+
+    def formatted(self, blocks):
+        """Time the formatting of blocks and count their lines."""
+        blocks = iter(blocks)
+        while True:
+            start = time.perf_counter()
+            block = next(blocks, None)
+            self.add_time("format", time.perf_counter() - start)
+            if block is None:
+                return
+            self.counters["lines"] += block.count("\n") + 1
+            yield block
+
+    def as_dict(self):
+        return {
+            "phases": self.phases,
+            "total": sum(self.phases.values()),
+            "counters": self.counters
+        }
+
+    def to_json(self):
+        return json.dumps(self.as_dict(), indent=2)
+
+    def to_text(self):
+        lines = ["Phases:"]
+        for phase, elapsed in self.phases.items():
+            lines.append("  {:<26} {:10.3f} ms".format(phase, elapsed * 1000))
+        lines.append("  {:<26} {:10.3f} ms".format(
+            "total", sum(self.phases.values()) * 1000
+        ))
+        lines.append("Counters:")
+        for counter, label in COUNTERS.items():
+            lines.append("  {:<26} {:>10}".format(
+                label, self.counters[counter]
+            ))
+        return "\n".join(lines)
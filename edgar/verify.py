@@ -0,0 +1,144 @@
+import os
+import re
+import shutil
+import subprocess
+
+from .resolver import MULTIPLE_OPTIONS, ORDERED_DIRECTIVES, Resolver
+
+
+BOOLEANS = {"yes": "yes", "true": "yes", "no": "no", "false": "no"}
+
+# Options whose values `ssh -G` prints in seconds
+TIME_OPTIONS = {
+    "connecttimeout", "controlpersist", "forwardx11timeout",
+    "serveraliveinterval"
+}
+TIME_UNITS = {"": 1, "s": 1, "m": 60, "h": 3600, "d": 86400, "w": 604800}
+TIME_VALUE = re.compile(r"(\d+)([smhdw]?)", re.I)
+
+# Options whose values are split into one `ssh -G` line per word
+SPLIT_OPTIONS = {"sendenv"}
+
+# Options whose values `ssh -G` prints in a form too different to compare
+UNCHECKED_OPTIONS = {"rekeylimit"}
+
+# Options whose values OpenSSH reads whatever their case: keywords, and
+# host names it lowercases.  Other values are compared as written.
+CASELESS_OPTIONS = {
+    "addkeystoagent", "addressfamily", "canonicalizehostname",
+    "compression", "controlmaster", "fingerprinthash", "hostkeyalias",
+    "hostname", "ipqos", "loglevel", "pubkeyauthentication", "requesttty",
+    "sessiontype", "stricthostkeychecking", "syslogfacility", "tunnel",
+    "updatehostkeys", "verifyhostkeydns"
+}
+
+
+def seconds(value):
+    """Return a time value, such as `1h30m`, in seconds, or None."""
+    parts = TIME_VALUE.findall(value)
+    if not parts or "".join(a + b for a, b in parts) != value:
+        return None
+    return str(sum(int(number) * TIME_UNITS[unit.lower()]
+                   for number, unit in parts))
+
+
+def normalize(option, value):
+    """Return a value in the form `ssh -G` prints it, as far as possible."""
+    value = " ".join(str(value).replace('"', "").split())
+    if option in TIME_OPTIONS:
+        value = seconds(value) or value
+    value = " ".join(os.path.expanduser(word) for word in
+                     value.replace("[", "").replace("]", "").split(" "))
+    if value.lower() in BOOLEANS:
+        return BOOLEANS[value.lower()]
+    if option in CASELESS_OPTIONS:
+        return value.lower()
+    return value
+
+
+def ssh_options(output):
+    """Parse `ssh -G` output into a dict of lists of normalized values."""
+    options = {}
+    for line in output.splitlines():
+        option, _, value = line.partition(" ")
+        option = option.lower()
+        options.setdefault(option, []).append(normalize(option, value))
+    return options
+
+
+class Verifier(object):
+    """Compare the options edgar intends for hosts with the ones the local
+OpenSSH client gives them.
+
+Intended options are the ones a `Resolver` of the compiled blocks finds.
+Actual options are printed by `ssh -G -F config_file host`, which only
+evaluates the config file, without any network access.  Host names are
+given to both as written, since their patterns are case sensitive.  Up
+to `jobs` commands run at the same time.
+
+Values are compared after normalizing the forms `ssh -G` prints them
+in: booleans, durations, home folders, brackets, and the case of the
+options listed in `CASELESS_OPTIONS`, others being case sensitive.
+Values using `%` tokens, and algorithm lists changing the defaults, are
+only checked when they are printed as is.  As `Match` blocks are ignored by the
+`Resolver`, hosts they apply to may be reported too."""
+    def __init__(self, blocks, config_file, jobs=4, ssh="ssh"):
+        self.resolver = Resolver(blocks)
+        self.config_file = config_file
+        self.jobs = jobs
+        self.ssh = shutil.which(ssh)
+        if self.ssh is None:
+            raise FileNotFoundError(f"{ssh} is not installed")
+
+    def actual(self, hostname):
+        result = subprocess.run(
+            [self.ssh, "-G", "-F", self.config_file, "--", hostname],
+            stdin=subprocess.DEVNULL, stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE, text=True
+        )
+        if result.returncode != 0:
+            raise RuntimeError(result.stderr.strip() or
+                               f"ssh -G exited with {result.returncode}")
+        return ssh_options(result.stdout)
+
+    def mismatches(self, hostname, actual):
+        """Return (option, intended, actual) for each intended value
+missing from the actual options, which may be None if unset."""
+        mismatches = []
+        for option, value in self.resolver.resolve(hostname).items():
+            key = option.lower()
+            if key in UNCHECKED_OPTIONS or option in ORDERED_DIRECTIVES:
+                continue
+            values = value if option in MULTIPLE_OPTIONS else [value]
+            if key in SPLIT_OPTIONS:
+                values = [word for value in values
+                          for word in str(value).split()]
+            got = actual.get(key, [])
+            if option not in MULTIPLE_OPTIONS:
+                got = got[:1]
+            for value in values:
+                expected = normalize(key, value)
+                if expected in got or "%" in expected or \
+                        expected.startswith(("+", "-", "^")):
+                    continue
+                mismatches.append((option, value, " ".join(got) or None))
+        return mismatches
+
+    def check(self, hostname):
+        """Return the mismatches of hostname, and an error if any."""
+        try:
+            actual = self.actual(hostname)
+        except (OSError, RuntimeError) as error:
+            return hostname, [], str(error)
+        return hostname, self.mismatches(hostname, actual), None
+
+    def verify(self, hostnames):
+        """Yield (hostname, mismatches, error) for each host name, in
+order."""
+        if self.jobs <= 1:
+            for hostname in hostnames:
+                yield self.check(hostname)
+            return
+        from concurrent.futures import ThreadPoolExecutor
+        with ThreadPoolExecutor(max_workers=self.jobs) as executor:
+            yield from executor.map(self.check, hostnames)
@@ -0,0 +1,240 @@
+import os
+import sys
+import time
+import ctypes
+import select
+import struct
+import datetime
+import ctypes.util
+
+from .cache import MemoryBlockCache, MemoryTreeCache
+from .diagnostics import Diagnostics
+
+
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = os.O_CLOEXEC
+
+WATCH_MASK = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM
+              | IN_MOVED_TO | IN_CREATE | IN_DELETE)
+EVENT_HEADER = struct.Struct("iIII")
+
+
+class PollingWatcher(object):
+    """Watch files by polling their status.
+
+It works everywhere, but only notices changes every `interval` seconds.
+"""
+    def __init__(self, paths, interval=0.5):
+        self.paths = set(paths)
+        self.interval = interval
+        self.states = {path: self.state(path) for path in self.paths}
+
+    def state(self, path):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+
+    def poll(self):
+        changed = set()
+        for path in self.paths:
+            state = self.state(path)
+            if state != self.states[path]:
+                self.states[path] = state
+                changed.add(path)
+        return changed
+
+    def wait(self, timeout=None, debounce=0.2):
+        """Wait for watched files to change and return their paths.
+
+Once a change is seen, wait until no other change happens during
+`debounce` seconds.  Return an empty set after `timeout` seconds without
+any change."""
+        start = time.monotonic()
+        changed = self.poll()
+        while not changed:
+            if timeout is not None and time.monotonic() - start >= timeout:
+                return changed
+            time.sleep(self.interval)
+            changed = self.poll()
+        while True:
+            time.sleep(max(debounce, self.interval))
+            burst = self.poll()
+            if not burst:
+                return changed
+            changed |= burst
+
+    def close(self):
+        pass
+
+
+class InotifyWatcher(object):
+    """Watch files with the Linux inotify API.
+
+The folders holding the files are watched instead of the files
+themselves, to notice files replaced by editors or by edgar itself.  A
+watched folder is reported as changed when any file in it changes.
+
+Paths are reported as they were given, but matched with events by their
+absolute path, and by the one of their target for symbolic links."""
+    def __init__(self, paths):
+        self.paths = set(paths)
+        # Absolute and resolved paths of the watched ones
+        self.targets = {}
+        for path in self.paths:
+            self.targets[os.path.abspath(path)] = path
+            self.targets[os.path.realpath(path)] = path
+        libc_name = ctypes.util.find_library("c") or "libc.so.6"
+        self.libc = ctypes.CDLL(libc_name, use_errno=True)
+        if not hasattr(self.libc, "inotify_init1"):
+            raise OSError("inotify is not available")
+        self.fd = self.libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.folders = {}
+        for target, path in self.targets.items():
+            folder = target
+            if not os.path.isdir(path):
+                folder = os.path.dirname(target)
+            if folder in self.folders.values():
+                continue
+            wd = self.libc.inotify_add_watch(
+                self.fd, os.fsencode(folder), WATCH_MASK
+            )
+            if wd < 0:
+                error = ctypes.get_errno()
+                self.close()
+                raise OSError(error, f"Cannot watch {folder}")
+            self.folders[wd] = folder
+
+    def read_events(self, timeout):
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return None
+        changed = set()
+        data = os.read(self.fd, 65536)
+        offset = 0
+        while offset < len(data):
+            wd, _, _, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b"\0")
+            offset += length
+            folder = self.folders.get(wd, "")
+            path = os.path.join(folder, os.fsdecode(name))
+            if path in self.targets:
+                changed.add(self.targets[path])
+            elif folder in self.targets:
+                changed.add(self.targets[folder])
+        return changed
+
+    def wait(self, timeout=None, debounce=0.2):
+        """Wait for watched files to change and return their paths.
+
+Once a change is seen, wait until no other change happens during
+`debounce` seconds.  Return an empty set after `timeout` seconds without
+any change."""
+        start = time.monotonic()
+        changed = set()
+        while not changed:
+            remaining = None
+            if timeout is not None:
+                remaining = timeout - (time.monotonic() - start)
+                if remaining <= 0:
+                    return changed
+            events = self.read_events(remaining)
+            if events is None:
+                return changed
+            changed |= events
+        while True:
+            events = self.read_events(debounce)
+            if events is None:
+                return changed
+            changed |= events
+
+    def close(self):
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+
+def make_watcher(paths, polling=False):
+    if not polling and sys.platform.startswith("linux"):
+        try:
+            return InotifyWatcher(paths)
+        except (OSError, AttributeError):
+            pass
+    return PollingWatcher(paths)
+
+
+def log(message):
+    now = datetime.datetime.now().strftime("%H:%M:%S")
+    print(f"[{now}] {message}", file=sys.stderr, flush=True)
+
+
+class Rebuilder(object):
+    """Compile a source file again and again, keeping the loaded documents
+of its unchanged fragments and the compiled blocks of its unchanged
+top-level subtrees in memory between runs.
+
+`factory` must return a new Edgar instance each time it is called."""
+    def __init__(self, factory):
+        self.factory = factory
+        self.cache = MemoryBlockCache()
+        self.trees = MemoryTreeCache()
+        self.sources = []
+
+    def rebuild(self, force=False):
+        start = time.perf_counter()
+        diagnostics = Diagnostics()
+        e = self.factory(diagnostics)
+        e.cache = self.cache
+        e.tree_cache = self.trees
+        self.sources = e.source_files()
+        try:
+            written = e.write(force=force)
+        finally:
+            diagnostics.emit()
+            # Inventory files are only known once the source is loaded
+            self.sources = e.source_files()
+        elapsed = (time.perf_counter() - start) * 1000
+        if not written:
+            log(f"{e.output} is up to date ({elapsed:.1f} ms)")
+        else:
+            log("Wrote {} in {:.1f} ms ({} blocks compiled, {} reused)".format(
+                e.output, elapsed, self.cache.misses, self.cache.hits
+            ))
+        return written
+
+
+def watch(factory, debounce=0.2, polling=False):
+    """Rebuild the output file each time one of its sources changes."""
+    rebuilder = Rebuilder(factory)
+    watcher = None
+    try:
+        while True:
+            try:
+                rebuilder.rebuild()
+            except Exception as error:
+                if not rebuilder.sources:
+                    # Nothing to watch
+                    raise
+                log(f"Build failed: {error}")
+            if watcher is None or watcher.paths != set(rebuilder.sources):
+                if watcher is not None:
+                    watcher.close()
+                watcher = make_watcher(rebuilder.sources, polling)
+                log("Watching {}".format(", ".join(rebuilder.sources)))
+            watcher.wait(debounce=debounce)
+    except KeyboardInterrupt:
+        return 0
+    finally:
+        if watcher is not None:
+            watcher.close()
@@ -0,0 +1,116 @@
+import io
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stderr, redirect_stdout
+from unittest.mock import patch
+
+from edgar.batch import build_targets, read_manifest
+from edgar.cli import run_edgar
+from edgar.errors import EdgarManifestError
+
+
+class TestBatch(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        for user in ["alice", "bob", "carol"]:
+            self.write(f"users/{user}/edgar.yml", f"""---
+- Host: bastion
+  User: {user}
+""")
+
+    def path(self, name):
+        return os.path.join(self.tmpdir.name, name)
+
+    def write(self, name, content):
+        os.makedirs(os.path.dirname(self.path(name)), exist_ok=True)
+        with open(self.path(name), "w") as f:
+            f.write(content)
+
+    def manifest(self, content):
+        return read_manifest(io.StringIO(content), self.tmpdir.name)
+
+    def test_01_pairs(self):
+        self.assertEqual(self.manifest("""
+# Comments and blank lines are skipped
+users/alice/edgar.yml out/alice.conf
+"users/bob/edgar.yml"  '/etc/ssh/bob config'  # Quoted
+"""), [
+            (self.path("users/alice/edgar.yml"), self.path("out/alice.conf")),
+            (self.path("users/bob/edgar.yml"), "/etc/ssh/bob config"),
+        ])
+
+    def test_02_globs(self):
+        self.assertEqual(
+            self.manifest("users/*/edgar.yml out/{parent}.conf"),
+            [(self.path(f"users/{user}/edgar.yml"),
+              self.path(f"out/{user}.conf"))
+             for user in ["alice", "bob", "carol"]]
+        )
+        self.assertEqual(
+            self.manifest("users/a*/*.yml {dir}/{stem}.conf"),
+            [(self.path("users/alice/edgar.yml"),
+              self.path("users/alice/edgar.conf"))]
+        )
+
+    def test_03_errors(self):
+        for content, message in [
+            ("users/alice/edgar.yml\n", "manifest:1: expected"),
+            ("\nusers/*/edgar.yml out.conf\n", "already written"),
+            ("users/*/nothing.yml out/{parent}\n", "matches nothing"),
+            ("users/*/edgar.yml out/{user}\n", "invalid placeholder"),
+            ("users/alice/edgar.yml 'out\n", "manifest:1: No closing"),
+        ]:
+            with self.assertRaisesRegex(EdgarManifestError, message):
+                self.manifest(content)
+
+    def check_build(self, jobs):
+        self.write("users/bob/edgar.yml", "- Host: [unclosed\n")
+        targets = self.manifest("""
+users/*/edgar.yml out/{parent}.conf
+users/dave/edgar.yml out/dave.conf
+""")
+        results = list(build_targets(targets, jobs))
+        self.assertEqual([result["output"] for result in results],
+                         [self.path(f"out/{user}.conf")
+                          for user in ["alice", "bob", "carol", "dave"]])
+        self.assertEqual([result["written"] for result in results],
+                         [True, False, True, False])
+        self.assertIsNone(results[0]["error"])
+        self.assertIn("ParserError", results[1]["error"])
+        self.assertIn("does not exist", results[3]["error"])
+        with open(self.path("out/carol.conf")) as f:
+            self.assertIn("Host bastion\n  User carol", f.read())
+        self.assertFalse(os.path.exists(self.path("out/bob.conf")))
+
+        results = list(build_targets(targets, jobs))
+        self.assertEqual([result["written"] for result in results],
+                         [False, False, False, False])
+
+    def test_04_build(self):
+        self.check_build(1)
+
+    def test_05_build_in_parallel(self):
+        self.check_build(2)
+
+    def test_06_command(self):
+        manifest = self.path("manifest")
+        with open(manifest, "w") as f:
+            f.write("users/*/edgar.yml out/{parent}.conf\n")
+        argv = ["edgar", "--no-cache", "--manifest", manifest, "batch"]
+        stderr = io.StringIO()
+        with patch("sys.argv", argv), redirect_stderr(stderr):
+            self.assertEqual(run_edgar(), 0)
+        self.assertEqual(stderr.getvalue(),
+                         "3 written, 0 up to date, 0 failed\n")
+
+        self.write("users/bob/edgar.yml", "- Host: [unclosed\n")
+        stderr = io.StringIO()
+        stdout = io.StringIO()
+        with patch("sys.argv", argv + ["--json"]), \
+                redirect_stderr(stderr), redirect_stdout(stdout):
+            self.assertEqual(run_edgar(), 1)
+        self.assertIn('"error": "', stdout.getvalue())
+        self.assertEqual(stderr.getvalue(),
+                         "0 written, 2 up to date, 1 failed\n")
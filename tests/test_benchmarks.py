@@ -0,0 +1,54 @@
+import os
+import tempfile
+import unittest
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from benchmarks.suite import PHASES, peak_rss, run_scenario
+from benchmarks.synthetic import generate_fleet
+from edgar.edgar import Edgar
+
+
+def scenario_after_ballast(size):
+    """Run a small scenario once a ballast of `size` MB has been used.
+
+Return the peak memory of the scenario and the one of the process."""
+    ballast = bytearray(size * 1024 * 1024)
+    result = run_scenario({"hosts": 100, "depth": 2, "items": 10}, runs=1)
+    del ballast
+    return result["peak_rss_mb"], peak_rss()
+
+
+class TestBenchmarks(unittest.TestCase):
+    def test_01_generate_fleet(self):
+        params = {"hosts": 600, "depth": 3, "items": 20,
+                  "dict_ratio": 0.5, "proxy_ratio": 0.5}
+        source = generate_fleet(**params)
+        self.assertEqual(source, generate_fleet(**params))
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "edgar.yml")
+            with open(path, "w") as f:
+                f.write(source)
+            config = Edgar(path, "-").config
+        # All the expanded hosts, plus the Host * defaults
+        self.assertEqual(len(config), 601)
+        self.assertIn("Host h0-0", config)
+
+    def test_02_run_scenario(self):
+        result = run_scenario({"hosts": 100, "depth": 2, "items": 10},
+                              runs=1, trace=True)
+        self.assertEqual(result["blocks"], 101)
+        self.assertEqual(sorted(result["phases"]), sorted(PHASES))
+        self.assertEqual(sorted(result["phases_peak_mb"]), sorted(PHASES))
+        self.assertGreater(result["output_bytes"], 0)
+
+    def test_03_peak_memory_of_each_scenario(self):
+        # Memory used before a scenario is not accounted to it.  The
+        # ballast is used in a process of its own, and kept small.
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=1,
+                                 mp_context=context) as executor:
+            scenario_peak, peak = executor.submit(scenario_after_ballast,
+                                                  48).result()
+        self.assertGreater(peak, 48)
+        self.assertLess(scenario_peak, peak - 24)
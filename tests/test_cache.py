@@ -0,0 +1,152 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from benchmarks.synthetic import generate_config
+from edgar import edgar as edgar_module
+from edgar.edgar import Edgar
+
+
+class TestBlockCache(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.source = os.path.join(self.tmpdir.name, "edgar.yml")
+        self.cache_dir = os.path.join(self.tmpdir.name, "cache")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def compile(self, content, cache=True):
+        with open(self.source, "w") as f:
+            f.write(content)
+        e = Edgar(self.source, "-", cache and self.cache_dir or None)
+        return e, str(e)
+
+    def assertSameAsFullCompile(self, content):
+        _, expected = self.compile(content, cache=False)
+        e, result = self.compile(content)
+        self.assertEqual(result, expected)
+        return e
+
+    def test_01_cold_and_warm_cache(self):
+        content = generate_config(hosts=20, items=3)
+        e = self.assertSameAsFullCompile(content)
+        self.assertEqual(e.cache.hits, 0)
+        self.assertEqual(e.cache.misses, 21)
+        e = self.assertSameAsFullCompile(content)
+        self.assertEqual(e.cache.hits, 21)
+        self.assertEqual(e.cache.misses, 0)
+
+    def test_02_only_changed_subtree_is_compiled(self):
+        content = generate_config(hosts=20, items=3)
+        self.assertSameAsFullCompile(content)
+        e = self.assertSameAsFullCompile(
+            content.replace("User: user7\n", "User: someone\n")
+        )
+        self.assertEqual(e.cache.misses, 1)
+        self.assertEqual(e.cache.hits, 20)
+
+    def test_03_inherited_config_is_part_of_the_key(self):
+        content = """---
+- Host: m
+  User: edgar
+  blocks:
+  - Host: e{item}
+    with_items: range(2)
+  - Host: blog
+    Port: 2222
+"""
+        self.assertSameAsFullCompile(content)
+        e = self.assertSameAsFullCompile(
+            content.replace("User: edgar", "User: sa")
+        )
+        self.assertEqual(e.cache.misses, 1)
+        content = """---
+Host: m
+User: edgar
+blocks:
+- Host: e{item}
+  with_items: range(2)
+- Host: blog
+  Port: 2222
+"""
+        self.assertSameAsFullCompile(content)
+        e = self.assertSameAsFullCompile(
+            content.replace("User: edgar", "User: sa")
+        )
+        self.assertEqual(e.cache.hits, 0)
+        self.assertEqual(e.cache.misses, 3)
+
+    def test_04_duplicate_headers_across_subtrees(self):
+        content = """---
+Compression: yes
+blocks:
+- Host: name
+  User: edgar
+- Host: "*"
+  Port: 22
+- Host: other
+- Host: name
+  Port: 2222
+"""
+        self.assertSameAsFullCompile(content)
+        self.assertSameAsFullCompile(content.replace("2222", "2200"))
+
+    def test_05_corrupt_cache_is_ignored(self):
+        content = generate_config(hosts=5, items=2)
+        e = self.assertSameAsFullCompile(content)
+        with open(e.cache.path, "wb") as f:
+            f.write(b"\x00garbage")
+        e = self.assertSameAsFullCompile(content)
+        self.assertEqual(e.cache.hits, 0)
+        e = self.assertSameAsFullCompile(content)
+        self.assertEqual(e.cache.misses, 0)
+
+
+class TestTreeCache(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.source = os.path.join(self.tmpdir.name, "edgar.yml")
+        self.cache_dir = os.path.join(self.tmpdir.name, "cache")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def parses(self, content=None):
+        """Return how many times YAML is parsed to load the source."""
+        if content is not None:
+            with open(self.source, "w") as f:
+                f.write(content)
+        expected = Edgar(self.source, "-").load()
+        with patch.object(edgar_module, "load_yaml",
+                          wraps=edgar_module.load_yaml) as load_yaml:
+            e = Edgar(self.source, "-", self.cache_dir)
+            self.assertEqual(e.load(), expected)
+            return load_yaml.call_count
+
+    def test_01_unchanged_source_is_not_parsed(self):
+        content = generate_config(hosts=5, items=2)
+        self.assertEqual(self.parses(content), 1)
+        self.assertEqual(self.parses(), 0)
+        self.assertEqual(self.parses(content.replace("user1", "u")), 1)
+        self.assertEqual(self.parses(), 0)
+
+    def test_02_stale_or_corrupt_cache(self):
+        content = generate_config(hosts=5, items=2)
+        self.parses(content)
+        stat = os.stat(self.source)
+        os.utime(self.source, ns=(stat.st_atime_ns,
+                                  stat.st_mtime_ns + 10 ** 9))
+        self.assertEqual(self.parses(), 1)
+        self.assertEqual(self.parses(), 0)
+        e = Edgar(self.source, "-", self.cache_dir)
+        with open(e.tree_cache.path, "wb") as f:
+            f.write(b"\x00garbage")
+        self.assertEqual(self.parses(), 1)
+        self.assertEqual(self.parses(), 0)
+
+    def test_03_documents_marshal_cannot_write(self):
+        content = "---\n- Host: name\n  Date: 2024-01-01\n"
+        self.assertEqual(self.parses(content), 1)
+        self.assertEqual(self.parses(), 1)
@@ -0,0 +1,111 @@
+import io
+import os
+import json
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from edgar.diagnostics import Diagnostics
+from edgar.edgar import Edgar
+from edgar.errors import EdgarStrictModeError
+
+
+SOURCE = """---
+UseRoaming: no
+hosts:
+- Host: m
+  User: edgar
+  UseRoaming: no
+  hide: yes
+  hosts:
+  - Host: e{item}
+    with_items: range(500)
+  - Host: x
+    Cipher: blowfish
+- Host: n
+  Port: 22
+"""
+
+
+class TestDiagnostics(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.source = os.path.join(self.tmpdir.name, "edgar.yml")
+        with open(self.source, "w") as f:
+            f.write(SOURCE)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_01_records_are_deduplicated(self):
+        expected = {
+            ("UseRoaming", ("Host *",)): 1,
+            # Inherited by the hosts of the hidden m block
+            ("UseRoaming", ("Host *", "Host m")): 501,
+            ("Cipher", ("Host *", "Host m", "Host x")): 1,
+        }
+        cache_dir = os.path.join(self.tmpdir.name, "cache")
+        for cache, jobs in [(None, 1), (cache_dir, 1), (cache_dir, 1),
+                            (None, 2)]:
+            diagnostics = Diagnostics()
+            Edgar(self.source, "-", cache, jobs,
+                  diagnostics=diagnostics).config
+            self.assertEqual(diagnostics.records, expected)
+            self.assertEqual(list(diagnostics.records), list(expected))
+
+    @patch("sys.stderr", new_callable=io.StringIO)
+    def test_02_reported_once_at_the_end(self, mock_stderr):
+        e = Edgar(self.source, "-")
+        self.assertEqual(mock_stderr.getvalue(), "")
+        e.config
+        report = mock_stderr.getvalue()
+        self.assertEqual(report.count("UseRoaming is deprecated"), 1)
+        self.assertIn("  in Host * > Host m (501 times)\n", report)
+
+    def test_03_json(self):
+        diagnostics = Diagnostics()
+        diagnostics.deprecated("UseRoaming", ("Host *", "Host m"), 3)
+        stream = io.StringIO()
+        diagnostics.emit("json", stream)
+        report = json.loads(stream.getvalue())
+        self.assertEqual(report[0]["path"], "Host * > Host m")
+        self.assertEqual(report[0]["count"], 3)
+        self.assertIn("deprecated", report[0]["message"])
+
+    def test_04_strict(self):
+        e = Edgar(self.source, os.path.join(self.tmpdir.name, "config"),
+                  diagnostics=Diagnostics(), strict=True)
+        for _ in range(2):
+            with self.assertRaises(EdgarStrictModeError):
+                e.write()
+        self.assertIsNone(e._config)
+        self.assertFalse(
+            os.path.exists(os.path.join(self.tmpdir.name, "config"))
+        )
+
+    def test_05_strict_when_up_to_date(self):
+        output = os.path.join(self.tmpdir.name, "config")
+        self.assertTrue(Edgar(self.source, output,
+                              diagnostics=Diagnostics()).write())
+        with open(output) as f:
+            self.assertIn("# Deprecated options: 3\n", f.read())
+        e = Edgar(self.source, output, diagnostics=Diagnostics(),
+                  strict=True)
+        for _ in range(2):
+            with self.assertRaises(EdgarStrictModeError):
+                e.write()
+        self.assertIsNone(e._config)
+
+        with open(self.source, "w") as f:
+            f.write("- Host: n\n  Port: 22\n")
+        diagnostics = Diagnostics()
+        diagnostics.deprecated("UseRoaming", ("Host *",))
+        e = Edgar(self.source, output, diagnostics=diagnostics, strict=True)
+        self.assertTrue(e.write())
+        self.assertEqual(len(diagnostics), 0)
+        self.assertFalse(
+            Edgar(self.source, output, diagnostics=Diagnostics(),
+                  strict=True).write()
+        )
+        with open(output) as f:
+            self.assertNotIn("# Deprecated options", f.read())
@@ -0,0 +1,174 @@
+import io
+import json
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stderr, redirect_stdout
+from unittest.mock import patch
+
+from edgar.cli import run_edgar
+from edgar.differ import (ConfigDiff, option_changes, out_of_order,
+                          read_blocks)
+
+
+class TestDiffer(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.source = self.path("edgar.yml")
+        self.output = self.path("config")
+        self.write_source("""---
+- Host: web
+  Hostname: 10.0.0.1
+  Port: 2222
+- Host: db
+  User: admin
+- Host: "*"
+  User: me
+""")
+
+    def path(self, name):
+        return os.path.join(self.tmpdir.name, name)
+
+    def write_source(self, content):
+        with open(self.source, "w") as f:
+            f.write(content)
+
+    def run_edgar(self, *args):
+        argv = ["edgar", "--no-cache", "-c", self.source, "-o", self.output]
+        stdout = io.StringIO()
+        stderr = io.StringIO()
+        with patch("sys.argv", argv + list(args)), \
+                redirect_stdout(stdout), redirect_stderr(stderr):
+            status = run_edgar()
+        return status, stdout.getvalue(), stderr.getvalue()
+
+    def test_01_read_blocks(self):
+        with open(self.path("shard.conf"), "w") as f:
+            f.write("# Generated\nHost db\n  User admin\n")
+        with open(self.output, "w") as f:
+            f.write(f"""# Header
+Include "{self.path('shard.conf')}" {self.path('missing.conf')}
+
+Host web
+\tHostname 10.0.0.1
+  # Comment
+  Port   2222
+
+Match exec true
+  Include not-followed.conf
+""")
+        self.assertEqual(list(read_blocks(self.output)), [
+            ("Host db", ["User admin"]),
+            ("Host web", ["Hostname 10.0.0.1", "Port 2222"]),
+            ("Match exec true", ["Include not-followed.conf"]),
+        ])
+        self.assertEqual(list(read_blocks(self.path("missing"))), [])
+
+    def test_02_option_changes(self):
+        self.assertEqual(
+            option_changes(
+                ["Port 22", "User me", "IdentityFile a", "IdentityFile b"],
+                ["User me", "IdentityFile b", "identityfile c", "Port 22"]
+            ),
+            [("identityfile", ["a", "b"], ["b", "c"])]
+        )
+
+    def test_03_compare(self):
+        with open(self.output, "w") as f:
+            f.write("""Host old
+  User me
+
+Host web
+  Port 22
+  Hostname 10.0.0.1
+
+Host db
+  User admin
+""")
+        diff = ConfigDiff([
+            ("Host web", (("Hostname", "10.0.0.1"), ("Port", 2222),
+                          ("LocalForward", "8080 localhost:80"))),
+            ("Host db", (("User", "admin"),)),
+            ("Host new", (("User", "me"),)),
+        ], self.output).compare()
+        self.assertTrue(diff)
+        self.assertEqual(diff.added, ["Host new"])
+        self.assertEqual(diff.removed, ["Host old"])
+        self.assertEqual(diff.changed, [
+            ("Host web", [("Port", ["22"], ["2222"]),
+                          ("LocalForward", [], ["8080 localhost:80"])]),
+        ])
+        self.assertFalse(ConfigDiff([
+            ("Host old", (("User", "me"),)),
+            ("Host web", (("Hostname", "10.0.0.1"), ("Port", "22"))),
+            ("Host db", (("User", "admin"),)),
+        ], self.output).compare())
+
+    def test_04_command(self):
+        self.assertEqual(self.run_edgar("diff", "--check"), (
+            1, "+ Host web\n+ Host db\n+ Host *\n",
+            "3 added, 0 removed, 0 changed, 0 moved\n"
+        ))
+        self.run_edgar()
+        self.assertEqual(self.run_edgar("diff", "--check"),
+                         (0, "", "0 added, 0 removed, 0 changed, 0 moved\n"))
+
+        self.write_source("""---
+- Host: web
+  Hostname: 10.0.0.1
+- Host: cache
+  User: admin
+- Host: "*"
+  User: me
+  Compression: yes
+""")
+        status, stdout, stderr = self.run_edgar("diff")
+        self.assertEqual(status, 0)
+        self.assertEqual(stdout, """- Host db
++ Host cache
+~ Host web
+    Port: 2222 -> (unset)
+~ Host *
+    Compression: (unset) -> yes
+""")
+        self.assertEqual(stderr,
+                         "1 added, 1 removed, 2 changed, 0 moved\n")
+
+        status, stdout, _ = self.run_edgar("diff", "--check", "--json")
+        self.assertEqual(status, 1)
+        self.assertEqual(json.loads(stdout)["changed"][0], {
+            "block": "Host web",
+            "options": [{"option": "Port", "old": ["2222"], "new": []}],
+        })
+
+    def test_05_moved(self):
+        self.assertEqual(out_of_order([0, 1, 2]), [])
+        self.assertEqual(out_of_order([1, 0]), [0])
+        self.assertEqual(out_of_order([4, 0, 1, 2, 3]), [0])
+        self.assertEqual(out_of_order([0, 3, 1, 2, 4]), [1])
+
+        self.write_source("""---
+- Host: "*.example.com"
+  User: deploy
+- Host: web.example.com
+  User: web
+""")
+        self.run_edgar()
+        self.write_source("""---
+- Host: web.example.com
+  User: web
+- Host: "*.example.com"
+  User: deploy
+""")
+        status, stdout, stderr = self.run_edgar("diff", "--check")
+        self.assertEqual(status, 1)
+        self.assertEqual(stdout, "> Host web.example.com\n")
+        self.assertEqual(stderr, "0 added, 0 removed, 0 changed, 1 moved\n")
+
+    def test_06_shards(self):
+        self.run_edgar("--shards", self.path("shards"))
+        with open(self.output) as f:
+            self.assertIn("Include ", f.read())
+        self.assertEqual(self.run_edgar("diff", "--check", "--shards",
+                                        self.path("shards"))[0], 0)
@@ -1,7 +1,10 @@
 import os
+import tempfile
+import tracemalloc
 import unittest
 from unittest.mock import patch
 from edgar.edgar import Edgar
+from edgar.errors import EdgarExpressionError
 
 
 def local_expanduser(path):
@@ -331,3 +334,138 @@ Match Host *.example.com
   User test
 """
         self.assertEqual(str(e), result.strip())
+
+    def test_13_skip_write_when_up_to_date(self, mock_path):
+        test = """---
+- Host: name
+  HostName: 127.0.0.1
+"""
+        with open(".edgarrc", "w") as f:
+            f.write(test)
+        with tempfile.TemporaryDirectory() as tmpdir:
+            output = os.path.join(tmpdir, "config")
+            self.assertTrue(Edgar(output_file=output).write())
+            with open(output, "r") as f:
+                content = f.read()
+            self.assertIn("# Fingerprint: ", content)
+            self.assertTrue(content.endswith("Hostname 127.0.0.1\n"))
+
+            e = Edgar(output_file=output)
+            self.assertTrue(e.is_up_to_date())
+            self.assertFalse(e.write())
+            # Nothing has been parsed
+            self.assertIsNone(e._config)
+            self.assertTrue(e.write(force=True))
+
+            with patch.dict("edgar.edgar.VALID_SSH_OPTIONS",
+                            {"newoption": "NewOption"}):
+                self.assertFalse(Edgar(output_file=output).is_up_to_date())
+
+            with open(".edgarrc", "a") as f:
+                f.write("  User: edgar\n")
+            self.assertTrue(Edgar(output_file=output).write())
+            with open(output, "r") as f:
+                self.assertTrue(f.read().endswith("User edgar\n"))
+
+    def test_14_atomic_streamed_write(self, mock_path):
+        test = """---
+Compression: yes
+hosts:
+- Host: "*"
+  ServerAliveCountMax: 2
+- Host: e{item}
+  User: edgar
+  with_items: range(3)
+"""
+        with open(".edgarrc", "w") as f:
+            f.write(test)
+        with tempfile.TemporaryDirectory() as tmpdir:
+            output = os.path.join(tmpdir, "ssh", "config")
+            e = Edgar(output_file=output)
+            e.write()
+            with open(output, "r") as f:
+                content = f.read()
+            self.assertTrue(content.endswith("\n\n" + str(e) + "\n"))
+            self.assertEqual(str(e), str(e))
+            self.assertEqual(os.listdir(os.path.dirname(output)), ["config"])
+
+            os.chmod(output, 0o600)
+
+            def broken_blocks():
+                yield "Host broken"
+                raise RuntimeError("Interrupted")
+
+            with patch.object(e, "iter_blocks", side_effect=broken_blocks):
+                with self.assertRaises(RuntimeError):
+                    e.write(force=True)
+            with open(output, "r") as f:
+                self.assertEqual(f.read(), content)
+            self.assertEqual(os.listdir(os.path.dirname(output)), ["config"])
+
+            e.write(force=True)
+            self.assertEqual(os.stat(output).st_mode & 0o777, 0o600)
+
+    def test_15_expansion_memory_does_not_depend_on_items(self, mock_path):
+        def expansion_peak(items):
+            with open(".edgarrc", "w") as f:
+                f.write(f"""---
+- Host: m
+  User: edgar
+  hide: yes
+  hosts:
+  - Host: e{{item}}
+    Hostname: 10.10.0.{{item}}
+    ViaProxy: gw2
+    with_items: range({items})
+    hosts:
+    - Host: -sub{{item}}
+      with_items: range({items})
+""")
+            conf = Edgar().load()
+            tracemalloc.start()
+            try:
+                count = sum(1 for _ in Edgar().expand(conf))
+                return count, tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+
+        small_count, small_peak = expansion_peak(100)
+        large_count, large_peak = expansion_peak(20000)
+        self.assertEqual(small_count, 200)
+        self.assertEqual(large_count, 40000)
+        self.assertLess(large_peak, small_peak * 2)
+
+    def test_16_failed_compilation_is_not_kept(self, mock_path):
+        test = """---
+- Host: name
+  User: edgar
+- Host: "e{item}"
+  with_items: undefined
+"""
+        with open(".edgarrc", "w") as f:
+            f.write(test)
+        with tempfile.TemporaryDirectory() as tmpdir:
+            output = os.path.join(tmpdir, "config")
+            e = Edgar(output_file=output)
+            for _ in range(2):
+                with self.assertRaises(EdgarExpressionError):
+                    e.write()
+            self.assertIsNone(e._config)
+            self.assertFalse(os.path.exists(output))
+
+    def test_17_write_through_symlink(self, mock_path):
+        with open(".edgarrc", "w") as f:
+            f.write("- Host: name\n  User: edgar\n")
+        with tempfile.TemporaryDirectory() as tmpdir:
+            target = os.path.join(tmpdir, "dotfiles", "ssh_config")
+            os.makedirs(os.path.dirname(target))
+            with open(target, "w") as f:
+                f.write("Host old\n")
+            output = os.path.join(tmpdir, "config")
+            os.symlink(target, output)
+            self.assertTrue(Edgar(output_file=output).write())
+            self.assertTrue(os.path.islink(output))
+            with open(target, "r") as f:
+                self.assertTrue(f.read().endswith("User edgar\n"))
+            self.assertEqual(os.listdir(os.path.dirname(target)),
+                             ["ssh_config"])
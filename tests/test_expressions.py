@@ -0,0 +1,128 @@
+import os
+import tempfile
+import unittest
+from itertools import islice
+
+from edgar.edgar import Edgar
+from edgar.errors import EdgarExpressionError
+from edgar.expressions import compile_expression, loop_items, nested_items
+
+
+class TestExpressions(unittest.TestCase):
+    def items(self, text):
+        return list(loop_items(text))
+
+    def test_01_values(self):
+        self.assertEqual(self.items("range(3)"), [0, 1, 2])
+        self.assertEqual(self.items("range(1, 2 * 3 + 2, 2)"), [1, 3, 5, 7])
+        self.assertEqual(self.items("[1, 'a', -2.5]"), [1, "a", -2.5])
+        self.assertEqual(self.items("('x', 'y')"), ["x", "y"])
+        self.assertEqual(self.items("chain(range(2), ['z'])"), [0, 1, "z"])
+        self.assertEqual(self.items("range(10 // 3 % 2)"), [0])
+        self.assertEqual(loop_items([4, 5]), [4, 5])
+
+    def test_02_formatting(self):
+        self.assertEqual(self.items("fmt('node{:02d}', range(9, 12))"),
+                         ["node09", "node10", "node11"])
+        self.assertEqual(self.items("zfill(range(8, 11), 3)"),
+                         ["008", "009", "010"])
+
+    def test_03_products(self):
+        self.assertEqual(
+            self.items("product(['eu', 'us'], range(2))"),
+            [("eu", 0), ("eu", 1), ("us", 0), ("us", 1)]
+        )
+        self.assertEqual(
+            self.items("product(dc=['eu'], rack=zfill(range(2), 2))"),
+            [{"dc": "eu", "rack": "00"}, {"dc": "eu", "rack": "01"}]
+        )
+        self.assertEqual(list(nested_items([["a", "b"], "range(2)"])),
+                         [("a", 0), ("a", 1), ("b", 0), ("b", 1)])
+        self.assertEqual(list(nested_items({"x": "range(2)"})),
+                         [{"x": 0}, {"x": 1}])
+
+    def test_04_lazy(self):
+        items = loop_items("product(range(1000000), range(1000000), "
+                           "fmt('{}', range(1000000)))")
+        self.assertEqual(list(islice(items, 2)),
+                         [(0, 0, "0"), (0, 0, "1")])
+
+    def test_05_refused(self):
+        for text in [
+            "__import__('os').system('true')",
+            "().__class__",
+            "open('/etc/passwd')",
+            "[x for x in range(3)]",
+            "lambda: 1",
+            "range(3)[0]",
+            "'a' * 10",
+            "2 ** 10",
+            "range(*[3])",
+            "product([1], y=[2])",
+            "range('a')",
+            "3",
+            "range(",
+        ]:
+            with self.assertRaises(EdgarExpressionError, msg=text):
+                list(loop_items(text))
+
+    def test_06_lazy_errors(self):
+        for text, message in [
+            ("fmt('{:02d}', ['a'])", "Unknown format code"),
+            ("fmt('{0[1]}', [[1]])", "index out of range"),
+            ("fmt('{x}', range(2))", "'x'"),
+            ("zfill(chain(range(2), 3), 2)", "not iterable"),
+        ]:
+            items = loop_items(text)
+            with self.assertRaises(EdgarExpressionError, msg=text) as error:
+                list(items)
+            self.assertTrue(str(error.exception).startswith(text + ": "))
+            self.assertIn(message, str(error.exception))
+
+    def test_07_compiled_once(self):
+        compile_expression.cache_clear()
+        for _ in range(5):
+            self.items("range(4)")
+        self.assertEqual(compile_expression.cache_info().misses, 1)
+
+
+class TestNestedLoops(unittest.TestCase):
+    def compile(self, content, **kwargs):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            source = os.path.join(tmpdir, "edgar.yml")
+            with open(source, "w") as f:
+                f.write(content)
+            return str(Edgar(source, "-", **kwargs))
+
+    def test_01_named_dimensions(self):
+        result = self.compile("""---
+- Host: "{region}-r{rack}-n{node}"
+  Hostname: "{region}.{rack}.{node}"
+  with_nested:
+    region: [eu, us]
+    rack: range(2)
+    node: zfill(range(3), 2)
+""")
+        self.assertEqual(
+            [line[5:] for line in result.splitlines()
+             if line.startswith("Host")],
+            [f"{region}-r{rack}-n{node:02d}" for region in ["eu", "us"]
+             for rack in range(2) for node in range(3)]
+        )
+        self.assertIn("Host us-r1-n02\n  Hostname us.1.02", result)
+
+    def test_02_parallel_chunks(self):
+        class SmallChunks(Edgar):
+            chunk_size = 4
+
+        content = """---
+- Host: "h{item[0]}-{item[1]}"
+  with_nested: [[a, b, c], "range(5)"]
+"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            source = os.path.join(tmpdir, "edgar.yml")
+            with open(source, "w") as f:
+                f.write(content)
+            expected = str(Edgar(source, "-"))
+            self.assertEqual(str(SmallChunks(source, "-", jobs=2)), expected)
+        self.assertEqual(expected.count("Host "), 15)
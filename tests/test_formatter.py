@@ -1,7 +1,9 @@
 import io
 import unittest
 from unittest.mock import patch
-from edgar.formatter import format_with_item, format_value, format_body_line
+from edgar.formatter import (
+    format_with_item, format_value, item_type, Template, BlockTemplate
+)
 from edgar.errors import EdgarNotValidSSHKeywordError
 
 
@@ -124,22 +126,82 @@ class TestFormatter(unittest.TestCase):
         )
 
     @patch('sys.stderr', new_callable=io.StringIO)
-    def test_06_format_body_line(self, mock_stderr):
+    def test_06_body_line(self, mock_stderr):
         self.assertEqual(
-            format_body_line("hostname", "test", None),
-            "Hostname test"
+            BlockTemplate({"hostname": "test"}).format(None),
+            (("Hostname", "test"),)
         )
         self.assertEqual(
-            format_body_line("hostname", "test{item}", 42),
-            "Hostname test42"
+            BlockTemplate({"hostname": "test{item}"}).format(42),
+            (("Hostname", "test42"),)
         )
-        line = format_body_line("UseRoaming", True, None)
-        self.assertEqual(
-            mock_stderr.getvalue(),
-            "UseRoaming is deprecated and will be ignored by OpenSSH, "
-            "you should remove it now from your configuration as it "
-            "may break in a future version.\n"
-        )
-        self.assertIsNone(line)
+        template = BlockTemplate({"UseRoaming": True})
+        self.assertEqual(template.format(None), ())
+        self.assertEqual(template.deprecated, ["UseRoaming"])
+        self.assertEqual(mock_stderr.getvalue(), "")
+        with self.assertRaises(EdgarNotValidSSHKeywordError):
+            BlockTemplate({"AbsolutelyNotAnOption": "test"})
+
+    def test_07_item_types_are_cached(self):
+        self.assertIs(item_type(["id", "name"]), item_type(("id", "name")))
+        self.assertIsNot(item_type(["id"]), item_type(["id", "name"]))
+
+    def test_08_template_matches_format_with_item(self):
+        texts = [
+            "Lorem ipsum", "Lorem {item}", "Lorem {test}", "{{escaped}}",
+            "{{escaped}} {item}", "Lorem {item.test} netus {bibendum}",
+            "Lorem {test} netus {bibendum}", "{item[0]}"
+        ]
+        items = [
+            None, "test", 42, ["a", "b"],
+            {"test": "amet", "bibendum": "fringilla"},
+            {"test": "amet"}
+        ]
+        for text in texts:
+            template = Template(text)
+            for item in items:
+                try:
+                    expected = format_with_item(text, item)
+                except (KeyError, AttributeError, IndexError, TypeError) as e:
+                    with self.assertRaises(type(e)):
+                        template.format(item)
+                    continue
+                self.assertEqual(template.format(item), expected)
+
+    @patch('sys.stderr', new_callable=io.StringIO)
+    def test_09_block_template(self, mock_stderr):
+        options = {
+            "hostname": "10.0.{item.id}.{item.name}",
+            "User": "edgar",
+            "Port": 22,
+            "ForwardAgent": True,
+            "ViaProxy": "gw{name}",
+            "UseRoaming": False,
+            "LocalCommand": "echo {{literal}}"
+        }
+        template = BlockTemplate(options)
+        for item, expected in [
+            (None, {"Hostname 10.0.{item.id}.{item.name}", "User edgar",
+                    "Port 22", "ForwardAgent yes",
+                    "ProxyCommand ssh -W %h:%p gw{name}",
+                    "LocalCommand echo {{literal}}"}),
+            ({"id": 1, "name": "b"}, {
+                "Hostname 10.0.1.b", "User edgar", "Port 22",
+                "ForwardAgent yes", "ProxyCommand ssh -W %h:%p gwb",
+                "LocalCommand echo {literal}"}),
+        ]:
+            body = template.format(item)
+            self.assertIsInstance(body, tuple)
+            self.assertEqual(
+                {f"{option} {value}" for option, value in body}, expected
+            )
+        # Pairs which do not depend on the item are shared
+        self.assertIs(
+            template.format({"id": 1, "name": "b"})[0],
+            template.format({"id": 2, "name": "c"})[0]
+        )
+        # Deprecated options are listed, not printed, by templates
+        self.assertEqual(template.deprecated, ["UseRoaming"])
+        self.assertEqual(mock_stderr.getvalue(), "")
         with self.assertRaises(EdgarNotValidSSHKeywordError):
-            format_body_line("AbsolutelyNotAnOption", "test", None)
+            BlockTemplate({"AbsolutelyNotAnOption": "test"})
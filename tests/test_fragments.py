@@ -0,0 +1,142 @@
+import os
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+from edgar import edgar as edgar_module
+from edgar.edgar import Edgar
+from edgar.errors import EdgarInvalidFragmentError
+from edgar.watch import InotifyWatcher, PollingWatcher, Rebuilder
+
+
+FRAGMENTS = {
+    "10-web.yml": """---
+- Host: "web{item}"
+  Hostname: "10.0.0.{item}"
+  with_items: range(3)
+- Host: web1
+  User: www
+""",
+    "20-db.yml": """---
+Host: db
+User: postgres
+hosts:
+- Host: "-{item}"
+  with_items: [main, replica]
+""",
+    "30-empty.yml": "---\n",
+    "99-defaults.yml": """---
+- Compression: yes
+""",
+    "README": "Not a fragment",
+}
+
+SINGLE_FILE = """---
+- Host: "web{item}"
+  Hostname: "10.0.0.{item}"
+  with_items: range(3)
+- Host: web1
+  User: www
+- Host: db
+  User: postgres
+  hosts:
+  - Host: "-{item}"
+    with_items: [main, replica]
+- Compression: yes
+"""
+
+
+class TestFragments(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.folder = os.path.join(self.tmpdir.name, "edgar.d")
+        os.mkdir(self.folder)
+        for name, content in FRAGMENTS.items():
+            self.write_fragment(name, content)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def write_fragment(self, name, content):
+        with open(os.path.join(self.folder, name), "w") as f:
+            f.write(content)
+
+    def expected(self):
+        source = os.path.join(self.tmpdir.name, "edgar.yml")
+        with open(source, "w") as f:
+            f.write(SINGLE_FILE)
+        return str(Edgar(source, "-"))
+
+    def test_01_same_as_a_single_list(self):
+        e = Edgar(self.folder, "-")
+        self.assertEqual(
+            [os.path.basename(path) for path in e.fragments()],
+            ["10-web.yml", "20-db.yml", "30-empty.yml", "99-defaults.yml"]
+        )
+        self.assertEqual(str(e), self.expected())
+        self.assertEqual(str(Edgar(self.folder, "-", jobs=2)),
+                         self.expected())
+        cache_dir = os.path.join(self.tmpdir.name, "cache")
+        self.assertEqual(str(Edgar(self.folder, "-", cache_dir)),
+                         self.expected())
+
+    def test_02_invalid_fragment(self):
+        self.write_fragment("40-invalid.yml", "just a string\n")
+        with self.assertRaises(EdgarInvalidFragmentError):
+            Edgar(self.folder, "-").config
+
+    def test_03_fingerprint_covers_all_fragments(self):
+        e = Edgar(self.folder, "-")
+        self.assertEqual(e.source_files()[0], self.folder)
+        self.assertEqual(len(e.source_files()), 5)
+        fingerprint = e.fingerprint()
+        self.write_fragment("50-new.yml", "---\n")
+        self.assertNotEqual(Edgar(self.folder, "-").fingerprint(),
+                            fingerprint)
+
+    def test_04_unchanged_fragments_are_not_parsed_again(self):
+        output = os.path.join(self.tmpdir.name, "config")
+        rebuilder = Rebuilder(
+            lambda diagnostics: Edgar(self.folder, output,
+                                      diagnostics=diagnostics)
+        )
+        with patch.object(edgar_module, "load_yaml",
+                          wraps=edgar_module.load_yaml) as load_yaml:
+            rebuilder.rebuild()
+            self.assertEqual(load_yaml.call_count, 4)
+            self.write_fragment("10-web.yml", FRAGMENTS["10-web.yml"] +
+                                "- Host: web9\n")
+            rebuilder.rebuild()
+            self.assertEqual(load_yaml.call_count, 5)
+        with open(output) as f:
+            result = f.read()
+        self.assertIn("Host web9", result)
+        self.assertIn("Host db-replica", result)
+
+    def check_new_fragment_is_noticed(self, watcher):
+        def add():
+            time.sleep(0.05)
+            self.write_fragment("50-new.yml", "---\n")
+
+        thread = threading.Thread(target=add)
+        thread.start()
+        try:
+            changed = watcher.wait(timeout=2, debounce=0.05)
+        finally:
+            thread.join()
+            watcher.close()
+        self.assertEqual(changed, {self.folder})
+
+    def test_05_polling_watcher(self):
+        paths = Edgar(self.folder, "-").source_files()
+        self.check_new_fragment_is_noticed(
+            PollingWatcher(paths, interval=0.02)
+        )
+
+    @unittest.skipUnless(sys.platform.startswith("linux"), "Linux only")
+    def test_06_inotify_watcher(self):
+        paths = Edgar(self.folder, "-").source_files()
+        self.check_new_fragment_is_noticed(InotifyWatcher(paths))
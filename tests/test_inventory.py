@@ -0,0 +1,149 @@
+import os
+import json
+import tempfile
+import tracemalloc
+import unittest
+
+from edgar.edgar import Edgar
+from edgar.errors import EdgarInventoryError
+from edgar.inventory import read_inventory
+
+
+HOSTS = [
+    {"name": "web1", "ip": "10.0.0.1"},
+    {"name": "web2", "ip": "10.0.0.2"},
+    {"name": "db1", "ip": "10.0.1.1"},
+]
+
+
+class TestInventory(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.source = self.path("edgar.yml")
+        self.output = self.path("config")
+
+    def path(self, name):
+        return os.path.join(self.tmpdir.name, name)
+
+    def write(self, name, content):
+        with open(self.path(name), "w") as f:
+            f.write(content)
+
+    def write_jsonl(self, name, records):
+        self.write(name, "".join(json.dumps(record) + "\n"
+                                 for record in records))
+
+    def write_csv(self, name, records):
+        self.write(name, "name,ip\n" + "".join(
+            "{name},{ip}\n".format(**record) for record in records
+        ))
+
+    def write_source(self, loop):
+        self.write("edgar.yml", f"""---
+- Host: "{{name}}"
+  Hostname: "{{ip}}"
+  {loop}
+""")
+
+    def compile(self, **kwargs):
+        return str(Edgar(self.source, "-", **kwargs))
+
+    def test_01_same_as_inline_items(self):
+        self.write_source("with_items: " + json.dumps(HOSTS))
+        expected = self.compile()
+        self.assertIn("Host db1\n  Hostname 10.0.1.1", expected)
+
+        self.write_jsonl("hosts.jsonl", HOSTS)
+        self.write_source("with_items_from: hosts.jsonl")
+        self.assertEqual(self.compile(), expected)
+
+        self.write_csv("hosts.csv", HOSTS)
+        self.write_source("with_items_from: hosts.csv")
+        self.assertEqual(self.compile(), expected)
+
+    def test_02_relative_to_source_folder(self):
+        os.mkdir(self.path("inventories"))
+        self.write_jsonl("inventories/hosts.jsonl", HOSTS)
+        self.write_source("with_items_from: inventories/hosts.jsonl")
+        cwd = os.getcwd()
+        try:
+            os.chdir("/")
+            self.assertEqual(self.compile().count("Host "), 3)
+        finally:
+            os.chdir(cwd)
+
+    def test_03_errors(self):
+        self.write("hosts.txt", "web1\n")
+        self.write_source("with_items_from: hosts.txt")
+        with self.assertRaises(EdgarInventoryError):
+            self.compile()
+
+        self.write("hosts.jsonl", '{"name": "web1", "ip": "1"}\n{oops\n')
+        self.write_source("with_items_from: hosts.jsonl")
+        with self.assertRaisesRegex(EdgarInventoryError, r"hosts\.jsonl:2"):
+            self.compile()
+
+    def test_04_blank_lines_and_empty_files(self):
+        self.write("hosts.jsonl", "\n" + json.dumps(HOSTS[0]) + "\n\n")
+        self.assertEqual(list(read_inventory(self.path("hosts.jsonl"))),
+                         HOSTS[:1])
+        self.write("empty.jsonl", "")
+        self.assertEqual(list(read_inventory(self.path("empty.jsonl"))), [])
+
+    def test_05_inventory_changes_are_noticed(self):
+        self.write_jsonl("hosts.jsonl", HOSTS[:2])
+        self.write_source("with_items_from: hosts.jsonl")
+        cache_dir = self.path("cache")
+
+        e = Edgar(self.source, self.output, cache_dir=cache_dir)
+        self.assertTrue(e.write())
+        with open(self.output) as f:
+            self.assertIn(f"# Inventory: {self.path('hosts.jsonl')}\n",
+                          f.read())
+        e = Edgar(self.source, self.output, cache_dir=cache_dir)
+        self.assertIn(self.path("hosts.jsonl"), e.source_files())
+        self.assertFalse(e.write())
+
+        self.write_jsonl("hosts.jsonl", HOSTS)
+        e = Edgar(self.source, self.output, cache_dir=cache_dir)
+        self.assertTrue(e.write())
+        self.assertEqual(e.cache.hits, 0)
+        with open(self.output) as f:
+            self.assertIn("Host db1\n", f.read())
+
+    def test_06_parallel_chunks(self):
+        class SmallChunks(Edgar):
+            chunk_size = 10
+
+        self.write_jsonl("hosts.jsonl", [
+            {"name": f"node{n}", "ip": f"10.1.{n // 256}.{n % 256}"}
+            for n in range(100)
+        ])
+        self.write_source("with_items_from: hosts.jsonl")
+        expected = self.compile()
+        self.assertEqual(expected.count("Host "), 100)
+        self.assertEqual(str(SmallChunks(self.source, "-", jobs=2)),
+                         expected)
+
+    def test_07_memory_does_not_depend_on_inventory_size(self):
+        def expansion_peak(items):
+            self.write_jsonl("hosts.jsonl", (
+                {"name": f"node{n}", "ip": f"10.1.{n // 256}.{n % 256}"}
+                for n in range(items)
+            ))
+            self.write_source("with_items_from: hosts.jsonl")
+            e = Edgar(self.source, "-")
+            conf = e.load()
+            tracemalloc.start()
+            try:
+                count = sum(1 for _ in e.expand(conf))
+                return count, tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+
+        small_count, small_peak = expansion_peak(100)
+        large_count, large_peak = expansion_peak(20000)
+        self.assertEqual(small_count, 100)
+        self.assertEqual(large_count, 20000)
+        self.assertLess(large_peak, max(small_peak * 2, 512 * 1024))
@@ -0,0 +1,181 @@
+import binascii
+import hmac
+import os
+import shutil
+import subprocess
+import tempfile
+import unittest
+
+from edgar.edgar import Edgar
+from edgar.known_hosts import (KnownHosts, hash_name, hash_names,
+                               known_host_names, name_salt, read_secret)
+
+
+KEYS = {
+    "web.example.com": "ssh-ed25519 AAAAC3NzaC1lZDI1NTE5AAAAIWeb",
+    "[db.example.com]:2222": "ssh-ed25519 AAAAC3NzaC1lZDI1NTE5AAAAIDb",
+    "legacy": "ssh-rsa AAAAB3NzaC1yc2EAAAADAQABAAABAQLegacy",
+}
+
+
+def matches(line, name):
+    salt, digest = line.split()[0][len("|1|"):].split("|")
+    salt = binascii.a2b_base64(salt)
+    digest = binascii.a2b_base64(digest)
+    return hmac.digest(salt, name.encode("utf-8"), "sha1") == digest
+
+
+class TestKnownHosts(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.host_keys = self.path("host_keys")
+        self.output = self.path("known_hosts")
+        self.write_keys(KEYS)
+        self.blocks = [
+            ("Host web", (("Hostname", "web.example.com"),)),
+            ("Host db", (("Hostname", "db.example.com"), ("Port", "2222"))),
+            ("Host legacy", (("HostKeyAlias", "old"),)),
+            ("Host unknown", (("User", "me"),)),
+        ]
+
+    def path(self, name):
+        return os.path.join(self.tmpdir.name, name)
+
+    def write_keys(self, keys, markers=()):
+        with open(self.host_keys, "w") as f:
+            f.write("# Host keys\n")
+            for name, key in keys.items():
+                f.write(f"{name} {key} comment\n")
+            for marker in markers:
+                f.write(marker + "\n")
+
+    def lines(self):
+        with open(self.output) as f:
+            return [line.rstrip("\n") for line in f
+                    if line.startswith(("|", "@"))]
+
+    def test_01_hash_name(self):
+        self.assertTrue(matches(hash_name("web") + " key", "web"))
+        self.assertNotEqual(hash_name("web"), hash_name("web"))
+        secret = read_secret(self.path("secret"))
+        self.assertEqual(read_secret(self.path("secret")), secret)
+        self.assertEqual(os.stat(self.path("secret")).st_mode & 0o777,
+                         0o600)
+        salt = name_salt(secret, "web")
+        self.assertEqual(len(salt), 20)
+        self.assertEqual(hash_names((secret, ["web", "db"])),
+                         [hash_name("web", salt),
+                          hash_name("db", name_salt(secret, "db"))])
+        self.assertNotEqual(name_salt(os.urandom(32), "web"), salt)
+
+    def test_02_names(self):
+        self.assertEqual(known_host_names({}, "web"), ["web", "web"])
+        self.assertEqual(
+            known_host_names({"HostName": "%h.Example.com", "Port": 2222},
+                             "web"),
+            ["[web.example.com]:2222", "web.example.com", "web"]
+        )
+        self.assertEqual(
+            known_host_names({"HostKeyAlias": "Alias", "Port": "2222"},
+                             "web"),
+            ["alias", "web", "web"]
+        )
+
+    def test_03_write(self):
+        known_hosts = KnownHosts(self.blocks, self.host_keys)
+        self.assertTrue(known_hosts.write(self.output, "edgar.yml"))
+        self.assertEqual(known_hosts.missing, ["unknown"])
+        lines = self.lines()
+        self.assertEqual(len(lines), 3)
+        self.assertTrue(matches(lines[0], "web.example.com"))
+        self.assertTrue(lines[0].endswith(" " + KEYS["web.example.com"]))
+        self.assertTrue(matches(lines[1], "[db.example.com]:2222"))
+        # The key of the alias is used, under the HostKeyAlias name
+        self.assertTrue(matches(lines[2], "old"))
+        self.assertTrue(lines[2].endswith(" " + KEYS["legacy"]))
+
+    def test_04_unchanged_lines_are_kept(self):
+        KnownHosts(self.blocks, self.host_keys).write(self.output, "src")
+        before = self.lines()
+        self.assertFalse(
+            KnownHosts(self.blocks, self.host_keys).write(self.output, "src")
+        )
+
+        keys = dict(KEYS, **{
+            "web.example.com": "ssh-ed25519 AAAAC3NzaC1lZDI1NTE5AAAAINew",
+            "unknown": "ssh-ed25519 AAAAC3NzaC1lZDI1NTE5AAAAIUnknown",
+        })
+        self.write_keys(keys, ["@cert-authority *.example.com ssh-ed25519 "
+                               "AAAAC3NzaC1lZDI1NTE5AAAAICA"])
+        known_hosts = KnownHosts(self.blocks, self.host_keys)
+        self.assertTrue(known_hosts.write(self.output, "src"))
+        self.assertEqual(known_hosts.missing, [])
+        after = self.lines()
+        self.assertNotEqual(after[0], before[0])
+        self.assertEqual(after[1:3], before[1:3])
+        self.assertTrue(matches(after[3], "unknown"))
+        self.assertTrue(after[4].startswith("@cert-authority "))
+
+    def test_05_parallel(self):
+        class SmallChunks(KnownHosts):
+            chunk_size = 10
+
+        blocks = [(f"Host node{number}", ()) for number in range(100)]
+        self.write_keys({f"node{number}": f"ssh-ed25519 AAAA{number}"
+                         for number in range(100)})
+        SmallChunks(blocks, self.host_keys, jobs=2).write(self.output, "src")
+        lines = self.lines()
+        self.assertEqual(len(lines), 100)
+        for number, line in enumerate(lines):
+            self.assertTrue(matches(line, f"node{number}"))
+        secret = read_secret(self.output + ".secret")
+        self.assertEqual(hash_names((secret, ["node7"])),
+                         [lines[7].split()[0]])
+        KnownHosts(blocks, self.host_keys).write(self.output, "src")
+        self.assertEqual(self.lines(), lines)
+
+    def test_06_shared_key(self):
+        names = [f"node{number}" for number in range(200)]
+        self.write_keys({name: "ssh-ed25519 AAAAShared" for name in names})
+        blocks = [(f"Host {name}", ()) for name in names]
+        KnownHosts(blocks, self.host_keys).write(self.output, "src")
+        before = dict(zip(names, self.lines()))
+        self.assertFalse(
+            KnownHosts(blocks, self.host_keys).write(self.output, "src")
+        )
+
+        # Removed and reordered hosts do not change the other lines
+        blocks = blocks[150:] + blocks[:100:2] + [("Host new", ())]
+        with open(self.host_keys, "a") as f:
+            f.write("new ssh-ed25519 AAAAShared\n")
+        self.assertTrue(
+            KnownHosts(blocks, self.host_keys).write(self.output, "src")
+        )
+        after = self.lines()
+        kept = names[150:] + names[:100:2]
+        self.assertEqual(after[:-1], [before[name] for name in kept])
+        self.assertTrue(matches(after[-1], "new"))
+
+    @unittest.skipIf(shutil.which("ssh-keygen") is None,
+                     "ssh-keygen is not available")
+    def test_07_ssh_keygen(self):
+        subprocess.run(["ssh-keygen", "-q", "-t", "ed25519", "-N", "",
+                        "-f", self.path("key")], check=True)
+        with open(self.path("key.pub")) as f:
+            key = " ".join(f.read().split()[:2])
+        self.write_keys({"web.example.com": key})
+        source = self.path("edgar.yml")
+        with open(source, "w") as f:
+            f.write("- Host: web\n  Hostname: web.example.com\n")
+        written, missing = Edgar(source, "-").write_known_hosts(
+            self.host_keys, self.output
+        )
+        self.assertTrue(written)
+        self.assertEqual(missing, [])
+        result = subprocess.run(
+            ["ssh-keygen", "-F", "web.example.com", "-f", self.output],
+            capture_output=True, text=True
+        )
+        self.assertEqual(result.returncode, 0)
+        self.assertIn(key, result.stdout)
@@ -0,0 +1,41 @@
+import os
+import unittest
+from unittest.mock import patch
+
+import yaml
+
+from benchmarks.synthetic import generate_config
+from edgar.edgar import Edgar
+from edgar.loader import default_loader, load_yaml
+
+
+def local_expanduser(path):
+    return path.replace("~/", "")
+
+
+def pure_python_load(stream):
+    return load_yaml(stream, yaml.SafeLoader)
+
+
+@unittest.skipUnless(yaml.__with_libyaml__, "PyYAML built without libyaml")
+class TestLoader(unittest.TestCase):
+    def test_01_default_loader_is_libyaml(self):
+        self.assertIs(default_loader(), yaml.CSafeLoader)
+
+    def test_02_same_document(self):
+        source = generate_config(hosts=100, items=5)
+        self.assertEqual(
+            load_yaml(source, yaml.CSafeLoader),
+            load_yaml(source, yaml.SafeLoader)
+        )
+
+    @patch('os.path.expanduser', side_effect=local_expanduser)
+    def test_03_same_compiled_output(self, mock_path):
+        with open(".edgarrc", "w") as f:
+            f.write(generate_config(hosts=100, items=5))
+        try:
+            result = str(Edgar())
+            with patch("edgar.edgar.load_yaml", side_effect=pure_python_load):
+                self.assertEqual(str(Edgar()), result)
+        finally:
+            os.unlink(".edgarrc")
@@ -0,0 +1,105 @@
+import os
+import tempfile
+import unittest
+
+from benchmarks.synthetic import generate_fleet
+from edgar.edgar import Edgar
+from edgar.minimizer import Minimizer
+from edgar.resolver import Resolver
+
+
+class TestMinimizer(unittest.TestCase):
+    def assertSameOptions(self, blocks, result, names):
+        expected = Resolver(blocks)
+        resolver = Resolver(result)
+        for name in names:
+            self.assertEqual(resolver.resolve(name), expected.resolve(name),
+                             name)
+
+    def test_01_merge_identical_bodies(self):
+        blocks = [
+            ("Host a", (("User", "x"),)),
+            ("Host b", (("User", "y"),)),
+            ("Host c", (("User", "x"),)),
+            ("Host *", (("User", "z"),)),
+        ]
+        result = Minimizer(blocks).minimize()
+        self.assertEqual(result, [
+            ("Host a c", (("User", "x"),)),
+            ("Host b", (("User", "y"),)),
+            ("Host *", (("User", "z"),)),
+        ])
+
+    def test_02_merge_reverted_when_shadowed(self):
+        blocks = [
+            ("Host a", (("User", "x"),)),
+            ("Host c*", (("User", "w"),)),
+            ("Host c", (("User", "x"),)),
+            ("Match exec true", (("User", "m"),)),
+            ("Host d", (("User", "x"),)),
+        ]
+        result = Minimizer(blocks).minimize()
+        # c gets its User from "Host c*" first, and d may not be moved
+        # before the Match block.
+        self.assertEqual(result, blocks)
+
+    def test_03_hoist_shared_options(self):
+        blocks = [
+            (f"Host host{number}", (
+                ("Hostname", f"10.0.0.{number}"),
+                ("ProxyCommand", "ssh -W %h:%p gateway.example.com"),
+                ("User", "deploy"),
+            ))
+            for number in range(10)
+        ]
+        blocks.append(("Host *", (("User", "me"),)))
+        result = Minimizer(blocks).minimize()
+        names = [f"host{number}" for number in range(10)]
+        self.assertEqual(result[10], ("Host " + " ".join(names), (
+            ("ProxyCommand", "ssh -W %h:%p gateway.example.com"),
+            ("User", "deploy"),
+        )))
+        self.assertEqual(result[0], ("Host host0",
+                                     (("Hostname", "10.0.0.0"),)))
+        self.assertEqual(result[-1], blocks[-1])
+        self.assertSameOptions(blocks, result, names + ["other"])
+
+    def test_04_multiple_values_order_is_kept(self):
+        blocks = [
+            (f"Host host{number}", (
+                ("IdentityFile", "~/.ssh/common"),
+                ("IdentityFile", f"~/.ssh/key{number}"),
+            ))
+            for number in range(10)
+        ]
+        result = Minimizer(blocks).minimize()
+        # Hoisting the common key would try it after the host one
+        self.assertEqual(result, blocks)
+        self.assertSameOptions(blocks, result,
+                               [f"host{number}" for number in range(10)])
+
+    def test_05_include_lines_are_kept_in_place(self):
+        blocks = [
+            ("Host a", (("User", "x"),)),
+            ("Host b", (("Include", "b.conf"), ("User", "y"))),
+            ("Host c", (("User", "x"),)),
+            ("Host d", (("Include", "common.conf"), ("User", "d"))),
+            ("Host e", (("Include", "common.conf"), ("User", "e"))),
+        ]
+        # c may not be moved before the file b reads, and the file d and
+        # e read may not be moved after their other options.
+        self.assertEqual(Minimizer(blocks).minimize(), blocks)
+
+    def test_06_edgar_minimize(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            source = os.path.join(tmpdir, "edgar.yml")
+            with open(source, "w") as f:
+                f.write(generate_fleet(hosts=2000))
+            e = Edgar(source, "-")
+            minimized = Edgar(source, "-", minimize=True)
+            self.assertLess(len(str(minimized)), len(str(e)) * 0.8)
+            self.assertNotEqual(e.fingerprint(), minimized.fingerprint())
+            names = [name for header in e.config
+                     for name in header.split()[1:]]
+            self.assertSameOptions(list(e.blocks()),
+                                   list(minimized.blocks()), names)
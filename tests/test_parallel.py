@@ -0,0 +1,94 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from benchmarks.synthetic import generate_config
+from edgar.edgar import Edgar
+
+
+DUPLICATES = """---
+Compression: yes
+blocks:
+- Host: e{item}
+  User: edgar
+  with_items: range(25)
+  blocks:
+  - Host: -sub
+    Port: 2222
+- Host: "*"
+  ServerAliveCountMax: 2
+- Host: e3
+  Port: 22
+- Host: d{item}
+  with_items: range(12)
+- Host: e{item}
+  IdentityFile: "~/.ssh/id_{item}"
+  with_items: range(5, 30)
+"""
+
+
+class TestParallel(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.source = os.path.join(self.tmpdir.name, "edgar.yml")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def assertSameAsSerial(self, content, cache_dir=None):
+        with open(self.source, "w") as f:
+            f.write(content)
+        expected = str(Edgar(self.source, "-"))
+        with patch.object(Edgar, "chunk_size", 4):
+            result = str(Edgar(self.source, "-", cache_dir, jobs=3))
+        self.assertEqual(result, expected)
+
+    def test_01_synthetic(self):
+        self.assertSameAsSerial(generate_config(hosts=30, items=10))
+
+    def test_02_duplicate_headers_and_chunks(self):
+        self.assertSameAsSerial(DUPLICATES)
+        self.assertSameAsSerial(
+            DUPLICATES.replace("Compression: yes\nblocks:\n", "")
+        )
+
+    def test_03_root_loop(self):
+        self.assertSameAsSerial("""---
+Host: r{item}
+User: edgar
+with_items: range(10)
+hosts:
+- Host: -s{item}
+  with_items: [a, b]
+""")
+
+    def test_04_with_cache(self):
+        cache_dir = os.path.join(self.tmpdir.name, "cache")
+        self.assertSameAsSerial(DUPLICATES, cache_dir)
+        self.assertSameAsSerial(DUPLICATES, cache_dir)
+        self.assertSameAsSerial(DUPLICATES.replace("22\n", "23\n"), cache_dir)
+
+    def test_05_chunks_are_dispatched_while_produced(self):
+        produced = []
+        stored = []
+
+        class Streamed(Edgar):
+            chunk_size = 10
+
+            def unit_parts(self, conf):
+                for part in Edgar.unit_parts(self, conf):
+                    produced.append(part)
+                    yield part
+
+            def store(self, result, header, body):
+                stored.append(len(produced))
+                Edgar.store(self, result, header, body)
+
+        with open(self.source, "w") as f:
+            f.write("- Host: n{item}\n  with_items: range(200)\n")
+        e = Streamed(self.source, "-", jobs=2)
+        self.assertEqual(len(e.config), 200)
+        self.assertEqual(len(produced), 20)
+        # Blocks are stored while the loop is still being split
+        self.assertLessEqual(stored[0], 2 * e.jobs + 2)
@@ -0,0 +1,191 @@
+import os
+import random
+import tempfile
+import time
+import unittest
+
+from edgar.edgar import Edgar
+from edgar.pruner import Pruner
+from edgar.resolver import Resolver
+
+
+class TestPruner(unittest.TestCase):
+    def assertSameOptions(self, blocks, result, names):
+        expected = Resolver(blocks)
+        resolver = Resolver(result)
+        for name in names:
+            self.assertEqual(resolver.resolve(name), expected.resolve(name),
+                             name)
+
+    def shadowed(self, blocks):
+        return [(blocks[index][0], option, value, origin)
+                for index, option, value, origin
+                in Pruner(blocks).shadowed()]
+
+    def test_01_literal_after_wildcard(self):
+        blocks = [
+            ("Host *.example.com", (("User", "deploy"),)),
+            ("Host web.example.com", (("Hostname", "10.0.0.1"),
+                                      ("User", "web"))),
+            ("Host db.example.com", (("User", "db"),)),
+        ]
+        self.assertEqual(self.shadowed(blocks), [
+            ("Host web.example.com", "User", "web", "Host *.example.com"),
+            ("Host db.example.com", "User", "db", "Host *.example.com"),
+        ])
+        self.assertEqual(Pruner(blocks).prune(), [
+            ("Host *.example.com", (("User", "deploy"),)),
+            ("Host web.example.com", (("Hostname", "10.0.0.1"),)),
+        ])
+
+    def test_02_wildcard_after_wildcard(self):
+        blocks = [
+            ("Host web*", (("User", "a"),)),
+            ("Host *.com", (("Port", "22"),)),
+            ("Host web-db?", (("User", "b"),)),
+            ("Host *.example.com", (("Port", "2222"), ("User", "c"))),
+            ("Host db*.com", (("Port", "2022"),)),
+        ]
+        self.assertEqual(self.shadowed(blocks), [
+            ("Host web-db?", "User", "b", "Host web*"),
+            ("Host *.example.com", "Port", "2222", "Host *.com"),
+            ("Host db*.com", "Port", "2022", "Host *.com"),
+        ])
+
+    def test_03_every_name_must_be_covered(self):
+        blocks = [
+            ("Host a", (("User", "x"),)),
+            ("Host a b", (("User", "y"),)),
+            ("Host a*", (("Port", "22"),)),
+            ("Host a* b*", (("Port", "2222"),)),
+        ]
+        self.assertEqual(self.shadowed(blocks), [])
+
+    def test_04_negated_patterns(self):
+        blocks = [
+            ("Host *.example.com !web.example.com", (("User", "x"),)),
+            ("Host web.example.com", (("User", "y"),)),
+            ("Host *.example.com", (("Port", "22"),)),
+            ("Host db.example.com", (("User", "z"),)),
+            ("Host app* !app1", (("Port", "2222"),)),
+            ("Host app1 app2 !app1", (("Hostname", "10.0.0.2"),)),
+            ("Host app2", (("Hostname", "10.0.0.3"),)),
+        ]
+        self.assertEqual(self.shadowed(blocks), [
+            ("Host db.example.com", "User", "z",
+             "Host *.example.com !web.example.com"),
+            ("Host app2", "Hostname", "10.0.0.3",
+             "Host app1 app2 !app1"),
+        ])
+
+    def test_05_multiple_values(self):
+        blocks = [
+            ("Host *", (("IdentityFile", "~/.ssh/common"),)),
+            ("Host a", (("IdentityFile", "~/.ssh/a"),
+                        ("IdentityFile", "~/.ssh/common"))),
+        ]
+        self.assertEqual(self.shadowed(blocks), [
+            ("Host a", "IdentityFile", "~/.ssh/common", "Host *"),
+        ])
+
+    def test_06_match_blocks_are_ignored(self):
+        blocks = [
+            ("Match exec true", (("User", "m"),)),
+            ("Host a", (("User", "x"),)),
+            ("Match host a", (("User", "n"),)),
+        ]
+        self.assertEqual(self.shadowed(blocks), [])
+        self.assertEqual(Pruner(blocks).prune(), blocks)
+
+    def test_07_same_options_as_before(self):
+        generator = random.Random(42)
+        patterns = ["*", "web*", "*.com", "*.example.com", "db?",
+                    "web1", "web2.example.com", "db1", "cache.com",
+                    "Web1", "WEB*", "*.Example.com"]
+        names = ["web1", "web2", "web2.example.com", "db1", "db12",
+                 "cache.com", "other.example.com", "x", "Web1", "WEB2",
+                 "db.Example.com"]
+        options = ["User", "Port", "IdentityFile"]
+        for _ in range(50):
+            blocks = []
+            for _ in range(generator.randrange(2, 10)):
+                header = generator.sample(patterns, generator.randrange(1, 3))
+                if generator.random() < 0.2:
+                    header.append("!" + generator.choice(names))
+                body = tuple(sorted({
+                    (generator.choice(options), str(generator.randrange(3)))
+                    for _ in range(generator.randrange(1, 4))
+                }))
+                blocks.append(("Host " + " ".join(header), body))
+            self.assertSameOptions(blocks, Pruner(blocks).prune(), names)
+
+    def test_08_large_configs(self):
+        blocks = [("Host *.example.com", (("User", "deploy"),))]
+        blocks.extend(
+            (f"Host node{number}.example.com", (
+                ("Hostname", f"10.0.{number // 256}.{number % 256}"),
+                ("User", "deploy"),
+            ))
+            for number in range(20000)
+        )
+        start = time.perf_counter()
+        result = Pruner(blocks).prune()
+        self.assertLess(time.perf_counter() - start, 5)
+        self.assertEqual(result[1], ("Host node0.example.com",
+                                     (("Hostname", "10.0.0.0"),)))
+        self.assertEqual(len(result), len(blocks))
+
+    def test_09_edgar_prune(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            source = os.path.join(tmpdir, "edgar.yml")
+            with open(source, "w") as f:
+                f.write("""---
+- Host: "*.example.com"
+  User: deploy
+  Port: 2222
+- Host: web.example.com
+  User: web
+  Port: 22
+- Host: "*"
+  User: me
+""")
+            e = Edgar(source, "-")
+            self.assertCountEqual(e.shadowed(), [
+                ("Host web.example.com", "Port", "22",
+                 "Host *.example.com"),
+                ("Host web.example.com", "User", "web",
+                 "Host *.example.com"),
+            ])
+            pruned = Edgar(source, "-", prune=True)
+            self.assertNotIn("Host web.example.com", pruned.config)
+            self.assertNotEqual(e.fingerprint(), pruned.fingerprint())
+            self.assertSameOptions(list(e.blocks()), list(pruned.blocks()),
+                                   ["web.example.com", "db.example.com",
+                                    "other"])
+
+    def test_10_case_sensitive(self):
+        blocks = [
+            ("Host Web", (("User", "a"),)),
+            ("Host web", (("User", "b"),)),
+            ("Host WEB*", (("Port", "22"),)),
+            ("Host web?", (("Port", "2222"),)),
+        ]
+        self.assertEqual(self.shadowed(blocks), [])
+        self.assertEqual(Pruner(blocks).prune(), blocks)
+        self.assertSameOptions(blocks, Pruner(blocks).prune(),
+                               ["Web", "web", "WEB1", "web1"])
+
+    def test_11_include_lines(self):
+        blocks = [
+            ("Host we*", (("Include", "/etc/ssh/a.conf"),)),
+            ("Host web", (("Include", "/etc/ssh/b.conf"), ("User", "x"))),
+            ("Host web", (("Include", "/etc/ssh/a.conf"), ("User", "y"))),
+        ]
+        self.assertEqual(self.shadowed(blocks), [
+            ("Host web", "User", "y", "Host web"),
+        ])
+        self.assertEqual(Pruner(blocks).prune(), [
+            ("Host we*", (("Include", "/etc/ssh/a.conf"),)),
+            ("Host web", (("Include", "/etc/ssh/b.conf"), ("User", "x"))),
+            ("Host web", (("Include", "/etc/ssh/a.conf"),)),
+        ])
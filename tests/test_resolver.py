@@ -0,0 +1,140 @@
+import os
+import random
+import tempfile
+import unittest
+from fnmatch import fnmatchcase
+from unittest.mock import patch
+
+from edgar.edgar import Edgar
+from edgar.resolver import PatternIndex, Resolver
+
+
+def reference_resolve(blocks, hostname):
+    """Straightforward OpenSSH first-match resolution."""
+    options = {}
+    for header, body in blocks:
+        kind, _, patterns = header.partition(" ")
+        if kind != "Host":
+            continue
+        matched = False
+        for pattern in patterns.split():
+            negated = pattern.startswith("!")
+            pattern = pattern.lstrip("!").replace("[", "[[]")
+            if fnmatchcase(hostname, pattern):
+                if negated:
+                    matched = False
+                    break
+                matched = True
+        if not matched:
+            continue
+        for option, value in sorted(set(body)):
+            if option == "IdentityFile":
+                if value not in options.setdefault(option, []):
+                    options[option].append(value)
+            elif option not in options:
+                options[option] = value
+    return options
+
+
+class TestResolver(unittest.TestCase):
+    def test_01_first_match_wins(self):
+        blocks = [
+            ("Host web1", (("User", "alice"), ("IdentityFile", "~/a"))),
+            ("Host web? !web3", (("User", "bob"), ("Port", "2222"))),
+            ("Match exec true", (("User", "nobody"),)),
+            ("Host *", (("User", "me"), ("IdentityFile", "~/b"),
+                        ("Compression", "yes"))),
+        ]
+        r = Resolver(blocks)
+        self.assertEqual(r.resolve("web1"), {
+            "User": "alice", "IdentityFile": ["~/a", "~/b"], "Port": "2222",
+            "Compression": "yes"
+        })
+        self.assertEqual(r.resolve("web3"), {
+            "User": "me", "IdentityFile": ["~/b"], "Compression": "yes"
+        })
+        self.assertEqual(r.resolve("web10")["User"], "me")
+
+    def test_02_escaped_characters(self):
+        r = Resolver([("Host a.b+c", (("User", "x"),)),
+                      ("Host *.b+c", (("User", "y"),))])
+        self.assertEqual(r.resolve("a.b+c"), {"User": "x"})
+        self.assertEqual(r.resolve("z.b+c"), {"User": "y"})
+        self.assertEqual(r.resolve("aXb+c"), {})
+
+    def test_03_same_as_reference(self):
+        rng = random.Random(1)
+        words = ["web", "Web", "db", "cache", "a", "b"]
+        domains = [".prod", ".dev", ".example.com", ""]
+
+        def name():
+            return rng.choice(words) + str(rng.randrange(5)) + \
+                rng.choice(domains)
+
+        def pattern():
+            text = name()
+            for _ in range(rng.randrange(3)):
+                index = rng.randrange(len(text) + 1)
+                text = text[:index] + rng.choice("*?") + text[index + 1:]
+            return rng.random() < 0.15 and "!" + text or text
+
+        blocks = []
+        for number in range(300):
+            patterns = " ".join(pattern() for _ in range(rng.randrange(1, 4)))
+            body = (("User", f"u{number}"), ("IdentityFile", f"~/{number}"),
+                    (rng.choice(["Port", "Compression"]), str(number)))
+            blocks.append((f"Host {patterns}", body))
+
+        with patch.object(PatternIndex, "chunk_size", 7):
+            r = Resolver(blocks)
+            for _ in range(500):
+                hostname = name()
+                self.assertEqual(r.resolve(hostname),
+                                 reference_resolve(blocks, hostname),
+                                 hostname)
+
+    def test_04_edgar_resolver(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            source = os.path.join(tmpdir, "edgar.yml")
+            with open(source, "w") as f:
+                f.write("""---
+User: me
+hosts:
+- Host: "web{item}"
+  Hostname: "10.0.0.{item}"
+  with_items: range(3)
+- Host: "web*"
+  User: www
+""")
+            r = Edgar(source, "-").resolver()
+        self.assertEqual(dict(r.resolve_many(["web2", "web9", "db"])), {
+            "web2": {"Hostname": "10.0.0.2", "User": "www"},
+            "web9": {"User": "www"},
+            "db": {"User": "me"},
+        })
+
+    def test_05_case_sensitive(self):
+        r = Resolver([
+            ("Host Web", (("User", "a"),)),
+            ("Host web", (("User", "b"),)),
+            ("Host *.Example.com", (("Port", "2222"),)),
+            ("Host *", (("User", "me"),)),
+        ])
+        self.assertEqual(r.resolve("Web"), {"User": "a"})
+        self.assertEqual(r.resolve("web"), {"User": "b"})
+        self.assertEqual(r.resolve("WEB"), {"User": "me"})
+        self.assertEqual(r.resolve("db.Example.com"),
+                         {"Port": "2222", "User": "me"})
+        self.assertEqual(r.resolve("db.example.com"), {"User": "me"})
+
+    def test_06_include_lines(self):
+        r = Resolver([
+            ("Host web", (("Include", "b.conf"), ("Include", "a.conf"),
+                          ("User", "web"))),
+            ("Host *", (("Include", "b.conf"), ("User", "me"))),
+        ])
+        self.assertEqual(r.resolve("web"), {
+            "Include": ["b.conf", "a.conf", "b.conf"], "User": "web"
+        })
+        self.assertEqual(r.resolve("db"),
+                         {"Include": ["b.conf"], "User": "me"})
@@ -0,0 +1,123 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from benchmarks.synthetic import generate_config
+from edgar.edgar import Edgar
+
+
+class TestShards(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.source = os.path.join(self.tmpdir.name, "edgar.yml")
+        self.output = os.path.join(self.tmpdir.name, "config")
+        self.shard_dir = os.path.join(self.tmpdir.name, "config.d")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def write(self, content, jobs=1):
+        with open(self.source, "w") as f:
+            f.write(content)
+        e = Edgar(self.source, self.output, jobs=jobs,
+                  shard_dir=self.shard_dir)
+        self.assertTrue(e.write())
+        return e
+
+    def inodes(self):
+        return {name: os.stat(os.path.join(self.shard_dir, name)).st_ino
+                for name in os.listdir(self.shard_dir)}
+
+    def included(self):
+        """Return the output file with its Include lines expanded."""
+        blocks = []
+        with open(self.output) as f:
+            output = f.read().split("\n\n", 1)[1]
+        includes, _, defaults = output.partition("\n\n")
+        for line in includes.splitlines():
+            self.assertTrue(line.startswith("Include "))
+            with open(line[8:]) as shard:
+                blocks.append(shard.read().split("\n\n", 1)[1].strip())
+        blocks.append(defaults.strip())
+        return "\n\n".join(blocks)
+
+    def test_01_same_blocks_than_a_single_file(self):
+        content = generate_config(hosts=5, items=2)
+        e = self.write(content)
+        with open(self.source, "w") as f:
+            f.write(content)
+        expected = str(Edgar(self.source, "-"))
+        self.assertEqual(self.included(), expected)
+        self.assertEqual(
+            sorted(os.listdir(self.shard_dir)),
+            sorted(f"host-team{number}.conf" for number in range(5))
+        )
+        with open(self.output) as f:
+            result = f.read()
+        # Defaults come after every shard
+        self.assertGreater(result.index("Host *"),
+                           result.rindex("Include "))
+        self.assertIn(f"# Fingerprint: {e.fingerprint()}", result)
+
+    def test_02_only_changed_shards_are_written(self):
+        content = generate_config(hosts=5, items=2)
+        self.write(content)
+        before = self.inodes()
+        self.write(content.replace("User: user3\n", "User: someone\n"))
+        after = self.inodes()
+        self.assertEqual(
+            [name for name in sorted(after) if after[name] != before[name]],
+            ["host-team3.conf"]
+        )
+
+    def test_03_stale_shards_are_removed(self):
+        self.write(generate_config(hosts=5, items=2))
+        with open(os.path.join(self.shard_dir, "mine.conf"), "w") as f:
+            f.write("Host mine\n")
+        self.write(generate_config(hosts=2, items=2))
+        self.assertEqual(
+            sorted(os.listdir(self.shard_dir)),
+            ["host-team0.conf", "host-team1.conf", "mine.conf"]
+        )
+
+    def test_04_stale_shards_are_kept_if_the_output_fails(self):
+        self.write(generate_config(hosts=5, items=2))
+        with open(self.output) as f:
+            before = f.read()
+        with open(self.source, "w") as f:
+            f.write(generate_config(hosts=2, items=2))
+        e = Edgar(self.source, self.output, shard_dir=self.shard_dir)
+        with patch.object(e, "output_header", side_effect=OSError):
+            with self.assertRaises(OSError):
+                e.write()
+        with open(self.output) as f:
+            self.assertEqual(f.read(), before)
+        # Every shard the output file includes is still there
+        self.assertEqual(before.count("\nInclude "), 5)
+        self.included()
+
+    def test_05_same_labels_and_parallel_chunks(self):
+        content = """---
+User: me
+hosts:
+- Host: web
+  Port: 2222
+- Host: "db{item}"
+  with_items: range(12)
+- Host: web
+  User: www
+"""
+        class SmallChunks(Edgar):
+            chunk_size = 5
+
+        with open(self.source, "w") as f:
+            f.write(content)
+        e = SmallChunks(self.source, self.output, jobs=2,
+                        shard_dir=self.shard_dir)
+        e.write()
+        self.assertEqual(
+            sorted(os.listdir(self.shard_dir)),
+            ["host-db-item.conf", "host-web.conf"]
+        )
+        self.assertEqual(self.included(), str(Edgar(self.source, "-")))
@@ -0,0 +1,55 @@
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+
+# Budget for importing the command line entry point, in microseconds.
+IMPORT_BUDGET = int(os.environ.get("EDGAR_IMPORT_BUDGET_US", 30000))
+
+# Modules only needed to compile a source, never to start the command.
+HEAVY_MODULES = ["yaml", "concurrent.futures", "multiprocessing", "tempfile",
+                 "edgar.edgar", "edgar.formatter"]
+
+
+def import_times(*args):
+    """Run python -X importtime and return the cumulative import time of
+each imported module."""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ, PYTHONPATH=root)
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime"] + list(args),
+        capture_output=True, text=True, env=env, check=True
+    )
+    times = {}
+    for line in process.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[12:].split("|")
+        if cumulative.strip().isdigit():
+            times[name.strip()] = int(cumulative)
+    return times
+
+
+class TestStartup(unittest.TestCase):
+    def test_01_cli_import_budget(self):
+        # Keep the best of a few runs to smooth out a busy machine
+        best = min(import_times("-c", "import edgar.cli")["edgar.cli"]
+                   for _ in range(3))
+        self.assertLess(best, IMPORT_BUDGET)
+
+    def test_02_version_does_not_load_heavy_modules(self):
+        times = import_times("-m", "edgar.cli", "--version")
+        for module in HEAVY_MODULES:
+            self.assertNotIn(module, times)
+
+    def test_03_cached_source_is_not_parsed(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            source = os.path.join(tmpdir, "edgar.yml")
+            with open(source, "w") as f:
+                f.write("---\n- Host: name\n  User: edgar\n")
+            args = ["-m", "edgar.cli", "-c", source, "--cache-dir",
+                    os.path.join(tmpdir, "cache"), "-o", "-"]
+            self.assertIn("yaml", import_times(*args))
+            self.assertNotIn("yaml", import_times(*args))
@@ -0,0 +1,96 @@
+import io
+import os
+import json
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from unittest.mock import patch
+
+from edgar.cli import run_edgar
+from edgar.edgar import Edgar
+from edgar.stats import Stats
+
+
+SOURCE = """---
+Compression: yes
+hosts:
+- Host: m
+  User: edgar
+  hide: yes
+  hosts:
+  - Host: e{item}
+    Hostname: 10.10.0.{item}
+    with_items: range(3)
+- Host: me1
+  Port: 2222
+- Host: blog
+"""
+
+
+class TestStats(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.source = os.path.join(self.tmpdir.name, "edgar.yml")
+        self.output = os.path.join(self.tmpdir.name, "config")
+        with open(self.source, "w") as f:
+            f.write(SOURCE)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_01_counters(self):
+        for jobs in [1, 2]:
+            stats = Stats()
+            e = Edgar(self.source, self.output, jobs=jobs, stats=stats)
+            e.write()
+            self.assertEqual(stats.counters, {
+                "blocks": 5,
+                "items": 7,
+                "hidden": 1,
+                "duplicates": 1,
+                "pruned": 0,
+                "lines": 13,
+                "bytes": os.path.getsize(self.output)
+            })
+            self.assertEqual(
+                sorted(stats.phases),
+                ["check", "compile", "format", "load", "read", "write"]
+            )
+            os.unlink(self.output)
+
+    def test_02_disabled(self):
+        e = Edgar(self.source, "-")
+        self.assertIsNone(e.stats)
+        self.assertEqual(e.iter_blocks().__name__, "format_blocks")
+        self.assertIn("Host me1", e.config)
+
+    @patch("sys.stderr", new_callable=io.StringIO)
+    def test_03_cli(self, mock_stderr):
+        argv = ["edgar", "-c", self.source, "-o", self.output, "--no-cache",
+                "--stats=json", "--profile",
+                os.path.join(self.tmpdir.name, "profile")]
+        with patch("sys.argv", argv):
+            self.assertEqual(run_edgar(), 0)
+        report = json.loads(mock_stderr.getvalue())
+        self.assertEqual(report["counters"]["items"], 7)
+        self.assertIn("write", report["phases"])
+        self.assertTrue(
+            os.path.exists(os.path.join(self.tmpdir.name, "profile"))
+        )
+
+    @patch("sys.stderr", new_callable=io.StringIO)
+    def test_04_cli_flag_before_command(self, mock_stderr):
+        argv = ["edgar", "-c", self.source, "-o", "-", "--no-cache",
+                "--stats", "show"]
+        with patch("sys.argv", argv), redirect_stdout(io.StringIO()):
+            self.assertEqual(run_edgar(), 0)
+        self.assertIn("items expanded", mock_stderr.getvalue())
+
+    @patch("sys.stderr", new_callable=io.StringIO)
+    def test_05_cli_format_before_command(self, mock_stderr):
+        argv = ["edgar", "-c", self.source, "-o", self.output, "--no-cache",
+                "--stats=json", "store"]
+        with patch("sys.argv", argv):
+            self.assertEqual(run_edgar(), 0)
+        report = json.loads(mock_stderr.getvalue())
+        self.assertEqual(report["counters"]["items"], 7)
@@ -0,0 +1,172 @@
+import io
+import os
+import shutil
+import tempfile
+import unittest
+from contextlib import redirect_stderr, redirect_stdout
+from unittest.mock import patch
+
+from edgar.cli import run_edgar
+from edgar.edgar import Edgar
+from edgar.verify import Verifier, normalize, seconds
+
+
+SOURCE = """---
+- Host: web
+  Hostname: 10.0.0.1
+  User: deploy
+  Port: 2222
+  IdentityFile: ~/.ssh/id_web
+  ForwardAgent: yes
+  ServerAliveInterval: 1m
+  ControlPersist: 1h30m
+  ControlPath: ~/.ssh/cm-%r@%h:%p
+  LocalForward: 8080 localhost:80
+  SendEnv: LANG LC_*
+  UserKnownHostsFile: ~/.ssh/known_hosts ~/.ssh/other
+  Ciphers: +aes128-cbc
+  LogLevel: debug
+- Host: "db{item}"
+  Hostname: "10.0.1.{item}"
+  ViaProxy: web
+  with_items: range(3)
+- Host: "*"
+  User: me
+  Compression: yes
+"""
+
+
+class TestNormalize(unittest.TestCase):
+    def test_01_values(self):
+        self.assertEqual(seconds("1h30m"), "5400")
+        self.assertEqual(seconds("90"), "90")
+        self.assertIsNone(seconds("yes"))
+        self.assertEqual(normalize("controlpersist", "10m"), "600")
+        self.assertEqual(normalize("forwardagent", "True"), "yes")
+        self.assertEqual(normalize("loglevel", "DEBUG"), "debug")
+        self.assertEqual(normalize("localforward", "8080 [localhost]:80"),
+                         "8080 localhost:80")
+        self.assertEqual(normalize("identityfile", '"~/My key"'),
+                         os.path.expanduser("~/My key"))
+        self.assertEqual(normalize("user", "Deploy"), "Deploy")
+        self.assertEqual(normalize("hostname", "Web.Example.com"),
+                         "web.example.com")
+        self.assertEqual(normalize("stricthostkeychecking", "Accept-New"),
+                         "accept-new")
+
+
+@unittest.skipIf(shutil.which("ssh") is None, "ssh is not available")
+class TestVerify(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.source = self.path("edgar.yml")
+        self.output = self.path("config")
+        with open(self.source, "w") as f:
+            f.write(SOURCE)
+
+    def path(self, name):
+        return os.path.join(self.tmpdir.name, name)
+
+    def verify(self, names, jobs=1):
+        e = Edgar(self.source, self.output)
+        verifier = Verifier(list(e.blocks()), self.output, jobs)
+        return list(verifier.verify(names))
+
+    def test_01_same_options(self):
+        Edgar(self.source, self.output).write()
+        names = ["web", "db0", "db1", "db2", "other"]
+        self.assertEqual(self.verify(names),
+                         [(name, [], None) for name in names])
+
+    def test_02_mismatches(self):
+        Edgar(self.source, self.output).write()
+        with open(self.output) as f:
+            content = f.read()
+        with open(self.output, "w") as f:
+            f.write("Host web db1\n  User root\n  Port 22\n\n" + content)
+        self.assertEqual(self.verify(["web", "db1", "db2"], jobs=2), [
+            ("web", [("Port", "2222", "22"), ("User", "deploy", "root")],
+             None),
+            ("db1", [("User", "me", "root")], None),
+            ("db2", [], None),
+        ])
+
+    def test_03_errors(self):
+        Edgar(self.source, self.output).write()
+        with open(self.output, "a") as f:
+            f.write("\nHost broken\n  NoSuchOption yes\n")
+        (name, mismatches, error), = self.verify(["web"])
+        self.assertEqual(mismatches, [])
+        self.assertIn("nosuchoption", error.lower())
+
+    def test_04_command(self):
+        argv = ["edgar", "--no-cache", "-c", self.source, "-o", self.output,
+                "verify"]
+        stderr = io.StringIO()
+        with patch("sys.argv", argv), redirect_stderr(stderr):
+            self.assertEqual(run_edgar(), 0)
+        self.assertEqual(stderr.getvalue(),
+                         "4 hosts verified, 0 mismatching, 0 failed\n")
+        # The output file was not written, a temporary one was checked
+        self.assertFalse(os.path.exists(self.output))
+
+        with open(self.output, "w") as f:
+            f.write("Host web\n  User root\n")
+        stderr = io.StringIO()
+        stdout = io.StringIO()
+        with patch("sys.argv", argv + ["--sample", "2"]), \
+                redirect_stderr(stderr), redirect_stdout(stdout):
+            self.assertEqual(run_edgar(), 0)
+        self.assertEqual(stderr.getvalue(),
+                         "2 hosts verified, 0 mismatching, 0 failed\n")
+
+        # An up to date output file is checked as is
+        Edgar(self.source, self.output).write()
+        with open(self.output) as f:
+            header, _, blocks = f.read().partition("\n\n")
+        with open(self.output, "w") as f:
+            f.write(header + "\n\nHost db0\n  Compression no\n\n" + blocks)
+        stdout = io.StringIO()
+        with patch("sys.argv", argv + ["db0", "web"]), \
+                redirect_stderr(io.StringIO()), redirect_stdout(stdout):
+            self.assertEqual(run_edgar(), 1)
+        self.assertEqual(stdout.getvalue(),
+                         "db0\n  Compression: intended yes, got no\n")
+
+    def test_05_mixed_case_names(self):
+        with open(self.source, "w") as f:
+            f.write("""---
+- Host: Web
+  User: deploy
+- Host: web
+  User: other
+- Host: "*"
+  User: root
+""")
+        Edgar(self.source, self.output).write()
+        self.assertEqual(self.verify(["Web", "web", "WEB"]), [
+            ("Web", [], None), ("web", [], None), ("WEB", [], None),
+        ])
+        argv = ["edgar", "--no-cache", "-c", self.source, "-o", self.output,
+                "verify"]
+        stderr = io.StringIO()
+        with patch("sys.argv", argv), redirect_stderr(stderr):
+            self.assertEqual(run_edgar(), 0)
+        self.assertEqual(stderr.getvalue(),
+                         "2 hosts verified, 0 mismatching, 0 failed\n")
+
+    def test_06_value_case(self):
+        Edgar(self.source, self.output).write()
+        with open(self.output) as f:
+            content = f.read()
+        with open(self.output, "w") as f:
+            f.write("Host web\n  User Deploy\n  Hostname 10.0.0.1\n"
+                    "  UserKnownHostsFile ~/.ssh/Known_hosts ~/.ssh/other\n"
+                    "  LogLevel DEBUG\n\n" + content)
+        self.assertEqual(self.verify(["web"]), [
+            ("web", [("User", "deploy", "Deploy"),
+                     ("UserKnownHostsFile", "~/.ssh/known_hosts ~/.ssh/other",
+                      os.path.expanduser("~/.ssh/Known_hosts ") +
+                      os.path.expanduser("~/.ssh/other"))], None),
+        ])
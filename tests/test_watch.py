@@ -0,0 +1,116 @@
+import os
+import sys
+import time
+import tempfile
+import threading
+import unittest
+
+from benchmarks.synthetic import generate_config
+from edgar.edgar import Edgar
+from edgar.watch import InotifyWatcher, PollingWatcher, Rebuilder
+
+
+class TestWatchers(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.source = os.path.join(self.tmpdir.name, "edgar.yml")
+        self.other = os.path.join(self.tmpdir.name, "other.yml")
+        with open(self.source, "w") as f:
+            f.write("---\n")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def touch_later(self, path, times=1, delay=0.05):
+        def touch():
+            for index in range(times):
+                time.sleep(delay)
+                with open(path, "a") as f:
+                    f.write(f"# {index}\n")
+        thread = threading.Thread(target=touch)
+        thread.start()
+        return thread
+
+    def check_watcher(self, watcher):
+        try:
+            self.assertEqual(watcher.wait(timeout=0.1, debounce=0.05), set())
+            thread = self.touch_later(self.other)
+            self.assertEqual(watcher.wait(timeout=0.3, debounce=0.05), set())
+            thread.join()
+            # A burst of changes is reported once
+            thread = self.touch_later(self.source, times=3)
+            changed = watcher.wait(timeout=2, debounce=0.3)
+            thread.join()
+            self.assertEqual(changed, {self.source})
+            self.assertEqual(watcher.wait(timeout=0.1, debounce=0.05), set())
+        finally:
+            watcher.close()
+
+    def test_01_polling(self):
+        self.check_watcher(PollingWatcher([self.source], interval=0.02))
+
+    @unittest.skipUnless(sys.platform.startswith("linux"), "Linux only")
+    def test_02_inotify(self):
+        self.check_watcher(InotifyWatcher([self.source]))
+
+    @unittest.skipUnless(sys.platform.startswith("linux"), "Linux only")
+    def test_03_inotify_relative_path(self):
+        cwd = os.getcwd()
+        os.chdir(self.tmpdir.name)
+        try:
+            watcher = InotifyWatcher(["edgar.yml"])
+        finally:
+            os.chdir(cwd)
+        thread = self.touch_later(self.source)
+        try:
+            self.assertEqual(watcher.wait(timeout=2, debounce=0.05),
+                             {"edgar.yml"})
+        finally:
+            thread.join()
+            watcher.close()
+
+    @unittest.skipUnless(sys.platform.startswith("linux"), "Linux only")
+    def test_04_inotify_symlink(self):
+        os.mkdir(os.path.join(self.tmpdir.name, "link"))
+        link = os.path.join(self.tmpdir.name, "link", "edgar.yml")
+        os.symlink(self.source, link)
+        watcher = InotifyWatcher([link])
+        thread = self.touch_later(self.source)
+        try:
+            self.assertEqual(watcher.wait(timeout=2, debounce=0.05), {link})
+        finally:
+            thread.join()
+            watcher.close()
+
+
+class TestRebuilder(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.source = os.path.join(self.tmpdir.name, "edgar.yml")
+        self.output = os.path.join(self.tmpdir.name, "config")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def factory(self, diagnostics):
+        return Edgar(self.source, self.output, diagnostics=diagnostics)
+
+    def test_01_only_changed_units_are_compiled(self):
+        content = generate_config(hosts=20, items=3)
+        with open(self.source, "w") as f:
+            f.write(content)
+        rebuilder = Rebuilder(self.factory)
+        self.assertTrue(rebuilder.rebuild())
+        self.assertEqual(rebuilder.sources, [self.source])
+        self.assertEqual(rebuilder.cache.misses, 21)
+        self.assertFalse(rebuilder.rebuild())
+
+        with open(self.source, "w") as f:
+            f.write(content.replace("User: user7\n", "User: someone\n"))
+        self.assertTrue(rebuilder.rebuild())
+        self.assertEqual(rebuilder.cache.misses, 1)
+        self.assertEqual(rebuilder.cache.hits, 20)
+        with open(self.output) as f:
+            result = f.read()
+        self.assertIn("User someone", result)
+        self.assertNotIn("User user7\n", result)